@@ -0,0 +1,119 @@
+"""
+Recall-vs-latency report for the IVF-Flat vector index.
+
+Builds exact (memory) and IVF indexes over a synthetic clustered corpus
+shaped like OpenAI embeddings, then measures recall@k against exact search
+and per-query latency for a range of nprobe values.
+
+Usage (from apps/backend):
+    python -m benchmarks.ann_recall --size 20000 --output benchmarks/reports/ann_recall.md
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from services.vector_index import InMemoryVectorIndex, IVFFlatVectorIndex
+
+
+def make_corpus(size: int, dimensions: int, clusters: int, seed: int) -> np.ndarray:
+    """Generate unit vectors grouped around random topic centers"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    labels = rng.integers(0, clusters, size)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((size, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_chunks(vectors: np.ndarray) -> list[dict]:
+    return [
+        {
+            "_id": i,
+            "filename": "synthetic.txt",
+            "content": "",
+            "embedding": vector,
+            "metadata": {"document_id": f"doc-{i // 20}"}
+        }
+        for i, vector in enumerate(vectors)
+    ]
+
+
+async def run_queries(index, queries: np.ndarray, top_k: int) -> tuple[list[set], list[float]]:
+    results, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        hits = await index.search(None, query, top_k, 0.0)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append({hit["_id"] for hit in hits})
+    return results, latencies
+
+
+async def main(args: argparse.Namespace) -> str:
+    corpus = make_corpus(args.size, args.dimensions, args.clusters, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.choice(args.size, args.queries, replace=False)
+    queries = corpus[picks] + 0.3 * rng.standard_normal((args.queries, args.dimensions)).astype(np.float32)
+
+    chunks = make_chunks(corpus)
+    exact = InMemoryVectorIndex(initial_capacity=args.size)
+    exact.add(chunks)
+    truth, exact_latencies = await run_queries(exact, queries, args.top_k)
+
+    ivf = IVFFlatVectorIndex(nlist=args.nlist, initial_capacity=args.size)
+    ivf.add(chunks)
+    started = time.perf_counter()
+    ivf.train()
+    train_seconds = time.perf_counter() - started
+
+    corpus_line = (
+        f"Corpus: {args.size} vectors x {args.dimensions} dims, {args.clusters} topics; "
+        f"{args.queries} queries; recall@{args.top_k} against exact search."
+    )
+    exact_p50 = np.percentile(exact_latencies, 50)
+    exact_p95 = np.percentile(exact_latencies, 95)
+    lines = [
+        "# IVF-Flat recall vs latency",
+        "",
+        corpus_line,
+        f"nlist = {ivf.stats()['nlist']}, training took {train_seconds:.1f}s.",
+        "",
+        "| index | nprobe | recall@k | p50 ms | p95 ms |",
+        "|-------|--------|----------|--------|--------|",
+        f"| exact | - | 1.000 | {exact_p50:.2f} | {exact_p95:.2f} |",
+    ]
+
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        found, latencies = await run_queries(ivf, queries, args.top_k)
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        lines.append(
+            f"| ivf | {nprobe} | {recall:.3f} | {np.percentile(latencies, 50):.2f} | "
+            f"{np.percentile(latencies, 95):.2f} |"
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = 4 * sqrt(size)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the markdown report to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    report = asyncio.run(main(arguments))
+    print(report)
+    if arguments.output:
+        with open(arguments.output, "w") as f:
+            f.write(report)
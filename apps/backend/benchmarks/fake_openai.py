@@ -0,0 +1,178 @@
+"""
+Local stand-in for the OpenAI API, for offline load tests.
+
+Serves /v1/embeddings and /v1/chat/completions (including streaming) with
+configurable latency. Embeddings are deterministic hashed bag-of-words
+vectors, so identical texts always get identical vectors and texts sharing
+words land close together, which keeps retrieval and caching realistic.
+
+Usage (from apps/backend):
+    python -m benchmarks.fake_openai --port 8100 --chat-latency-ms 300
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8100/v1 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import time
+import uuid
+from functools import lru_cache
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+DEFAULT_DIMENSIONS = 1536
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Replaced by the command-line options in main()
+latency = argparse.Namespace(
+    embedding_ms=20.0,
+    chat_ms=200.0,
+    token_ms=5.0,
+    completion_tokens=60
+)
+
+app = FastAPI()
+
+
+@lru_cache(maxsize=65536)
+def word_vector(word: str, dimensions: int) -> np.ndarray:
+    """Fixed pseudo-random direction for a word"""
+    seed = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+
+
+def embed(text: str, dimensions: int) -> np.ndarray:
+    """Deterministic unit-length embedding: the normalized sum of its word vectors"""
+    words = WORD_PATTERN.findall(text.lower()) or [text]
+    vector = np.sum([word_vector(word, dimensions) for word in words], axis=0)
+    return (vector / (np.linalg.norm(vector) or 1.0)).astype(np.float32)
+
+
+def encode_embedding(vector: np.ndarray, encoding_format: str) -> list[float] | str:
+    """Embedding as the API returns it: base64 float32 bytes (what the SDK asks for) or a float list"""
+    if encoding_format == "base64":
+        return base64.b64encode(vector.tobytes()).decode("ascii")
+    return vector.tolist()
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def completion_words(prompt: str) -> list[str]:
+    """Deterministic reply text derived from the prompt"""
+    words = WORD_PATTERN.findall(prompt.lower()) or ["ok"]
+    return [words[i % len(words)] for i in range(latency.completion_tokens)]
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.post("/v1/embeddings")
+async def create_embeddings(request: Request):
+    body = await request.json()
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    dimensions = body.get("dimensions") or DEFAULT_DIMENSIONS
+    encoding_format = body.get("encoding_format", "float")
+
+    await asyncio.sleep(latency.embedding_ms / 1000)
+    prompt_tokens = sum(count_tokens(text) for text in inputs)
+    return {
+        "object": "list",
+        "model": body.get("model", "text-embedding-3-small"),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": encode_embedding(embed(text, dimensions), encoding_format)}
+            for i, text in enumerate(inputs)
+        ],
+        "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens}
+    }
+
+
+@app.post("/v1/chat/completions")
+async def create_chat_completion(request: Request):
+    body = await request.json()
+    prompt = " ".join(str(message.get("content", "")) for message in body.get("messages", []))
+    words = completion_words(prompt)
+    usage = {
+        "prompt_tokens": count_tokens(prompt),
+        "completion_tokens": len(words),
+        "total_tokens": count_tokens(prompt) + len(words)
+    }
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    model = body.get("model", "gpt-3.5-turbo")
+
+    if body.get("stream"):
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        return StreamingResponse(
+            stream_completion(completion_id, model, words, usage if include_usage else None),
+            media_type="text/event-stream"
+        )
+
+    await asyncio.sleep((latency.chat_ms + latency.token_ms * len(words)) / 1000)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": " ".join(words)},
+            "finish_reason": "stop"
+        }],
+        "usage": usage
+    }
+
+
+async def stream_completion(completion_id: str, model: str, words: list[str], usage: dict | None):
+    def event(choices: list[dict], **extra) -> str:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": choices,
+            **extra
+        }
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    await asyncio.sleep(latency.chat_ms / 1000)
+    for i, word in enumerate(words):
+        content = word if i == 0 else f" {word}"
+        yield event([{"index": 0, "delta": {"content": content}, "finish_reason": None}])
+        await asyncio.sleep(latency.token_ms / 1000)
+    yield event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+    if usage is not None:
+        yield event([], usage=usage)
+    yield "data: [DONE]\n\n"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--embedding-latency-ms", type=float, default=20.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=200.0, help="Time to first token")
+    parser.add_argument("--token-latency-ms", type=float, default=5.0, help="Delay between streamed tokens")
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    latency.embedding_ms = args.embedding_latency_ms
+    latency.chat_ms = args.chat_latency_ms
+    latency.token_ms = args.token_latency_ms
+    latency.completion_tokens = args.completion_tokens
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
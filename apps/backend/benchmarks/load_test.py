@@ -0,0 +1,351 @@
+"""
+Offline load test for the chat and upload hot paths.
+
+Starts the local fake OpenAI server (benchmarks/fake_openai.py) in a
+subprocess, runs the app in-process with services/vector_store.py replaced
+by an in-memory store (benchmarks/memory_store.py), seeds a synthetic
+corpus, then drives /chat, /chat/stream and /admin/documents/upload at each
+concurrency level (an upload counts until its background job is done).
+The mixed scenario sends /chat requests while large uploads are parsed in
+the background, showing how much parsing slows chat down.
+Reports throughput, p50/p95/p99 latency and peak RSS.
+No network access, MongoDB or OpenAI key is needed.
+
+Usage (from apps/backend):
+    python -m benchmarks.load_test --requests 200 --concurrency 1 8 32 \\
+        --output benchmarks/reports/load_test.md
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import resource
+import socket
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+ADMIN_KEY = "load-test"
+
+SCENARIOS = ("chat", "chat_stream", "upload", "mixed")
+
+# Vocabulary for synthetic documents and questions
+TOPICS = [
+    "kubernetes", "mongodb", "fastapi", "embeddings", "latency", "caching", "react", "typescript",
+    "python", "observability", "security", "deployment", "testing", "architecture", "streaming",
+    "retrieval", "vectors", "tokens", "helm", "docker"
+]
+WORDS = [
+    "service", "request", "cluster", "index", "query", "model", "budget", "pipeline", "replica",
+    "throughput", "design", "project", "experience", "team", "release", "metric", "schema", "worker"
+]
+
+
+def synthetic_document(rng: random.Random, size_bytes: int) -> str:
+    """Markdown-ish text with paragraphs about a few topics"""
+    topics = rng.sample(TOPICS, 3)
+    paragraphs, size = [], 0
+    while size < size_bytes:
+        words = [rng.choice(topics if rng.random() < 0.3 else WORDS) for _ in range(rng.randint(40, 90))]
+        paragraph = " ".join(words).capitalize() + "."
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return f"# Notes on {' and '.join(topics)}\n\n" + "\n\n".join(paragraphs)
+
+
+def synthetic_questions(rng: random.Random, count: int) -> list[str]:
+    return [
+        f"What does the {rng.choice(WORDS)} say about {rng.choice(TOPICS)} and {rng.choice(TOPICS)}?"
+        for _ in range(count)
+    ]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def start_fake_openai(args: argparse.Namespace) -> tuple[asyncio.subprocess.Process, str]:
+    """Start benchmarks/fake_openai.py and wait until it answers"""
+    port = free_port()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmarks.fake_openai",
+        "--port", str(port),
+        "--embedding-latency-ms", str(args.embedding_latency_ms),
+        "--chat-latency-ms", str(args.chat_latency_ms),
+        "--token-latency-ms", str(args.token_latency_ms),
+        "--completion-tokens", str(args.completion_tokens),
+        cwd=BACKEND_DIR
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(f"{base_url}/health")
+                return process, f"{base_url}/v1"
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    process.terminate()
+    await process.wait()
+    raise RuntimeError("Fake OpenAI server did not start")
+
+
+async def run_load(
+    send: Callable[[int], Awaitable[bool]],
+    total: int,
+    concurrency: int
+) -> dict:
+    """
+    Send `total` requests from `concurrency` concurrent workers.
+
+    Args:
+        send: Sends request number i; returns False if it failed
+        total: Number of requests
+        concurrency: Number of concurrent workers
+
+    Returns:
+        Throughput, latency percentiles and error count
+    """
+    latencies: list[float] = []
+    errors = 0
+    next_request = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in next_request:
+            started = time.perf_counter()
+            try:
+                ok = await send(i)
+            except Exception:  # noqa: BLE001
+                ok = False
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput": total / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def scenario_sender(
+    name: str,
+    client: httpx.AsyncClient,
+    args: argparse.Namespace,
+    rng: random.Random
+) -> Callable[[int], Awaitable[bool]]:
+    """Build the request function for a scenario"""
+    questions = synthetic_questions(rng, args.distinct_questions)
+
+    async def chat(i: int) -> bool:
+        response = await client.post("/chat", json={"message": questions[i % len(questions)]})
+        return response.status_code == 200
+
+    async def chat_stream(i: int) -> bool:
+        response = await client.post("/chat/stream", json={"message": questions[i % len(questions)]})
+        return response.status_code == 200 and "event: error" not in response.text
+
+    async def upload(i: int) -> bool:
+        text = synthetic_document(random.Random(args.seed * 100_000 + i), args.document_kb * 1024)
+        return await upload_document(client, args, f"load-test-{i}.md", text.encode("utf-8"))
+
+    return {"chat": chat, "chat_stream": chat_stream, "upload": upload, "mixed": chat}[name]
+
+
+async def upload_document(
+    client: httpx.AsyncClient,
+    args: argparse.Namespace,
+    filename: str,
+    content: bytes,
+    delete_after: bool = False
+) -> bool:
+    """Upload a document and wait for its background job; False if either failed"""
+    response = await client.post(
+        "/admin/documents/upload",
+        headers={"X-API-Key": ADMIN_KEY},
+        files={"file": (filename, content, "text/markdown")}
+    )
+    if response.status_code != 202:
+        return False
+    # Uploads are processed in the background; the request ends when its job does
+    job_url = f"/admin/documents/jobs/{response.json()['id']}"
+    while True:
+        await asyncio.sleep(args.job_poll_ms / 1000)
+        job = (await client.get(job_url, headers={"X-API-Key": ADMIN_KEY})).json()
+        if job["status"] in ("done", "failed"):
+            if delete_after and job["status"] == "done":
+                await client.delete(f"/admin/documents/{job['document_id']}", headers={"X-API-Key": ADMIN_KEY})
+            return job["status"] == "done"
+
+
+async def run_mixed(
+    send: Callable[[int], Awaitable[bool]],
+    client: httpx.AsyncClient,
+    args: argparse.Namespace,
+    concurrency: int
+) -> dict:
+    """
+    Run the chat load of run_load while --mixed-uploads clients keep uploading
+    --mixed-document-kb documents, so parsing competes with chat requests.
+
+    Returns:
+        run_load's result plus the number of uploads completed meanwhile
+    """
+    # Generated up front: building a large document here would stall the loop itself
+    content = synthetic_document(random.Random(args.seed), args.mixed_document_kb * 1024).encode("utf-8")
+    stop = asyncio.Event()
+    uploads = 0
+
+    async def uploader(worker: int) -> None:
+        nonlocal uploads
+        while not stop.is_set():
+            # Deleted once ingested so chat keeps searching the seeded corpus
+            if await upload_document(client, args, f"mixed-{worker}.md", content, delete_after=True):
+                uploads += 1
+
+    uploaders = [asyncio.create_task(uploader(worker)) for worker in range(args.mixed_uploads)]
+    try:
+        await asyncio.sleep(args.mixed_warmup_seconds)  # Let the first files reach the parser
+        result = await run_load(send, args.requests, concurrency)
+    finally:
+        stop.set()
+        await asyncio.gather(*uploaders)
+    return {**result, "uploads": uploads}
+
+
+async def main(args: argparse.Namespace) -> tuple[str, list[dict]]:
+    # Imported here rather than at the top: parser worker processes re-import
+    # the __main__ module when they start, and the app's imports would make
+    # every worker restart far slower than it is under uvicorn
+    import config
+    from benchmarks import memory_store
+
+    fake_openai, openai_base_url = await start_fake_openai(args)
+
+    config.settings.OPENAI_API_KEY = "fake-key"
+    config.settings.OPENAI_BASE_URL = openai_base_url
+    config.settings.MONGODB_URI = ""
+    config.settings.ADMIN_API_KEY = ADMIN_KEY
+    config.settings.QUERY_EMBEDDING_CACHE_COLLECTION = ""
+
+    from main import app, lifespan  # Imported late so the settings above apply
+
+    logging.getLogger().setLevel(args.log_level)
+    rng = random.Random(args.seed)
+    results = []
+
+    try:
+        async with lifespan(app):
+            store = memory_store.install()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=120) as client:
+                seed = scenario_sender("upload", client, args, rng)
+                for i in range(args.seed_documents):
+                    if not await seed(-1 - i):
+                        raise RuntimeError("Seeding the corpus failed")
+                corpus = await store.get_storage_stats()
+
+                for name in args.scenarios:
+                    for concurrency in args.concurrency:
+                        send = scenario_sender(name, client, args, rng)
+                        if name == "mixed":
+                            result = await run_mixed(send, client, args, concurrency)
+                        else:
+                            result = await run_load(send, args.requests, concurrency)
+                        results.append({"scenario": name, "concurrency": concurrency, **result})
+    finally:
+        fake_openai.terminate()
+        await fake_openai.wait()
+
+    corpus_line = (
+        f"Corpus: {corpus['total_documents']} seeded documents, {corpus['total_chunks']} chunks "
+        f"(uploads add {args.document_kb} KiB documents). {args.requests} requests per row, "
+        f"{args.distinct_questions} distinct questions."
+    )
+    latency_line = (
+        f"Fake OpenAI latency: embeddings {args.embedding_latency_ms:g} ms, chat {args.chat_latency_ms:g} ms "
+        f"+ {args.token_latency_ms:g} ms x {args.completion_tokens} tokens."
+    )
+    lines = [
+        "# Offline load test",
+        "",
+        corpus_line,
+        latency_line,
+        "",
+        "| scenario | concurrency | req/s | p50 ms | p95 ms | p99 ms | errors | peak RSS MB |",
+        "|----------|-------------|-------|--------|--------|--------|--------|-------------|",
+    ]
+    for result in results:
+        lines.append(
+            f"| {result['scenario']} | {result['concurrency']} | {result['throughput']:.1f} | "
+            f"{result['p50_ms']:.1f} | {result['p95_ms']:.1f} | {result['p99_ms']:.1f} | "
+            f"{result['errors']} | {result['peak_rss_mb']:.0f} |"
+        )
+    mixed = [result for result in results if result["scenario"] == "mixed"]
+    if mixed:
+        lines += [
+            "",
+            f"mixed: /chat while {args.mixed_uploads} clients upload {args.mixed_document_kb} KiB documents "
+            f"(parser executor: {config.settings.PARSER_EXECUTOR}); uploads completed per row: "
+            + ", ".join(str(result["uploads"]) for result in mixed) + "."
+        ]
+    return "\n".join(lines) + "\n", results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seed-documents", type=int, default=20)
+    parser.add_argument("--document-kb", type=int, default=16)
+    parser.add_argument("--distinct-questions", type=int, default=500, help="Fewer means more cache hits")
+    parser.add_argument("--embedding-latency-ms", type=float, default=20.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=200.0)
+    parser.add_argument("--token-latency-ms", type=float, default=5.0)
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--mixed-uploads", type=int, default=2, help="Concurrent uploaders in the mixed scenario")
+    parser.add_argument("--mixed-document-kb", type=int, default=2048, help="Document size in the mixed scenario")
+    parser.add_argument("--mixed-warmup-seconds", type=float, default=1.0)
+    parser.add_argument("--job-poll-ms", type=float, default=20.0, help="Upload job status polling interval")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="Write the markdown report to this file")
+    parser.add_argument("--json", help="Write raw results as JSON to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    report, raw_results = asyncio.run(main(arguments))
+    print(report)
+    if arguments.output:
+        with open(arguments.output, "w") as f:
+            f.write(report)
+    if arguments.json:
+        with open(arguments.json, "w") as f:
+            json.dump(raw_results, f, indent=2)
@@ -0,0 +1,181 @@
+"""
+In-memory stand-ins for services/vector_store.py and the ingestion job
+store, for offline load tests.
+
+Chunks live in a Python list and are searched with the in-process
+InMemoryVectorIndex, so the chat and upload hot paths run end to end
+without MongoDB. Writes still feed services/lexical_index.py.
+"""
+
+import copy
+import itertools
+from datetime import UTC, datetime
+from typing import BinaryIO
+
+import config
+from services import (
+    embedding_config,
+    ingestion_jobs,
+    lexical_index,
+    vector_index,
+    vector_store,
+)
+
+# Functions of services/vector_store.py replaced by install()
+PATCHED_FUNCTIONS = (
+    "insert_chunks",
+    "vector_search",
+    "list_all_documents",
+    "delete_document",
+    "get_document_by_id",
+    "get_storage_stats"
+)
+
+
+class MemoryVectorStore:
+    """Chunk storage with the same async interface as services/vector_store.py"""
+
+    def __init__(self):
+        self.chunks: dict[int, dict] = {}
+        self.index = vector_index.InMemoryVectorIndex(field=embedding_config.field())
+        self._ids = itertools.count(1)
+
+    async def insert_chunks(self, chunks: list[dict]) -> list[str]:
+        for chunk in chunks:
+            chunk["_id"] = next(self._ids)
+            self.chunks[chunk["_id"]] = chunk
+        self.index.add(chunks)
+        lexical_index.add(chunks)
+        return [str(chunk["_id"]) for chunk in chunks]
+
+    async def vector_search(
+        self,
+        query_embedding: list[float],
+        top_k: int = 5,
+        score_threshold: float = 0.5
+    ) -> list[dict]:
+        return await self.index.search(None, query_embedding, top_k, score_threshold)
+
+    async def list_all_documents(self) -> list[dict]:
+        documents = {}
+        for chunk in self.chunks.values():
+            metadata = chunk["metadata"]
+            document = documents.setdefault(metadata["document_id"], {
+                "id": metadata["document_id"],
+                "filename": chunk["filename"],
+                "upload_date": metadata["upload_date"],
+                "file_type": metadata["file_type"],
+                "chunk_count": 0
+            })
+            document["chunk_count"] += 1
+        return sorted(documents.values(), key=lambda document: document["upload_date"], reverse=True)
+
+    async def delete_document(self, document_id: str) -> int:
+        chunk_ids = [
+            chunk_id for chunk_id, chunk in self.chunks.items()
+            if chunk["metadata"]["document_id"] == document_id
+        ]
+        for chunk_id in chunk_ids:
+            del self.chunks[chunk_id]
+        self.index.remove_document(document_id)
+        lexical_index.remove_document(document_id)
+        return len(chunk_ids)
+
+    async def get_document_by_id(self, document_id: str) -> dict | None:
+        for document in await self.list_all_documents():
+            if document["id"] == document_id:
+                return document
+        return None
+
+    async def get_storage_stats(self) -> dict:
+        total_chunks = len(self.chunks)
+        total_documents = len({chunk["metadata"]["document_id"] for chunk in self.chunks.values()})
+        return {
+            "total_documents": total_documents,
+            "total_chunks": total_chunks,
+            "avg_chunks_per_document": round(total_chunks / total_documents, 2) if total_documents > 0 else 0,
+            "vector_index": self.index.stats(),
+            "lexical_index": lexical_index.stats()
+        }
+
+
+class MemoryJobStore(ingestion_jobs.JobStore):
+    """Ingestion jobs and their payloads in dictionaries"""
+
+    def __init__(self):
+        self.jobs: dict[str, dict] = {}
+        self.files: dict[str, bytes] = {}
+        self.chunks: dict[str, bytes] = {}
+
+    async def create(self, job: dict, source: BinaryIO) -> None:
+        self.jobs[job["_id"]] = copy.deepcopy(job)
+        self.files[job["_id"]] = source.read()
+
+    async def get(self, job_id: str) -> dict | None:
+        job = self.jobs.get(job_id)
+        return copy.deepcopy(job) if job else None
+
+    async def claim(self, owner: str, lease_until: datetime) -> dict | None:
+        now = datetime.now(UTC)
+        for job in sorted(self.jobs.values(), key=lambda job: job["created_at"]):
+            if job["status"] in ingestion_jobs.ACTIVE_STATUSES and (
+                job["lease_until"] is None or job["lease_until"] < now
+            ):
+                job.update(owner=owner, lease_until=lease_until)
+                return copy.deepcopy(job)
+        return None
+
+    async def update(self, job_id: str, owner: str, fields: dict) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job["owner"] != owner:
+            return False
+        job.update(copy.deepcopy(fields))
+        return True
+
+    async def load_file(self, job: dict, destination: BinaryIO) -> None:
+        destination.write(self.files[job["_id"]])
+
+    async def save_chunks(self, job: dict, source: BinaryIO) -> dict:
+        self.chunks[job["_id"]] = source.read()
+        return {}
+
+    async def load_chunks(self, job: dict, destination: BinaryIO) -> None:
+        destination.write(self.chunks[job["_id"]])
+
+    async def delete_payload(self, job: dict) -> None:
+        self.files.pop(job["_id"], None)
+        self.chunks.pop(job["_id"], None)
+
+
+class _NoMongoClient:
+    """
+    Placeholder for config.mongodb_client so "MongoDB connected" checks pass.
+    Anything that still reaches for a real collection fails loudly.
+    """
+
+    def __getitem__(self, name):
+        raise RuntimeError(f"Benchmark reached MongoDB (database '{name}'); patch the caller in memory_store")
+
+    def close(self) -> None:
+        pass
+
+
+def install() -> MemoryVectorStore:
+    """
+    Route services/vector_store.py and the ingestion job store to fresh
+    in-memory stores and start the ingestion workers.
+    Call after the app lifespan has started (it leaves MongoDB unset).
+
+    Returns:
+        The installed store
+    """
+    store = MemoryVectorStore()
+    for name in PATCHED_FUNCTIONS:
+        setattr(vector_store, name, getattr(store, name))
+    vector_store._index = store.index
+    ingestion_jobs._store = MemoryJobStore()
+    config.mongodb_client = _NoMongoClient()
+    # Chunk embeddings are cached in-process only
+    config.settings.EMBEDDING_CACHE_COLLECTION = ""
+    ingestion_jobs.start()
+    return store
@@ -0,0 +1,312 @@
+"""
+Micro-benchmarks for upload parsing, cleaning and chunking.
+
+For each format and size class, a synthetic file (benchmarks/synthetic_files.py)
+is parsed with the utils/file_parser function for that format, then run
+through clean_text and document_service.split_text; the whole streaming
+pipeline used by ingestion (utils/extraction.py) is measured as a separate
+"stream_chunks" stage on the same file, read from disk as ingestion does.
+Every case, and the stream_chunks stage of each case, runs in a fresh
+process so peak memory is not hidden by earlier stages. Reports median
+time and peak RSS growth, both per MB of stage input, plus the absolute
+process peak against the pod memory limit (helm/values.yaml).
+
+Peak RSS is reset per stage through /proc/self/clear_refs (Linux); elsewhere
+tracemalloc peaks are reported instead, which miss allocations made in C.
+
+Usage (from apps/backend):
+    python -m benchmarks.parsers --save-baseline benchmarks/reports/parser_baseline.json
+    python -m benchmarks.parsers --compare benchmarks/reports/parser_baseline.json
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks import synthetic_files
+
+SIZE_CLASSES = {"10kb": 10 * 1024, "100kb": 100 * 1024, "1mb": 1024 * 1024, "10mb": 10 * 1024 * 1024}
+
+# Parser under test for each benchmark format
+PARSERS = {
+    "pdf": ("pdf", "parse_pdf"),
+    "pdfplumber": ("pdf", "parse_pdf_with_pdfplumber"),
+    "docx": ("docx", "parse_docx"),
+    "xlsx": ("xlsx", "parse_xlsx"),
+    "txt": ("txt", "parse_text")
+}
+
+# Run only with --include-slow (pdfplumber needs minutes and several GB for 10 MB)
+SLOW_CASES = {("pdfplumber", "10mb")}
+
+MB = 1024 * 1024
+
+SINGLE_RUN_SECONDS = 2.0
+
+# Differences below these are treated as noise by --compare
+MIN_TIME_DELTA_MS = 5.0
+MIN_PEAK_DELTA_MB = 2.0
+
+
+def _read_status_mb(field: str) -> float | None:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """Reset VmHWM to the current RSS (Linux only)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def measure(stage: str, func: Callable, input_bytes: int, repeat: int) -> tuple[object, dict]:
+    """
+    Time a stage and measure its peak memory.
+
+    Args:
+        stage: Stage name
+        func: Zero-argument callable running the stage
+        input_bytes: Size of the stage input, for per-MB figures
+        repeat: Timed runs (the median is reported)
+
+    Returns:
+        Tuple of (stage output, measurements)
+    """
+    gc.collect()
+    use_rss = _reset_peak_rss()
+    if use_rss:
+        baseline = _read_status_mb("VmRSS")
+    else:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    output = func()
+    timings = [time.perf_counter() - started]
+
+    if use_rss:
+        process_peak = _read_status_mb("VmHWM")
+        peak = process_peak - baseline
+    else:
+        peak = tracemalloc.get_traced_memory()[1] / MB
+        process_peak = None
+        tracemalloc.stop()
+
+    # Stages taking seconds are stable enough with a single run
+    for _ in range(repeat - 1 if timings[0] < SINGLE_RUN_SECONDS else 0):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    input_mb = input_bytes / MB
+    seconds = statistics.median(timings)
+    return output, {
+        "stage": stage,
+        "input_mb": round(input_mb, 3),
+        "ms": round(seconds * 1000, 2),
+        "ms_per_mb": round(seconds * 1000 / input_mb, 2),
+        "peak_mb": round(peak, 2),
+        "peak_mb_per_mb": round(peak / input_mb, 2),
+        "process_peak_mb": round(process_peak, 1) if process_peak is not None else None,
+        "memory_source": "rss" if use_rss else "tracemalloc"
+    }
+
+
+def run_case(name: str, size_class: str, repeat: int, seed: int) -> list[dict]:
+    """Benchmark parse -> clean -> split for one format and size (runs in a child process)"""
+    from services import document_service
+    from utils import file_parser
+
+    file_format, parser_name = PARSERS[name]
+    parser = getattr(file_parser, parser_name)
+    content = synthetic_files.make_file(file_format, SIZE_CLASSES[size_class], seed)
+
+    # Warm up so lazy imports inside the parsers are not counted as stage memory
+    document_service.split_text(file_parser.clean_text(parser(synthetic_files.make_file(file_format, 1024, seed))))
+
+    text, parse = measure(parser_name, lambda: parser(content), len(content), repeat)
+    cleaned, clean = measure("clean_text", lambda: file_parser.clean_text(text), len(text.encode("utf-8")), repeat)
+    _, split = measure(
+        "split_text", lambda: document_service.split_text(cleaned), len(cleaned.encode("utf-8")), repeat
+    )
+
+    case = {"format": name, "size": size_class, "file_mb": round(len(content) / MB, 3)}
+    return [{**case, **stage} for stage in (parse, clean, split)]
+
+
+def write_file(file_format: str, size_bytes: int, seed: int, path: str) -> None:
+    """Write a synthetic file to disk (in a child process, so building it leaves no freed heap behind)"""
+    with open(path, "wb") as f:
+        f.write(synthetic_files.make_file(file_format, size_bytes, seed))
+
+
+def run_stream_case(name: str, size_class: str, path: str, repeat: int) -> list[dict]:
+    """Benchmark the streaming ingestion pipeline on a file on disk, as ingestion reads it (own child process)"""
+    import config
+    from utils import extraction
+
+    file_format = PARSERS[name][0]
+    filename = f"benchmark.{file_format}"
+
+    def stream(source: bytes | str) -> int:
+        return sum(1 for _ in extraction.iter_chunks(
+            source, filename, config.settings.CHUNK_SIZE, config.settings.CHUNK_OVERLAP, {}
+        ))
+
+    # Warm up so lazy imports inside the parsers are not counted as stage memory
+    stream(synthetic_files.make_file(file_format, 1024))
+
+    file_bytes = os.path.getsize(path)
+    _, result = measure("stream_chunks", lambda: stream(path), file_bytes, repeat)
+    return [{"format": name, "size": size_class, "file_mb": round(file_bytes / MB, 3), **result}]
+
+
+def run(args: argparse.Namespace) -> list[dict]:
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for size_class in args.sizes:
+        for name in args.formats:
+            if (name, size_class) in SLOW_CASES and not args.include_slow:
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results.extend(pool.submit(run_case, name, size_class, args.repeat, args.seed).result())
+
+            # pdfplumber is only a fallback of the PDF pipeline
+            if name != "pdfplumber":
+                file_format = PARSERS[name][0]
+                with tempfile.TemporaryDirectory() as directory:
+                    path = os.path.join(directory, f"benchmark.{file_format}")
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        pool.submit(write_file, file_format, SIZE_CLASSES[size_class], args.seed, path).result()
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        results.extend(pool.submit(run_stream_case, name, size_class, path, args.repeat).result())
+            print(f"  {name} {size_class} done", file=sys.stderr)
+    return results
+
+
+def report(results: list[dict], memory_limit_mb: float) -> str:
+    lines = [
+        "# Parser micro-benchmarks",
+        "",
+        "Median time and peak RSS growth per MB of stage input. Process peak includes the interpreter and",
+        f"imported libraries and is compared with the {memory_limit_mb:g} MiB pod limit.",
+        "",
+        "| format | size | file MB | stage | ms | ms/MB | peak MB | peak MB/MB | process peak MB |",
+        "|--------|------|---------|-------|----|-------|---------|------------|-----------------|",
+    ]
+    for result in results:
+        process_peak = result["process_peak_mb"]
+        if process_peak is None:
+            process_peak_cell = "n/a"
+        else:
+            process_peak_cell = f"{process_peak:.0f}" + (" **over limit**" if process_peak > memory_limit_mb else "")
+        lines.append(
+            f"| {result['format']} | {result['size']} | {result['file_mb']:.2f} | {result['stage']} | "
+            f"{result['ms']:.1f} | {result['ms_per_mb']:.1f} | {result['peak_mb']:.1f} | "
+            f"{result['peak_mb_per_mb']:.1f} | {process_peak_cell} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> tuple[str, bool]:
+    """
+    Compare results with a saved baseline.
+
+    Returns:
+        Tuple of (markdown table, True if any stage regressed beyond the tolerance)
+    """
+    def key(result):
+        return result["format"], result["size"], result["stage"]
+
+    previous = {key(result): result for result in baseline}
+    criteria = (
+        f"Regression: more than {tolerance:.0%} slower (and > {MIN_TIME_DELTA_MS:g} ms) "
+        f"or more peak memory (and > {MIN_PEAK_DELTA_MB:g} MB)."
+    )
+    lines = [
+        "# Parser benchmarks vs baseline",
+        "",
+        criteria,
+        "",
+        "| format | size | stage | ms | baseline ms | Δ time | peak MB | baseline MB | Δ peak | |",
+        "|--------|------|-------|----|-------------|--------|---------|-------------|--------|-|",
+    ]
+    regressed = False
+    for result in results:
+        base = previous.get(key(result))
+        if base is None:
+            lines.append(f"| {result['format']} | {result['size']} | {result['stage']} | {result['ms']:.1f} | - | - | "
+                         f"{result['peak_mb']:.1f} | - | - | new |")
+            continue
+
+        time_delta = result["ms"] / base["ms"] - 1 if base["ms"] else 0.0
+        peak_delta = result["peak_mb"] / base["peak_mb"] - 1 if base["peak_mb"] > 0 else 0.0
+        slower = time_delta > tolerance and result["ms"] - base["ms"] > MIN_TIME_DELTA_MS
+        bigger = peak_delta > tolerance and result["peak_mb"] - base["peak_mb"] > MIN_PEAK_DELTA_MB
+        regressed = regressed or slower or bigger
+        lines.append(
+            f"| {result['format']} | {result['size']} | {result['stage']} | {result['ms']:.1f} | {base['ms']:.1f} | "
+            f"{time_delta:+.0%} | {result['peak_mb']:.1f} | {base['peak_mb']:.1f} | {peak_delta:+.0%} | "
+            f"{'**regression**' if slower or bigger else ''} |"
+        )
+    return "\n".join(lines) + "\n", regressed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", nargs="+", choices=list(PARSERS), default=list(PARSERS))
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZE_CLASSES), default=list(SIZE_CLASSES))
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage (stages over 2 s run once)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--include-slow", action="store_true", help="Also run " + ", ".join(
+        f"{name} {size}" for name, size in sorted(SLOW_CASES)
+    ))
+    parser.add_argument("--memory-limit-mb", type=float, default=320, help="Pod memory limit (helm/values.yaml)")
+    parser.add_argument("--output", help="Write the markdown report to this file")
+    parser.add_argument("--save-baseline", help="Write raw results as a JSON baseline to this file")
+    parser.add_argument("--compare", help="Compare against a JSON baseline; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown / memory growth")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    benchmark_results = run(arguments)
+    markdown = report(benchmark_results, arguments.memory_limit_mb)
+
+    regression = False
+    if arguments.compare:
+        with open(arguments.compare) as f:
+            comparison, regression = compare(benchmark_results, json.load(f)["results"], arguments.tolerance)
+        markdown += "\n" + comparison
+
+    print(markdown)
+    if arguments.output:
+        with open(arguments.output, "w") as f:
+            f.write(markdown)
+    if arguments.save_baseline:
+        with open(arguments.save_baseline, "w") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "platform": sys.platform,
+                "results": benchmark_results
+            }, f, indent=2)
+    sys.exit(1 if regression else 0)
@@ -0,0 +1,172 @@
+"""
+Deterministic synthetic upload files (PDF, DOCX, XLSX, TXT) of a target size.
+
+The same (format, size, seed) always produces the same bytes, so benchmark
+runs are comparable. PDFs and DOCX packages are written directly: there is
+no PDF-writing dependency, and python-docx takes minutes for 10 MB files.
+"""
+
+import io
+import random
+import zipfile
+
+FORMATS = ("pdf", "docx", "xlsx", "txt")
+
+VOCABULARY = [
+    "architecture", "backend", "cluster", "deployment", "design", "embedding", "experience", "frontend",
+    "index", "kubernetes", "latency", "metric", "model", "mongodb", "pipeline", "project", "python",
+    "query", "release", "replica", "request", "retrieval", "schema", "security", "service", "streaming",
+    "team", "testing", "throughput", "typescript", "vector", "worker", "the", "and", "with", "for", "of"
+]
+
+PDF_LINES_PER_PAGE = 60
+PDF_CHARS_PER_LINE = 90
+
+DOCX_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    "</Types>"
+)
+DOCX_RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    "</Relationships>"
+)
+
+
+def paragraphs(rng: random.Random, total_chars: int) -> list[str]:
+    """Sentence-like paragraphs totalling about `total_chars` characters"""
+    result, size = [], 0
+    while size < total_chars:
+        sentences = []
+        for _ in range(rng.randint(2, 6)):
+            words = rng.choices(VOCABULARY, k=rng.randint(6, 18))
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraph = " ".join(sentences)
+        result.append(paragraph)
+        size += len(paragraph) + 2
+    return result
+
+
+def make_txt(rng: random.Random, text_chars: int) -> bytes:
+    return "\n\n".join(paragraphs(rng, text_chars)).encode("utf-8")
+
+
+def make_pdf(rng: random.Random, text_chars: int) -> bytes:
+    lines = []
+    for paragraph in paragraphs(rng, text_chars):
+        while paragraph:
+            cut = paragraph.rfind(" ", 0, PDF_CHARS_PER_LINE) if len(paragraph) > PDF_CHARS_PER_LINE else -1
+            cut = cut if cut > 0 else PDF_CHARS_PER_LINE
+            lines.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+        lines.append("")
+
+    pages = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)] or [[""]]
+
+    # Objects: 1 catalog, 2 page tree, 3 font, then a (page, content stream) pair per page
+    objects = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in pages:
+        escaped = (line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in page)
+        stream = ("BT /F1 10 Tf 12 TL 40 800 Td\n" + "".join(f"({line}) '\n" for line in escaped) + "ET").encode("latin-1")
+        page_ids.append(len(objects) + 1)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects) + 2} 0 R >>".encode("latin-1")
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("latin-1")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.writelines(b"%010d 00000 n \n" % offset for offset in offsets)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_docx(rng: random.Random, text_chars: int) -> bytes:
+    body = []
+    for i, paragraph in enumerate(paragraphs(rng, text_chars)):
+        if i % 20 == 0:
+            body.append(f'<w:p><w:pPr><w:pStyle w:val="Heading2"/></w:pPr><w:r><w:t>{paragraph[:60]}</w:t></w:r></w:p>')
+        body.append(f"<w:p><w:r><w:t>{paragraph}</w:t></w:r></w:p>")
+
+    # One small table, like a skills matrix in a resume
+    rows = "".join(
+        "<w:tr>" + "".join(
+            f"<w:tc><w:p><w:r><w:t>{' '.join(rng.choices(VOCABULARY, k=3))}</w:t></w:r></w:p></w:tc>"
+            for _ in range(3)
+        ) + "</w:tr>"
+        for _ in range(5)
+    )
+    body.append(f"<w:tbl>{rows}</w:tbl>")
+
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{DOCX_NAMESPACE}"><w:body>{"".join(body)}</w:body></w:document>'
+    )
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as package:
+        package.writestr("[Content_Types].xml", DOCX_CONTENT_TYPES)
+        package.writestr("_rels/.rels", DOCX_RELATIONSHIPS)
+        package.writestr("word/document.xml", document)
+    return out.getvalue()
+
+
+def make_xlsx(rng: random.Random, text_chars: int) -> bytes:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = None
+    for row_number, paragraph in enumerate(paragraphs(rng, text_chars)):
+        if row_number % 5000 == 0:
+            sheet = workbook.create_sheet(f"Sheet{row_number // 5000 + 1}")
+        words = paragraph.split()
+        sheet.append([row_number, " ".join(words[:8]), " ".join(words[8:]), rng.random()])
+
+    out = io.BytesIO()
+    workbook.save(out)
+    return out.getvalue()
+
+
+BUILDERS = {"pdf": make_pdf, "docx": make_docx, "xlsx": make_xlsx, "txt": make_txt}
+
+
+def make_file(file_format: str, size_bytes: int, seed: int = 0) -> bytes:
+    """
+    Generate a file of about `size_bytes` (within ~10%).
+
+    Args:
+        file_format: One of FORMATS
+        size_bytes: Target file size
+        seed: Random seed (same seed, same bytes)
+
+    Returns:
+        File content
+    """
+    build = BUILDERS[file_format]
+    text_chars = size_bytes
+
+    # Compressed formats (DOCX/XLSX) need more text than their file size; rescale once
+    content = build(random.Random(seed), text_chars)
+    if abs(len(content) - size_bytes) > size_bytes * 0.1:
+        text_chars = max(1, int(text_chars * size_bytes / len(content)))
+        content = build(random.Random(seed), text_chars)
+    return content
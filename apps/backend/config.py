@@ -3,7 +3,7 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 # Load .env file from the same directory as this config file
 env_path = Path(__file__).parent / '.env'
@@ -14,6 +14,70 @@ class Settings:
 
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")  # e.g. the local fake server in benchmarks/
+    OPENAI_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    OPENAI_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    OPENAI_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "5"))
+    OPENAI_TIMEOUT_SECONDS: float = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30"))
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "0"))  # Retries are done by utils/resilience.py
+
+    # Deadlines, timeouts, retries and circuit breakers (utils/resilience.py)
+    CHAT_DEADLINE_SECONDS: float = float(os.getenv("CHAT_DEADLINE_SECONDS", "30"))
+    UPLOAD_DEADLINE_SECONDS: float = float(os.getenv("UPLOAD_DEADLINE_SECONDS", "300"))
+    OPENAI_EMBEDDING_TIMEOUT_SECONDS: float = float(os.getenv("OPENAI_EMBEDDING_TIMEOUT_SECONDS", "10"))
+    OPENAI_COMPLETION_TIMEOUT_SECONDS: float = float(os.getenv("OPENAI_COMPLETION_TIMEOUT_SECONDS", "30"))
+    OPENAI_CALL_RETRIES: int = int(os.getenv("OPENAI_CALL_RETRIES", "2"))
+    MONGODB_TIMEOUT_SECONDS: float = float(os.getenv("MONGODB_TIMEOUT_SECONDS", "5"))
+    MONGODB_RETRIES: int = int(os.getenv("MONGODB_RETRIES", "1"))
+    RETRY_BACKOFF_BASE_MS: float = float(os.getenv("RETRY_BACKOFF_BASE_MS", "100"))
+    RETRY_BACKOFF_MAX_MS: float = float(os.getenv("RETRY_BACKOFF_MAX_MS", "2000"))
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_SECONDS: float = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+    CIRCUIT_PROBE_TIMEOUT_SECONDS: float = float(os.getenv("CIRCUIT_PROBE_TIMEOUT_SECONDS", "30"))
+    EMBEDDING_HEDGE_DELAY_MS: float = float(os.getenv("EMBEDDING_HEDGE_DELAY_MS", "0"))  # 0 = no hedging
+
+    # Admission control for /chat and /chat/stream (utils/admission.py)
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_INITIAL_LIMIT: int = int(os.getenv("ADMISSION_INITIAL_LIMIT", "8"))
+    ADMISSION_MIN_LIMIT: int = int(os.getenv("ADMISSION_MIN_LIMIT", "1"))
+    ADMISSION_MAX_LIMIT: int = int(os.getenv("ADMISSION_MAX_LIMIT", "32"))
+    ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", "16"))
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "5"))
+    ADMISSION_LATENCY_TARGET_SECONDS: float = float(os.getenv("ADMISSION_LATENCY_TARGET_SECONDS", "10"))
+    ADMISSION_MEMORY_LIMIT_MB: float = float(os.getenv("ADMISSION_MEMORY_LIMIT_MB", "0"))  # 0 = no memory check
+
+    # Background document ingestion (services/ingestion_jobs.py)
+    INGESTION_WORKERS: int = int(os.getenv("INGESTION_WORKERS", "4"))
+    INGESTION_JOBS_COLLECTION: str = os.getenv("INGESTION_JOBS_COLLECTION", "ingestion_jobs")
+    INGESTION_LEASE_SECONDS: float = float(os.getenv("INGESTION_LEASE_SECONDS", "300"))
+    INGESTION_POLL_SECONDS: float = float(os.getenv("INGESTION_POLL_SECONDS", "5"))
+    INGESTION_MAX_ATTEMPTS: int = int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+
+    # Parsing and chunking of uploads off the event loop (utils/process_pool.py)
+    # One worker idles at ~40MB PSS (plus ~20MB for the forkserver and resource tracker)
+    # and may grow by PARSER_MEMORY_LIMIT_MB while it parses a file
+    PARSER_EXECUTOR: str = os.getenv("PARSER_EXECUTOR", "process")  # process, thread or inline
+    PARSER_WORKERS: int = int(os.getenv("PARSER_WORKERS", "1"))
+    PARSER_TIMEOUT_SECONDS: float = float(os.getenv("PARSER_TIMEOUT_SECONDS", "120"))
+    PARSER_MEMORY_LIMIT_MB: float = float(os.getenv("PARSER_MEMORY_LIMIT_MB", "96"))  # 0 = no cap
+    PARSER_MAX_TASKS_PER_WORKER: int = int(os.getenv("PARSER_MAX_TASKS_PER_WORKER", "5"))  # 0 = never recycle
+
+    # Logging
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")  # e.g. "services.rag_service=DEBUG,uvicorn.access=WARNING"
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # json | text
+    LOG_DEBUG_SAMPLE_RATE: float = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    # Tracing
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "none")  # none | memory | file
+    TRACING_FILE_PATH: str = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+    TRACING_MEMORY_SPANS: int = int(os.getenv("TRACING_MEMORY_SPANS", "1000"))
+
+    # Bearer token required by /metrics (empty = unauthenticated, for in-cluster scraping only)
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
 
     # MongoDB Atlas Configuration
     MONGODB_URI: str = os.getenv("MONGODB_URI", "")
@@ -22,10 +86,62 @@ class Settings:
 
     # RAG Configuration
     VECTOR_INDEX_NAME: str = os.getenv("VECTOR_INDEX_NAME", "vector_index")
+    VECTOR_STORE_BACKEND: str = os.getenv("VECTOR_STORE_BACKEND", "atlas")  # atlas | memory | ivf
+    IVF_NLIST: int = int(os.getenv("IVF_NLIST", "0"))  # 0 = 4 * sqrt(chunk count)
+    IVF_NPROBE: int = int(os.getenv("IVF_NPROBE", "16"))
+    IVF_MIN_TRAIN_SIZE: int = int(os.getenv("IVF_MIN_TRAIN_SIZE", "1024"))
+    VECTOR_INDEX_PATH: str = os.getenv("VECTOR_INDEX_PATH", "")
+    VECTOR_INDEX_SAVE_INTERVAL_SECONDS: float = float(os.getenv("VECTOR_INDEX_SAVE_INTERVAL_SECONDS", "300"))
+
+    # Hybrid lexical (BM25) + vector retrieval
+    LEXICAL_SEARCH_ENABLED: bool = os.getenv("LEXICAL_SEARCH_ENABLED", "false").lower() == "true"
+    LEXICAL_TOP_K: int = int(os.getenv("LEXICAL_TOP_K", "10"))
+    LEXICAL_FAST_PATH_MIN_TERMS: int = int(os.getenv("LEXICAL_FAST_PATH_MIN_TERMS", "2"))
+    LEXICAL_FAST_PATH_MAX_TERMS: int = int(os.getenv("LEXICAL_FAST_PATH_MAX_TERMS", "3"))
+    LEXICAL_FAST_PATH_MIN_SCORE: float = float(os.getenv("LEXICAL_FAST_PATH_MIN_SCORE", "5.0"))
+    LEXICAL_FAST_PATH_MARGIN: float = float(os.getenv("LEXICAL_FAST_PATH_MARGIN", "2.0"))
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    EMBEDDING_DIMENSIONS: int = int(os.getenv("EMBEDDING_DIMENSIONS", "0"))  # 0 = model default (1536)
+    EMBEDDING_STORAGE_FORMAT: str = os.getenv("EMBEDDING_STORAGE_FORMAT", "float32")  # array | float32 | int8 | packed_bit
+    EMBEDDING_RESCORE: bool = os.getenv("EMBEDDING_RESCORE", "false").lower() == "true"
+    EMBEDDING_RESCORE_FACTOR: int = int(os.getenv("EMBEDDING_RESCORE_FACTOR", "4"))
+    EMBEDDING_CONFIG_COLLECTION: str = os.getenv("EMBEDDING_CONFIG_COLLECTION", "embedding_config")
+    EMBEDDING_CONFIG_REFRESH_SECONDS: float = float(os.getenv("EMBEDDING_CONFIG_REFRESH_SECONDS", "30"))
+    EMBEDDING_MIGRATION_BATCH_SIZE: int = int(os.getenv("EMBEDDING_MIGRATION_BATCH_SIZE", "100"))
+    EMBEDDING_MIGRATION_LEASE_SECONDS: float = float(os.getenv("EMBEDDING_MIGRATION_LEASE_SECONDS", "60"))
+    EMBEDDING_MIGRATION_SETTLE_SECONDS: float = float(os.getenv("EMBEDDING_MIGRATION_SETTLE_SECONDS", "120"))
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "1000"))
     CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "200"))
     MAX_FILE_SIZE_MB: int = int(os.getenv("MAX_FILE_SIZE_MB", "10"))
+    # Lower limits for formats whose parsers need more than PARSER_MEMORY_LIMIT_MB at MAX_FILE_SIZE_MB
+    MAX_FILE_SIZE_MB_BY_TYPE: str = os.getenv("MAX_FILE_SIZE_MB_BY_TYPE", "docx=4,xlsx=5")
+    RAG_CONTEXT_MAX_TOKENS: int = int(os.getenv("RAG_CONTEXT_MAX_TOKENS", "1500"))
+
+    # Conversation history compaction
+    HISTORY_MAX_TOKENS: int = int(os.getenv("HISTORY_MAX_TOKENS", "1000"))
+    HISTORY_KEEP_RECENT_TOKENS: int = int(os.getenv("HISTORY_KEEP_RECENT_TOKENS", "500"))
+    HISTORY_SUMMARY_MAX_TOKENS: int = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "200"))
+    HISTORY_SUMMARY_CACHE_SIZE: int = int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", "512"))
+    HISTORY_SUMMARY_TTL_SECONDS: float = float(os.getenv("HISTORY_SUMMARY_TTL_SECONDS", "21600"))
+
+    # Query embedding micro-batching (window 0 disables batching)
+    EMBEDDING_BATCH_WINDOW_MS: float = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+    EMBEDDING_BATCH_MAX_SIZE: int = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+
+    # Query embedding cache (empty collection name keeps the cache in-process only)
+    QUERY_EMBEDDING_CACHE_SIZE: int = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "256"))
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: float = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+    QUERY_EMBEDDING_CACHE_COLLECTION: str = os.getenv("QUERY_EMBEDDING_CACHE_COLLECTION", "")
+
+    # Chunk embedding cache (empty collection name keeps the cache in-process only)
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "512"))
+    EMBEDDING_CACHE_TTL_SECONDS: float = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+    EMBEDDING_CACHE_COLLECTION: str = os.getenv("EMBEDDING_CACHE_COLLECTION", "embedding_cache")
+
+    # Semantic answer cache (size 0 disables)
+    ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", "128"))
+    ANSWER_CACHE_TTL_SECONDS: float = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+    ANSWER_CACHE_MAX_DISTANCE: float = float(os.getenv("ANSWER_CACHE_MAX_DISTANCE", "0.05"))
 
     # Admin API Key for document management
     ADMIN_API_KEY: str = os.getenv("ADMIN_API_KEY", "")
@@ -35,10 +151,5 @@ settings = Settings()
 # Global MongoDB client (initialized in main.py lifespan)
 mongodb_client: AsyncIOMotorClient = None
 
-# Global OpenAI client
-openai_client: OpenAI | None = None
-if settings.OPENAI_API_KEY:
-    try:
-        openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
-    except Exception as e:  # noqa: BLE001
-        print(f"Warning: OpenAI client initialization failed: {e}")
+# Global OpenAI client (initialized in main.py lifespan)
+openai_client: AsyncOpenAI | None = None
@@ -1,10 +1,37 @@
+import asyncio
+import hmac
+import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+import httpx
+from fastapi import FastAPI, Header, HTTPException, Response
 from motor.motor_asyncio import AsyncIOMotorClient
+from openai import AsyncOpenAI
 
 import config
 from routers import chat, documents
+from services import (
+    document_service,
+    embedding_cache,
+    embedding_config,
+    embedding_migration,
+    ingestion_jobs,
+    query_embedding_cache,
+    vector_store,
+)
+from utils import metrics, tokens
+from utils.admission import AdmissionMiddleware
+from utils.logging_config import (
+    RequestIdMiddleware,
+    configure_logging,
+    shutdown_logging,
+)
+from utils.tracing import TracingMiddleware, configure_tracing, shutdown_tracing
+from utils.uploads import UploadSizeLimitMiddleware
+
+configure_logging()
+configure_tracing()
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
@@ -13,29 +40,115 @@ async def lifespan(app: FastAPI):
     FastAPI lifespan context manager.
     Handles startup and shutdown events.
     """
+    configure_logging()
+    configure_tracing()
+
     # Startup: Connect to MongoDB
     if config.settings.MONGODB_URI:
         try:
             config.mongodb_client = AsyncIOMotorClient(config.settings.MONGODB_URI)
             # Verify connection
             await config.mongodb_client.admin.command('ping')
-            print("[OK] MongoDB connected successfully")
+            logger.info("MongoDB connected successfully")
         except Exception as e:  # noqa: BLE001
-            print(f"[WARNING] MongoDB connection failed: {e}")
-            print("  RAG features will be unavailable")
+            logger.warning("MongoDB connection failed, RAG features will be unavailable: %s", e)
             config.mongodb_client = None
     else:
-        print("[WARNING] MONGODB_URI not configured")
-        print("  RAG features will be unavailable")
+        logger.warning("MONGODB_URI not configured, RAG features will be unavailable")
+
+    # Startup: Load the active embedding model/dimensions/field (switched by re-embedding migrations)
+    if config.mongodb_client:
+        try:
+            await embedding_config.load()
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Embedding config unavailable, using environment settings: %s", e)
+
+    # Startup: Expire shared cache entries (the TTL follows the setting across restarts)
+    if config.mongodb_client:
+        await query_embedding_cache.ensure_indexes()
+        await embedding_cache.ensure_indexes()
+
+    # Startup: Start the vector index backend (loads embeddings for in-memory backends)
+    if config.mongodb_client:
+        try:
+            await vector_store.init_index()
+            logger.info("Vector index backend: %s", config.settings.VECTOR_STORE_BACKEND)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Vector index backend failed to start, falling back to Atlas $vectorSearch: %s", e)
+
+    # Startup: Load the tokenizer now rather than on the first chat request
+    await asyncio.to_thread(tokens.get_encoding)
+
+    # Startup: Create the shared async OpenAI client on a pooled keep-alive transport
+    if config.settings.OPENAI_API_KEY:
+        try:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=config.settings.OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=config.settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=config.settings.OPENAI_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+                timeout=httpx.Timeout(
+                    config.settings.OPENAI_TIMEOUT_SECONDS,
+                    connect=config.settings.OPENAI_CONNECT_TIMEOUT_SECONDS,
+                ),
+                follow_redirects=True,
+            )
+            config.openai_client = AsyncOpenAI(
+                api_key=config.settings.OPENAI_API_KEY,
+                base_url=config.settings.OPENAI_BASE_URL or None,
+                max_retries=config.settings.OPENAI_MAX_RETRIES,
+                http_client=http_client,
+            )
+            logger.info("OpenAI client initialized")
+        except Exception as e:  # noqa: BLE001
+            logger.warning("OpenAI client initialization failed: %s", e)
+            config.openai_client = None
+    else:
+        logger.warning("OPENAI_API_KEY not configured, chat and document features will be unavailable")
+
+    # Startup: Follow embedding switchovers and resume an interrupted re-embedding migration
+    if config.mongodb_client:
+        embedding_config.start_refresh(embedding_migration.apply_switch)
+        if config.openai_client:
+            try:
+                await embedding_migration.resume()
+            except Exception as e:  # noqa: BLE001
+                logger.warning("Could not resume re-embedding migration: %s", e)
+
+    # Startup: Process queued uploads, including jobs interrupted by a restart
+    if config.mongodb_client and config.openai_client:
+        ingestion_jobs.start()
 
     yield
 
+    # Shutdown: Stop background embedding work before its clients close
+    await ingestion_jobs.stop()
+    document_service.shutdown_parser_pool()
+    await embedding_migration.stop()
+    await embedding_config.stop_refresh()
+
+    # Shutdown: Close OpenAI HTTP connection pool
+    if config.openai_client:
+        await config.openai_client.close()
+        config.openai_client = None
+        logger.info("OpenAI client closed")
+
     # Shutdown: Close MongoDB connection
+    await vector_store.close_index()
     if config.mongodb_client:
         config.mongodb_client.close()
-        print("[OK] MongoDB connection closed")
+        logger.info("MongoDB connection closed")
+
+    # Shutdown: Flush exported spans and queued log records
+    shutdown_tracing()
+    shutdown_logging()
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(UploadSizeLimitMiddleware)
+app.add_middleware(AdmissionMiddleware)  # Shed requests are still traced and logged
+app.add_middleware(TracingMiddleware)
+app.add_middleware(RequestIdMiddleware)  # Outermost, so request spans log with a request ID
 
 @app.get("/")
 @app.head("/")
@@ -55,6 +168,24 @@ def kubernetes_health():
     """
     return {"status": "healthy"}
 
+@app.get("/metrics")
+def prometheus_metrics(authorization: str | None = Header(None)):
+    """
+    Prometheus scrape endpoint.
+    Exposes per-stage latency histograms, token counts, cache hits and errors.
+    Requires `Authorization: Bearer <METRICS_TOKEN>` when METRICS_TOKEN is set.
+    """
+    token = config.settings.METRICS_TOKEN
+    if token and not hmac.compare_digest((authorization or "").encode(), f"Bearer {token}".encode()):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or missing metrics token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+    payload, content_type = metrics.render()
+    return Response(content=payload, media_type=content_type)
+
 # Include routers
 app.include_router(chat.api_router)
 app.include_router(documents.router)
@@ -17,6 +17,7 @@ class ChatRequest(BaseModel):
     message: str
     history: list[ChatMessage] = []
     use_rag: bool = True  # Enable RAG by default
+    conversation_id: str | None = None  # Keys the cached summary of older history turns
 
 class ChatResponse(BaseModel):
     response: str
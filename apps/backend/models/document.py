@@ -1,5 +1,5 @@
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class DocumentMetadata(BaseModel):
@@ -17,13 +17,19 @@ class DocumentChunk(BaseModel):
     embedding: list[float] | None = None
     metadata: DocumentMetadata
 
-class DocumentUploadResponse(BaseModel):
-    """Response after uploading a document"""
+class IngestionJob(BaseModel):
+    """Status and progress of a background document upload"""
     id: str
+    document_id: str
     filename: str
-    status: str
-    chunk_count: int
-    message: str | None = None
+    size_bytes: int
+    status: str  # queued | parsing | embedding | done | failed
+    chunk_count: int | None = None
+    chunks_embedded: int = 0
+    attempts: int = 0
+    error: str | None = None
+    created_at: str
+    updated_at: str
 
 class DocumentListItem(BaseModel):
     """Summary information about a document"""
@@ -38,3 +44,8 @@ class DocumentDeleteResponse(BaseModel):
     success: bool
     message: str
     deleted_chunks: int
+
+class EmbeddingMigrationRequest(BaseModel):
+    """Target of a re-embedding migration"""
+    dimensions: int = Field(0, ge=0, le=3072)  # 0 = model default
+    model: str | None = None  # Defaults to EMBEDDING_MODEL
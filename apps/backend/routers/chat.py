@@ -1,8 +1,18 @@
-from fastapi import APIRouter, HTTPException
+import json
+import logging
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import aclosing, contextmanager
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 import config
 from models.chat import ChatRequest, ChatResponse, Source
-from services import rag_service
+from services import answer_cache, history_manager, rag_service
+from utils import admission, metrics, resilience
+
+logger = logging.getLogger(__name__)
 
 # System prompt - strictly document-based responses only
 SYSTEM_PROMPT = """You are an AI assistant for Draco Cheng's personal portfolio website.
@@ -19,6 +29,12 @@ Style:
 - If relevant, suggest the visitor explore the website for more information
 """
 
+NO_DOCUMENTS_MESSAGE = "Sorry, I'm unable to access the document database at the moment. Please try again later, or feel free to browse the website to learn more about Draco's experience and projects."
+
+ERROR_MESSAGE = "Sorry, I encountered an issue processing your request. Please try again later."
+
+DEGRADED_MESSAGE = "Sorry, the assistant is temporarily unavailable. Please try again in a minute, or feel free to browse the website in the meantime."
+
 api_router = APIRouter(prefix="")
 
 @api_router.get("/ping")
@@ -29,7 +45,7 @@ def ping():
     return {"result": "pong"}
 
 @api_router.post("/chat")
-async def chat(request: ChatRequest) -> ChatResponse:
+async def chat(request: ChatRequest, http_request: Request) -> ChatResponse:
     """
     Chat endpoint with RAG support.
 
@@ -40,6 +56,231 @@ async def chat(request: ChatRequest) -> ChatResponse:
     Accepts a user message and optional conversation history.
     Returns an AI response with optional source citations.
     """
+    validate_chat_request(request)
+    started = time.perf_counter()
+    mode = "direct"
+
+    try:
+        with resilience.deadline(config.settings.CHAT_DEADLINE_SECONDS):
+            # Fail fast to the fallback reply while OpenAI is known to be down
+            if resilience.openai_breaker.is_open():
+                raise resilience.CircuitOpenError(resilience.openai_breaker)
+
+            # Check if RAG should be used
+            if request.use_rag:
+                # Check if documents exist
+                has_docs = await rag_service.has_documents()
+
+                if has_docs:
+                    # Use RAG mode
+                    mode = "rag"
+                    response_text, sources = await rag_service.generate_rag_response(
+                        query=request.message,
+                        history=request.history,
+                        system_prompt=SYSTEM_PROMPT,
+                        conversation_id=request.conversation_id
+                    )
+                    logger.debug("RAG response generated", extra={"sources": len(sources)})
+
+                    # Convert sources to Source models
+                    source_objects = [
+                        Source(
+                            document_id=src["document_id"],
+                            filename=src["filename"],
+                            content=src["content"],
+                            score=src["score"]
+                        )
+                        for src in sources
+                    ]
+
+                    return ChatResponse(response=response_text, sources=source_objects)
+                else:
+                    # No documents available - return helpful message instead of hallucinating
+                    logger.info("No documents found, returning unavailable message")
+                    mode = "no_documents"
+                    return ChatResponse(response=NO_DOCUMENTS_MESSAGE, sources=[])
+
+            # Direct mode (no RAG) - only used when use_rag=False is explicitly set
+            messages = await build_direct_messages(request)
+
+            # Call OpenAI API
+            with metrics.rag_stage("completion"):
+                response = await resilience.openai_call(
+                    "openai.chat",
+                    lambda: config.openai_client.chat.completions.create(
+                        model="gpt-3.5-turbo",
+                        messages=messages,
+                        temperature=0.7,
+                        max_tokens=500
+                    ),
+                    timeout=config.settings.OPENAI_COMPLETION_TIMEOUT_SECONDS
+                )
+                metrics.record_tokens("chat", getattr(response, "usage", None))
+
+            assistant_message = response.choices[0].message.content
+
+            return ChatResponse(response=assistant_message, sources=[])
+
+    except resilience.ResilienceError as e:
+        logger.warning("Chat degraded: %s", e)
+        metrics.record_error("chat", e)
+        mode = "degraded"
+        admission.mark_failed(http_request)
+        return ChatResponse(response=DEGRADED_MESSAGE, sources=[])
+
+    except Exception as e:
+        logger.exception("Chat endpoint error")
+        metrics.record_error("chat", e)
+        mode = "error"
+        admission.mark_failed(http_request)
+        # Return a friendly response instead of an error
+        return ChatResponse(response=ERROR_MESSAGE, sources=[])
+
+    finally:
+        metrics.CHAT_REQUEST_SECONDS.labels(endpoint="chat", mode=mode).observe(
+            time.perf_counter() - started
+        )
+
+
+@api_router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request) -> StreamingResponse:
+    """
+    Streaming chat endpoint using Server-Sent Events.
+
+    Supports the same RAG and direct modes as /chat. Events are emitted as:
+    1. `sources`: JSON list of RAG sources (empty in direct mode)
+    2. `token`: JSON object with a `content` delta, repeated as tokens arrive
+    3. `done`: Emitted once the completion has finished
+    4. `error`: Friendly error message if generation fails mid-stream
+    """
+    validate_chat_request(request)
+
+    return StreamingResponse(
+        stream_chat_events(request, http_request),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx ingress)
+        }
+    )
+
+
+async def stream_chat_events(request: ChatRequest, http_request: Request) -> AsyncIterator[str]:
+    """
+    Produce SSE events for a chat request.
+
+    Sources are sent as soon as retrieval finishes so the client can render
+    citations before the first completion token arrives.
+    """
+    started = time.perf_counter()
+    mode = "direct"
+
+    spent = 0.0
+
+    @contextmanager
+    def stage_deadline() -> Iterator[None]:
+        # Only the awaited stages draw on the deadline, never a yield: a slow
+        # client reading the stream must not eat into the upstream budget
+        nonlocal spent
+        stage_started = time.perf_counter()
+        try:
+            with resilience.deadline(config.settings.CHAT_DEADLINE_SECONDS - spent):
+                yield
+        finally:
+            spent += time.perf_counter() - stage_started
+
+    try:
+        if resilience.openai_breaker.is_open():
+            raise resilience.CircuitOpenError(resilience.openai_breaker)
+
+        if request.use_rag:
+            with stage_deadline():
+                has_docs = await rag_service.has_documents()
+
+            if not has_docs:
+                mode = "no_documents"
+                yield format_sse("sources", [])
+                yield format_sse("token", {"content": NO_DOCUMENTS_MESSAGE})
+                yield format_sse("done", {})
+                return
+
+            with stage_deadline():
+                query_embedding, fast_results, cached = await rag_service.check_answer_cache(
+                    request.message, request.history
+                )
+
+            if cached is not None:
+                mode = "cached"
+                response_text, sources = cached
+                yield format_sse("sources", sources)
+                yield format_sse("token", {"content": response_text})
+                yield format_sse("done", {})
+                return
+
+            mode = "rag"
+            corpus_generation = answer_cache.generation()
+            with stage_deadline():
+                messages, sources = await rag_service.build_rag_messages(
+                    query=request.message,
+                    history=request.history,
+                    system_prompt=SYSTEM_PROMPT,
+                    query_embedding=query_embedding,
+                    conversation_id=request.conversation_id,
+                    fast_results=fast_results
+                )
+            temperature = 0.3
+        else:
+            with stage_deadline():
+                messages, sources = await build_direct_messages(request), []
+            temperature = 0.7
+
+        yield format_sse("sources", sources)
+
+        tokens = []
+        async with aclosing(rag_service.stream_completion(messages, temperature=temperature)) as completion:
+            with stage_deadline():
+                token = await anext(completion, None)
+            while token is not None:
+                if not tokens:
+                    metrics.TIME_TO_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started)
+                tokens.append(token)
+                yield format_sse("token", {"content": token})
+                token = await anext(completion, None)
+
+        yield format_sse("done", {})
+
+        if request.use_rag:
+            answer_cache.store(
+                query_embedding, request.history, "".join(tokens), sources, corpus_generation
+            )
+
+    except resilience.ResilienceError as e:
+        logger.warning("Chat stream degraded: %s", e)
+        metrics.record_error("chat_stream", e)
+        mode = "degraded"
+        admission.mark_failed(http_request)
+        yield format_sse("error", {"message": DEGRADED_MESSAGE})
+
+    except Exception as e:
+        logger.exception("Chat stream error")
+        metrics.record_error("chat_stream", e)
+        mode = "error"
+        admission.mark_failed(http_request)
+        yield format_sse("error", {"message": ERROR_MESSAGE})
+
+    finally:
+        metrics.CHAT_REQUEST_SECONDS.labels(endpoint="chat_stream", mode=mode).observe(
+            time.perf_counter() - started
+        )
+
+
+def validate_chat_request(request: ChatRequest) -> None:
+    """
+    Reject empty messages and requests made while OpenAI is unavailable.
+
+    Raises:
+        HTTPException: 400 for empty messages, 503 if OpenAI is not configured
+    """
     if not request.message or not request.message.strip():
         raise HTTPException(
             status_code=400,
@@ -52,71 +293,30 @@ async def chat(request: ChatRequest) -> ChatResponse:
             detail="OpenAI service is not available. Please configure OPENAI_API_KEY."
         )
 
-    try:
-        # Check if RAG should be used
-        print(f"[DEBUG] use_rag: {request.use_rag}")
-        if request.use_rag:
-            # Check if documents exist
-            has_docs = await rag_service.has_documents()
-            print(f"[DEBUG] has_documents: {has_docs}")
-
-            if has_docs:
-                # Use RAG mode
-                print(f"[DEBUG] Using RAG mode for query: {request.message[:50]}...")
-                response_text, sources = await rag_service.generate_rag_response(
-                    query=request.message,
-                    history=request.history,
-                    system_prompt=SYSTEM_PROMPT
-                )
-                print(f"[DEBUG] RAG returned {len(sources)} sources")
-
-                # Convert sources to Source models
-                source_objects = [
-                    Source(
-                        document_id=src["document_id"],
-                        filename=src["filename"],
-                        content=src["content"],
-                        score=src["score"]
-                    )
-                    for src in sources
-                ]
-
-                return ChatResponse(response=response_text, sources=source_objects)
-            else:
-                # No documents available - return helpful message instead of hallucinating
-                print("No documents found, returning unavailable message")
-                return ChatResponse(
-                    response="Sorry, I'm unable to access the document database at the moment. Please try again later, or feel free to browse the website to learn more about Draco's experience and projects.",
-                    sources=[]
-                )
 
-        # Direct mode (no RAG) - only used when use_rag=False is explicitly set
-        # Build messages array for OpenAI
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+async def build_direct_messages(request: ChatRequest) -> list[dict]:
+    """
+    Build the OpenAI message list for direct (non-RAG) mode.
 
-        # Add conversation history
-        for msg in request.history:
-            messages.append({"role": msg.role, "content": msg.content})
+    Args:
+        request: Chat request with message and history
 
-        # Add current user message
-        messages.append({"role": "user", "content": request.message})
+    Returns:
+        List of message dictionaries for OpenAI API
+    """
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
 
-        # Call OpenAI API
-        response = config.openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=500
-        )
+    # Add conversation history (compacted to the token budget)
+    messages.extend(
+        await history_manager.compact_history(request.history, request.conversation_id)
+    )
 
-        assistant_message = response.choices[0].message.content
+    # Add current user message
+    messages.append({"role": "user", "content": request.message})
 
-        return ChatResponse(response=assistant_message, sources=[])
+    return messages
 
-    except Exception as e:  # noqa: BLE001
-        print(f"[ERROR] Chat endpoint error: {e}")
-        # Return a friendly response instead of an error
-        return ChatResponse(
-            response="Sorry, I encountered an issue processing your request. Please try again later.",
-            sources=[]
-        )
+
+def format_sse(event: str, data) -> str:
+    """Format a single Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
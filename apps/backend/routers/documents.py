@@ -10,9 +10,21 @@ import config
 from models.document import (
     DocumentDeleteResponse,
     DocumentListItem,
-    DocumentUploadResponse,
+    EmbeddingMigrationRequest,
+    IngestionJob,
 )
-from services import document_service, vector_store
+from services import (
+    answer_cache,
+    document_service,
+    embedding_cache,
+    embedding_migration,
+    history_manager,
+    ingestion_jobs,
+    query_embedding_cache,
+    rag_service,
+    vector_store,
+)
+from utils import admission, resilience, tracing
 
 
 def verify_admin_key(x_api_key: str | None = Header(None)):
@@ -49,17 +61,35 @@ router = APIRouter(
 )
 
 
-@router.post("/upload", response_model=DocumentUploadResponse)
+@router.post("/upload", response_model=IngestionJob, status_code=202)
 async def upload_document(file: UploadFile = File(...)):  # noqa: B008
     """
-    Upload and process a document.
+    Upload a document for background processing.
 
     Supported file types: PDF, DOCX, XLSX, Markdown, TXT
 
     Returns:
-        DocumentUploadResponse with document ID and status
+        The queued ingestion job; poll GET /jobs/{job_id} for progress
+    """
+    filename = document_service.validate_upload(file)
+    return await ingestion_jobs.submit(filename, file.file, file.size)
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJob)
+async def get_ingestion_job(job_id: str):
     """
-    return await document_service.upload_document(file)
+    Get the status and progress of an upload.
+
+    Returns:
+        The ingestion job (status, chunk count, chunks embedded, error)
+    """
+    job = await ingestion_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Ingestion job {job_id} not found"
+        )
+    return job
 
 
 @router.get("", response_model=list[DocumentListItem])
@@ -84,6 +114,112 @@ async def get_storage_stats():
     return await vector_store.get_storage_stats()
 
 
+@router.get("/stats/cache")
+async def get_cache_stats():
+    """
+    Get cache statistics.
+
+    Returns:
+        Hit/miss counters and sizes for the chat caches
+    """
+    return {
+        "query_embeddings": query_embedding_cache.get_stats(),
+        "chunk_embeddings": embedding_cache.get_stats(),
+        "answers": answer_cache.get_stats(),
+        "history_summaries": history_manager.get_stats(),
+        "coalescing": rag_service.get_coalescing_stats(),
+        "embedding_batching": rag_service.get_batching_stats()
+    }
+
+
+@router.get("/stats/admission")
+async def get_admission_stats():
+    """
+    Get chat admission control state.
+
+    Returns:
+        Current concurrency limit, in-flight and queued requests, and shed counts
+    """
+    return admission.get_stats()
+
+
+@router.get("/stats/parser")
+async def get_parser_stats():
+    """
+    Get the document parser pool state.
+
+    Returns:
+        Executor mode, worker settings and task outcome counts
+    """
+    return document_service.get_parser_pool().stats()
+
+
+@router.get("/stats/resilience")
+async def get_resilience_stats():
+    """
+    Get circuit breaker state.
+
+    Returns:
+        State, consecutive failures and rejected calls for OpenAI and MongoDB
+    """
+    return resilience.get_stats()
+
+
+@router.get("/stats/traces")
+async def get_recent_traces(limit: int = 20):
+    """
+    Get the most recent request traces (requires TRACING_EXPORTER=memory).
+
+    Returns:
+        Traces newest first, each a tree of spans with durations and attributes
+    """
+    exporter = tracing.get_exporter()
+    if not isinstance(exporter, tracing.InMemoryExporter):
+        raise HTTPException(
+            status_code=404,
+            detail="In-memory tracing is not enabled. Set TRACING_EXPORTER=memory."
+        )
+    return {"traces": exporter.recent_traces(limit)}
+
+
+@router.post("/embeddings/migration", status_code=202)
+async def start_embedding_migration(request: EmbeddingMigrationRequest):
+    """
+    Start re-embedding all chunks with a new model and/or dimensions.
+    Searches keep using the current embeddings until the migration switches over.
+
+    Returns:
+        Active embedding configuration and migration progress
+    """
+    if not config.mongodb_client or not config.openai_client:
+        raise HTTPException(
+            status_code=503,
+            detail="MongoDB and OpenAI are required for re-embedding"
+        )
+
+    return await embedding_migration.start(
+        request.model or config.settings.EMBEDDING_MODEL,
+        request.dimensions
+    )
+
+
+@router.get("/embeddings/migration")
+async def get_embedding_migration():
+    """
+    Get the active embedding configuration and re-embedding progress.
+
+    Returns:
+        Active model/dimensions/field and the latest migration, if any
+    """
+    if not config.mongodb_client:
+        raise HTTPException(
+            status_code=503,
+            detail="MongoDB not connected"
+        )
+
+    return await embedding_migration.get_status()
+
+
 @router.get("/{document_id}")
 async def get_document(document_id: str):
     """
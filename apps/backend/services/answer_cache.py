@@ -0,0 +1,187 @@
+"""
+Semantic answer cache.
+Serves a previously generated RAG answer when a new question is a
+near-duplicate of a cached one (by query embedding cosine distance).
+
+Entries are scoped to the conversation history they were generated with
+and are dropped whenever the document corpus changes. Invalidation is
+per-process; ANSWER_CACHE_TTL_SECONDS bounds staleness on other replicas.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+from models.chat import ChatMessage
+
+_entries: OrderedDict[int, dict] = OrderedDict()
+_matrix: np.ndarray | None = None
+_matrix_ids: list[int] = []
+_next_id = 0
+_generation = 0
+
+_hits = 0
+_misses = 0
+_invalidations = 0
+
+
+def history_key(history: list[ChatMessage]) -> str:
+    """Fingerprint conversation history; answers are only reused for identical history"""
+    if not history:
+        return ""
+    payload = json.dumps([[msg.role, msg.content] for msg in history])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def generation() -> int:
+    """Current corpus generation; bumped on every invalidation"""
+    return _generation
+
+
+def lookup(
+    query_embedding: list[float],
+    history: list[ChatMessage]
+) -> tuple[str, list[dict]] | None:
+    """
+    Find a cached answer for a semantically equivalent question.
+
+    Args:
+        query_embedding: Embedding of the new question
+        history: Conversation history of the new question
+
+    Returns:
+        Tuple of (response_text, sources), or None on a miss
+    """
+    global _hits, _misses
+
+    if config.settings.ANSWER_CACHE_SIZE <= 0 or not _entries:
+        _misses += 1
+        return None
+
+    _expire()
+    matrix = _get_matrix()
+    if matrix is None:
+        _misses += 1
+        return None
+
+    key = history_key(history)
+    query = _normalize(query_embedding)
+    similarities = matrix @ query
+
+    # Best match among entries with the same history
+    for idx in np.argsort(-similarities):
+        entry_id = _matrix_ids[idx]
+        entry = _entries[entry_id]
+        if 1.0 - float(similarities[idx]) > config.settings.ANSWER_CACHE_MAX_DISTANCE:
+            break
+        if entry["history_key"] == key:
+            _entries.move_to_end(entry_id)
+            _hits += 1
+            return entry["response"], [dict(src) for src in entry["sources"]]
+
+    _misses += 1
+    return None
+
+
+def store(
+    query_embedding: list[float] | None,
+    history: list[ChatMessage],
+    response: str,
+    sources: list[dict],
+    corpus_generation: int
+) -> None:
+    """
+    Cache a generated answer.
+
+    Args:
+        query_embedding: Embedding of the answered question (None skips caching)
+        history: Conversation history the answer was generated with
+        response: Generated answer text
+        sources: Source citations returned with the answer
+        corpus_generation: Value of generation() before retrieval started;
+            answers computed against an older corpus are discarded
+    """
+    global _next_id, _matrix
+
+    if (
+        query_embedding is None
+        or config.settings.ANSWER_CACHE_SIZE <= 0
+        or corpus_generation != _generation
+    ):
+        return
+
+    _entries[_next_id] = {
+        "embedding": _normalize(query_embedding),
+        "history_key": history_key(history),
+        "response": response,
+        "sources": [dict(src) for src in sources],
+        "expires_at": time.monotonic() + config.settings.ANSWER_CACHE_TTL_SECONDS
+    }
+    _next_id += 1
+
+    while len(_entries) > config.settings.ANSWER_CACHE_SIZE:
+        _entries.popitem(last=False)
+
+    _matrix = None
+
+
+def invalidate() -> None:
+    """Drop all cached answers; call whenever documents are added or removed"""
+    global _generation, _invalidations, _matrix
+
+    _entries.clear()
+    _matrix = None
+    _generation += 1
+    _invalidations += 1
+
+
+def get_stats() -> dict:
+    """
+    Get cache counters for monitoring.
+
+    Returns:
+        Dictionary with size, hits, misses, invalidations and hit rate
+    """
+    lookups = _hits + _misses
+    return {
+        "size": len(_entries),
+        "max_size": config.settings.ANSWER_CACHE_SIZE,
+        "max_distance": config.settings.ANSWER_CACHE_MAX_DISTANCE,
+        "hits": _hits,
+        "misses": _misses,
+        "invalidations": _invalidations,
+        "hit_rate": round(_hits / lookups, 4) if lookups > 0 else 0
+    }
+
+
+def _normalize(embedding: list[float]) -> np.ndarray:
+    """Convert to a unit-length float32 vector so dot product equals cosine similarity"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def _expire() -> None:
+    """Remove entries whose TTL has elapsed"""
+    global _matrix
+
+    now = time.monotonic()
+    expired = [entry_id for entry_id, entry in _entries.items() if entry["expires_at"] <= now]
+    for entry_id in expired:
+        del _entries[entry_id]
+    if expired:
+        _matrix = None
+
+
+def _get_matrix() -> np.ndarray | None:
+    """Stack cached embeddings into one matrix, rebuilt only after the entries change"""
+    global _matrix, _matrix_ids
+
+    if _matrix is None and _entries:
+        _matrix_ids = list(_entries.keys())
+        _matrix = np.stack([_entries[entry_id]["embedding"] for entry_id in _matrix_ids])
+    return _matrix
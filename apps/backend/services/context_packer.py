@@ -0,0 +1,127 @@
+"""
+Context packing for RAG prompts.
+Fits retrieved chunks into a token budget before they are sent to GPT.
+
+Steps:
+1. Merge chunks that are adjacent (by chunk_index) in the same document,
+   removing the text repeated by CHUNK_OVERLAP
+2. Drop passages that are near-duplicates of a higher-scoring one
+3. Add passages in score order until the token budget is used, truncating
+   the last one if a meaningful amount of budget remains
+"""
+
+import config
+from utils.tokens import count_tokens, truncate_tokens
+
+# Passages sharing at least this fraction of word shingles are near-duplicates
+DUPLICATE_SIMILARITY = 0.8
+
+# Don't bother including a truncated passage smaller than this
+MIN_PARTIAL_TOKENS = 50
+
+# Shortest suffix/prefix match treated as chunk overlap (avoids merging on a shared word)
+MIN_OVERLAP_CHARS = 20
+
+
+def pack_context(chunks: list[dict], max_tokens: int) -> list[str]:
+    """
+    Select and merge chunk contents to fit a token budget.
+
+    Args:
+        chunks: Retrieved chunks (content, score, chunk_index, metadata.document_id)
+        max_tokens: Token budget for all passages combined
+
+    Returns:
+        Passage texts ordered by relevance
+    """
+    passages = merge_adjacent_chunks(chunks)
+    passages.sort(key=lambda passage: passage["score"], reverse=True)
+
+    selected: list[dict] = []
+    used_tokens = 0
+
+    for passage in passages:
+        shingles = _shingles(passage["content"])
+        if any(_similarity(shingles, kept["shingles"]) >= DUPLICATE_SIMILARITY for kept in selected):
+            continue
+
+        tokens = count_tokens(passage["content"])
+        remaining = max_tokens - used_tokens
+
+        if tokens <= remaining:
+            selected.append({"content": passage["content"], "shingles": shingles})
+            used_tokens += tokens
+        elif remaining >= MIN_PARTIAL_TOKENS:
+            selected.append({"content": truncate_tokens(passage["content"], remaining), "shingles": shingles})
+            break
+        else:
+            break
+
+    return [passage["content"] for passage in selected]
+
+
+def merge_adjacent_chunks(chunks: list[dict]) -> list[dict]:
+    """
+    Merge runs of consecutive chunks from the same document into single passages.
+
+    Args:
+        chunks: Retrieved chunks
+
+    Returns:
+        Passages with merged content and the best score of their chunks
+    """
+    by_document: dict[str, list[dict]] = {}
+    passages = []
+
+    for chunk in chunks:
+        document_id = (chunk.get("metadata") or {}).get("document_id")
+        if document_id is None or chunk.get("chunk_index") is None:
+            passages.append({"content": chunk.get("content", ""), "score": chunk.get("score", 0)})
+        else:
+            by_document.setdefault(document_id, []).append(chunk)
+
+    for document_chunks in by_document.values():
+        document_chunks.sort(key=lambda chunk: chunk["chunk_index"])
+        current = None
+        for chunk in document_chunks:
+            if current is not None and chunk["chunk_index"] == current["last_index"] + 1:
+                current["content"] = _join_overlapping(current["content"], chunk.get("content", ""))
+                current["score"] = max(current["score"], chunk.get("score", 0))
+                current["last_index"] = chunk["chunk_index"]
+                continue
+            if current is not None and chunk["chunk_index"] == current["last_index"]:
+                continue  # Same chunk returned twice
+            if current is not None:
+                passages.append(current)
+            current = {
+                "content": chunk.get("content", ""),
+                "score": chunk.get("score", 0),
+                "last_index": chunk["chunk_index"]
+            }
+        if current is not None:
+            passages.append(current)
+
+    return passages
+
+
+def _join_overlapping(left: str, right: str) -> str:
+    """Join two consecutive chunks, dropping the prefix of `right` repeated at the end of `left`"""
+    max_overlap = min(len(left), len(right), config.settings.CHUNK_OVERLAP * 2)
+    for size in range(max_overlap, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return left + "\n" + right
+
+
+def _shingles(text: str, size: int = 3) -> set[tuple[str, ...]]:
+    words = text.lower().split()
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _similarity(a: set, b: set) -> float:
+    """Overlap coefficient: catches a short passage contained in a longer one"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
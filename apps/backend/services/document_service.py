@@ -1,22 +1,27 @@
 """
 Document processing service.
-Handles file upload, parsing, chunking, embedding, and storage.
+Handles upload validation, parsing, chunking, embedding, and storage.
+Uploads are processed in the background by services/ingestion_jobs.py;
+parsing and chunking run in a worker pool (utils/process_pool.py).
 """
 
-import uuid
-from datetime import UTC, datetime
+import math
 
 from fastapi import HTTPException, UploadFile
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 import config
-from models.document import (
-    DocumentDeleteResponse,
-    DocumentListItem,
-    DocumentUploadResponse,
+from models.document import DocumentDeleteResponse, DocumentListItem
+from services import answer_cache, embedding_cache, embedding_config, vector_store
+from utils import (
+    extraction,
+    file_parser,
+    metrics,
+    process_pool,
+    resilience,
+    tracing,
+    uploads,
+    vector_codec,
 )
-from services import vector_store
-from utils import file_parser
 
 # File type whitelist
 ALLOWED_CONTENT_TYPES = {
@@ -29,26 +34,23 @@ ALLOWED_CONTENT_TYPES = {
 
 ALLOWED_EXTENSIONS = {".pdf", ".docx", ".xlsx", ".md", ".markdown", ".txt"}
 
+_parser_pool: process_pool.WorkerPool | None = None
 
-async def upload_document(file: UploadFile) -> DocumentUploadResponse:
-    """
-    Process and store an uploaded document.
 
-    Steps:
-    1. Validate file type and size
-    2. Parse file content
-    3. Clean and chunk text
-    4. Generate embeddings
-    5. Store in MongoDB
+def validate_upload(file: UploadFile) -> str:
+    """
+    Validate an uploaded file before it is queued.
+    The content is not read: Starlette has already spooled it to disk and
+    utils/uploads.py bounded its size while it was received.
 
     Args:
         file: Uploaded file from FastAPI
 
     Returns:
-        DocumentUploadResponse with upload status
+        The filename
 
     Raises:
-        HTTPException: If validation or processing fails
+        HTTPException: If services are unavailable or the file is invalid
     """
     if not config.openai_client:
         raise HTTPException(
@@ -64,110 +66,185 @@ async def upload_document(file: UploadFile) -> DocumentUploadResponse:
 
     # Validate file type
     filename = file.filename or "unknown"
-    file_ext = "." + filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
-
-    if file_ext not in ALLOWED_EXTENSIONS:
+    if file_extension(filename) not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
             detail=f"Unsupported file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
         )
 
-    # Read file content
-    file_content = await file.read()
-
     # Validate file size
-    max_size = config.settings.MAX_FILE_SIZE_MB * 1024 * 1024
-    if len(file_content) > max_size:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size: {config.settings.MAX_FILE_SIZE_MB}MB"
-        )
+    tracing.set_attribute("file.size_bytes", file.size)
+    if file.size > uploads.max_file_bytes(file_extension(filename)):
+        raise uploads.too_large(file_extension(filename))
 
-    if len(file_content) == 0:
+    if file.size == 0:
         raise HTTPException(
             status_code=400,
             detail="File is empty"
         )
 
-    try:
-        # Step 1: Parse file
-        raw_text = file_parser.parse_file(file_content, filename)
-        cleaned_text = file_parser.clean_text(raw_text)
+    return filename
+
+
+def file_extension(filename: str) -> str:
+    """Lower-case extension of a filename including the dot ("" if none)"""
+    return "." + filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
 
-        if len(cleaned_text.strip()) < 10:
-            raise HTTPException(
-                status_code=400,
-                detail="File contains insufficient text content"
-            )
 
-        # Step 2: Chunk text
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=config.settings.CHUNK_SIZE,
-            chunk_overlap=config.settings.CHUNK_OVERLAP,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
+def get_parser_pool() -> process_pool.WorkerPool:
+    """Worker pool running parse/clean/chunk, started on first use (PARSER_* settings)"""
+    global _parser_pool
+    if _parser_pool is None:
+        _parser_pool = process_pool.WorkerPool(
+            "parser",
+            mode=config.settings.PARSER_EXECUTOR,
+            workers=config.settings.PARSER_WORKERS,
+            timeout=config.settings.PARSER_TIMEOUT_SECONDS,
+            memory_limit_mb=config.settings.PARSER_MEMORY_LIMIT_MB,
+            max_tasks_per_worker=config.settings.PARSER_MAX_TASKS_PER_WORKER,
+            preload=("utils.extraction",)
         )
+    return _parser_pool
 
-        chunks = text_splitter.split_text(cleaned_text)
 
-        if not chunks:
-            raise HTTPException(
-                status_code=400,
-                detail="Text splitting resulted in no chunks"
+def shutdown_parser_pool() -> None:
+    """Stop the parser workers (at application shutdown)"""
+    global _parser_pool
+    if _parser_pool is not None:
+        _parser_pool.shutdown()
+        _parser_pool = None
+
+
+async def extract_chunks(file_content: file_parser.FileSource, filename: str, destination: str) -> int:
+    """
+    Parse, clean and chunk a document in the parser pool, off the event loop.
+
+    Args:
+        file_content: Raw file bytes or the path of the spooled file
+        filename: Original filename (selects the parser)
+        destination: Path of the file receiving the chunks (one JSON string per line)
+
+    Returns:
+        Number of chunks written
+
+    Raises:
+        ValueError: If the file cannot be parsed, has too little text or
+            needs more memory than PARSER_MEMORY_LIMIT_MB
+        process_pool.TaskTimeout: If parsing ran past PARSER_TIMEOUT_SECONDS
+        process_pool.WorkerCrashed: If the parser worker died
+    """
+    with tracing.span("upload.extract"):
+        tracing.set_attribute("file.type", file_extension(filename).lstrip("."))
+        try:
+            stats = await get_parser_pool().run(
+                extraction.extract_chunks,
+                file_content,
+                filename,
+                config.settings.CHUNK_SIZE,
+                config.settings.CHUNK_OVERLAP,
+                destination
             )
+        except MemoryError:
+            raise ValueError(
+                f"File needs more than {config.settings.PARSER_MEMORY_LIMIT_MB:g}MB of memory to parse"
+            ) from None
+        except Exception as e:
+            metrics.record_error("extract", e)
+            raise
+
+        # Stage timings measured inside the worker
+        for stage, seconds in stats["seconds"].items():
+            metrics.UPLOAD_STAGE_SECONDS.labels(stage=stage).observe(seconds)
+        tracing.set_attribute("text.length", stats["text_length"])
+        tracing.set_attribute("chunk.count", stats["chunk_count"])
+
+    return stats["chunk_count"]
+
+
+def build_chunk_documents(
+    chunks: list[str],
+    embeddings: list[list[float]],
+    document_id: str,
+    filename: str,
+    upload_date: str,
+    first_index: int = 0,
+    total_chunks: int | None = None,
+    field: str | None = None
+) -> list[dict]:
+    """
+    Build the MongoDB documents for a document's chunks.
 
-        # Step 3: Generate embeddings
-        embeddings = await generate_embeddings([chunk for chunk in chunks])
-
-        # Step 4: Prepare document chunks for storage
-        document_id = str(uuid.uuid4())
-        upload_date = datetime.now(UTC).isoformat()
-        file_type = file_ext.lstrip(".")
-
-        chunks_to_insert = []
-        for idx, (chunk_text, embedding) in enumerate(zip(chunks, embeddings)):
-            chunk_doc = {
-                "filename": filename,
-                "chunk_index": idx,
-                "content": chunk_text,
-                "embedding": embedding,
-                "metadata": {
-                    "upload_date": upload_date,
-                    "file_type": file_type,
-                    "total_chunks": len(chunks),
-                    "document_id": document_id
-                }
+    Args:
+        chunks: Chunk texts in document order
+        embeddings: One embedding per chunk
+        document_id: Unique document ID shared by all chunks
+        filename: Original filename
+        upload_date: ISO upload timestamp
+        first_index: Position of the first chunk in the document (for batches)
+        total_chunks: Chunks in the whole document (defaults to len(chunks))
+        field: Embedding field the vectors belong in (defaults to the active field)
+
+    Returns:
+        Chunk documents in the embedding field and active storage format
+    """
+    field = field or embedding_config.field()
+    storage_format = config.settings.EMBEDDING_STORAGE_FORMAT
+    keep_full_precision = (
+        config.settings.EMBEDDING_RESCORE
+        and storage_format in vector_codec.QUANTIZED_FORMATS
+    )
+    file_type = file_extension(filename).lstrip(".")
+
+    total_chunks = len(chunks) if total_chunks is None else total_chunks
+
+    chunk_documents = []
+    for idx, (chunk_text, embedding) in enumerate(zip(chunks, embeddings), start=first_index):
+        chunk_doc = {
+            "filename": filename,
+            "chunk_index": idx,
+            "content": chunk_text,
+            field: vector_codec.encode(embedding, storage_format),
+            "metadata": {
+                "upload_date": upload_date,
+                "file_type": file_type,
+                "total_chunks": total_chunks,
+                "document_id": document_id
             }
-            chunks_to_insert.append(chunk_doc)
+        }
+        if keep_full_precision:
+            chunk_doc[vector_codec.full_precision_field(field)] = vector_codec.encode(embedding, "float32")
+        chunk_documents.append(chunk_doc)
+    return chunk_documents
 
-        # Step 5: Insert into MongoDB
-        await vector_store.insert_chunks(chunks_to_insert)
 
-        return DocumentUploadResponse(
-            id=document_id,
-            filename=filename,
-            status="success",
-            chunk_count=len(chunks),
-            message=f"Document processed into {len(chunks)} chunks"
-        )
+def split_text(text: str) -> list[str]:
+    """
+    Split cleaned document text into overlapping chunks for embedding.
 
-    except HTTPException:
-        raise
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Document processing failed: {e!s}"
-        ) from e
+    Args:
+        text: Cleaned document text
 
+    Returns:
+        Chunks of at most CHUNK_SIZE characters
+    """
+    return extraction.split_text(text, config.settings.CHUNK_SIZE, config.settings.CHUNK_OVERLAP)
 
-async def generate_embeddings(texts: list[str]) -> list[list[float]]:
+
+async def generate_embeddings(
+    texts: list[str],
+    model: str | None = None,
+    dimensions: int | None = None
+) -> list[list[float]]:
     """
     Generate embeddings for a list of texts using OpenAI.
+    Texts embedded before with the same model and dimensions are served by
+    the chunk embedding cache (services/embedding_cache.py); only the rest
+    are sent, each distinct text once.
 
     Args:
         texts: List of text strings to embed
+        model: Embedding model (defaults to the active embedding configuration)
+        dimensions: Output dimensions (defaults to the active embedding configuration)
 
     Returns:
         List of embedding vectors
@@ -175,22 +252,40 @@ async def generate_embeddings(texts: list[str]) -> list[list[float]]:
     if not config.openai_client:
         raise RuntimeError("OpenAI client not available")
 
-    # Batch process embeddings (OpenAI allows up to 2048 inputs per request)
-    batch_size = 100
-    all_embeddings = []
+    model = model or embedding_config.model()
+    if dimensions is None:
+        dimensions = embedding_config.dimensions()
 
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
+    embeddings = await embedding_cache.get_many(texts, model, dimensions)
+    missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
 
-        response = config.openai_client.embeddings.create(
-            input=batch,
-            model=config.settings.EMBEDDING_MODEL
+    # Batch process embeddings (OpenAI allows up to 2048 inputs per request)
+    batch_size = 100
+    created = {}
+
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i:i + batch_size]
+
+        response = await resilience.openai_call(
+            "openai.embeddings",
+            lambda batch=batch: config.openai_client.embeddings.create(
+                input=batch,
+                **embedding_config.embedding_kwargs(model, dimensions)
+            ),
+            timeout=config.settings.OPENAI_EMBEDDING_TIMEOUT_SECONDS
         )
+        usage = getattr(response, "usage", None)
+        metrics.record_tokens("embedding", usage)
 
-        batch_embeddings = [item.embedding for item in response.data]
-        all_embeddings.extend(batch_embeddings)
+        batch_embeddings = dict(zip(batch, (item.embedding for item in response.data)))
+        # Cached per batch so a retry after a failed batch only sends the rest
+        await embedding_cache.put_many(
+            batch_embeddings, model, dimensions, prompt_tokens=getattr(usage, "prompt_tokens", None)
+        )
+        created.update(batch_embeddings)
 
-    return all_embeddings
+    embedding_cache.record_saved_requests(math.ceil(len(texts) / batch_size) - math.ceil(len(missing) / batch_size))
+    return [created[text] if embedding is None else embedding for text, embedding in zip(texts, embeddings)]
 
 
 async def list_documents() -> list[DocumentListItem]:
@@ -237,6 +332,7 @@ async def delete_document(document_id: str) -> DocumentDeleteResponse:
 
     # Delete all chunks
     deleted_count = await vector_store.delete_document(document_id)
+    answer_cache.invalidate()
 
     return DocumentDeleteResponse(
         success=True,
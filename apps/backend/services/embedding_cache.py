@@ -0,0 +1,217 @@
+"""
+Chunk embedding cache.
+Avoids re-embedding text that was embedded before, e.g. when a résumé is
+uploaded again with one line changed.
+
+Entries are content-addressed: the key is a hash of the chunk text and the
+embedding model and dimensions, so identical text is embedded once per
+embedding configuration whichever document it comes from. They are kept in
+EMBEDDING_CACHE_COLLECTION (shared by all replicas, float32 binary vectors,
+expired by a TTL index after EMBEDDING_CACHE_TTL_SECONDS) behind a bounded
+in-process LRU/TTL cache; document_service.generate_embeddings only sends the
+misses to OpenAI.
+"""
+
+import hashlib
+import logging
+from array import array
+from datetime import UTC, datetime
+
+from pymongo import UpdateOne
+
+import config
+from utils import metrics, vector_codec
+from utils.cache import TTLCache, ensure_ttl_index
+
+logger = logging.getLogger(__name__)
+
+# Values are (float32 vector, token count of the text)
+_cache = TTLCache(
+    max_size=config.settings.EMBEDDING_CACHE_SIZE,
+    ttl_seconds=config.settings.EMBEDDING_CACHE_TTL_SECONDS
+)
+
+_shared_hits = 0
+_shared_errors = 0
+_saved_requests = 0
+_saved_tokens = 0
+
+
+def cache_key(text: str, model: str, dimensions: int) -> str:
+    """Build the cache key from the exact chunk text and the embedding model/dimensions"""
+    raw = f"{model}:{dimensions}\n{text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def get_many(texts: list[str], model: str, dimensions: int) -> list[list[float] | None]:
+    """
+    Look up cached embeddings for chunk texts.
+
+    Args:
+        texts: Chunk texts
+        model: Embedding model
+        dimensions: Output dimensions (0 = model default)
+
+    Returns:
+        One embedding per text, None for misses
+    """
+    global _shared_hits, _saved_tokens
+
+    keys = [cache_key(text, model, dimensions) for text in texts]
+    results: list[list[float] | None] = [None] * len(texts)
+    saved_tokens = 0
+
+    missing: dict[str, list[int]] = {}
+    for i, key in enumerate(keys):
+        entry = _cache.get(key)
+        if entry is None:
+            missing.setdefault(key, []).append(i)
+            continue
+        vector, token_count = entry
+        results[i] = vector.tolist()
+        saved_tokens += token_count
+
+    for doc in await _find_shared(list(missing)):
+        _shared_hits += 1
+        vector = vector_codec.decode(doc["embedding"]).tolist()
+        _cache.set(doc["_id"], (array("f", vector), doc["tokens"]))
+        for i in missing[doc["_id"]]:
+            results[i] = list(vector)
+            saved_tokens += doc["tokens"]
+
+    for result in results:
+        metrics.record_cache("chunk_embedding", result is not None)
+    _saved_tokens += saved_tokens
+    metrics.EMBEDDING_CACHE_SAVED_TOKENS.inc(saved_tokens)
+    return results
+
+
+async def put_many(
+    embeddings: dict[str, list[float]],
+    model: str,
+    dimensions: int,
+    prompt_tokens: int | None = None
+) -> None:
+    """
+    Store freshly created embeddings in the local cache and, if enabled, the shared collection.
+
+    Args:
+        embeddings: Embedding vector returned by OpenAI for each chunk text
+        model: Embedding model
+        dimensions: Output dimensions (0 = model default)
+        prompt_tokens: Tokens the request embedding these texts was billed
+            (response.usage), shared among them by length; 0 when unknown
+    """
+    token_counts = _split_tokens(list(embeddings), prompt_tokens or 0)
+    entries = []
+    for (text, embedding), token_count in zip(embeddings.items(), token_counts):
+        key = cache_key(text, model, dimensions)
+        _cache.set(key, (array("f", embedding), token_count))
+        entries.append((key, embedding, token_count))
+    await _store_shared(entries, model, dimensions)
+
+
+def _split_tokens(texts: list[str], total: int) -> list[int]:
+    """Share a request's prompt tokens among its texts in proportion to their length"""
+    if not texts:
+        return []
+    lengths = [len(text) for text in texts]
+    size = sum(lengths) or 1
+    counts = [total * length // size for length in lengths]
+    counts[-1] += total - sum(counts)
+    return counts
+
+
+def record_saved_requests(count: int) -> None:
+    """Count embedding API requests made unnecessary by cache hits"""
+    global _saved_requests
+    _saved_requests += count
+    metrics.EMBEDDING_CACHE_SAVED_REQUESTS.inc(count)
+
+
+def get_stats() -> dict:
+    """
+    Get cache counters for monitoring.
+
+    Returns:
+        Dictionary with local cache stats, shared collection hits/errors and
+        the embedding requests and tokens saved
+    """
+    return {
+        **_cache.stats(),
+        "shared_enabled": _shared_collection() is not None,
+        "shared_hits": _shared_hits,
+        "shared_errors": _shared_errors,
+        "saved_requests": _saved_requests,
+        "saved_tokens": _saved_tokens
+    }
+
+
+async def ensure_indexes() -> None:
+    """Create or update the TTL index expiring shared entries (called at startup)"""
+    collection = _shared_collection()
+    if collection is None:
+        return
+
+    try:
+        await ensure_ttl_index(collection, "created_at", config.settings.EMBEDDING_CACHE_TTL_SECONDS)
+    except Exception as e:  # noqa: BLE001
+        logger.warning("Could not create the shared chunk embedding cache TTL index: %s", e)
+
+
+def _shared_collection():
+    """Get the shared MongoDB cache collection, or None if disabled"""
+    if not config.settings.EMBEDDING_CACHE_COLLECTION or not config.mongodb_client:
+        return None
+
+    db = config.mongodb_client[config.settings.MONGODB_DB_NAME]
+    return db[config.settings.EMBEDDING_CACHE_COLLECTION]
+
+
+async def _find_shared(keys: list[str]) -> list[dict]:
+    """Fetch entries from the shared collection; failures degrade to misses"""
+    global _shared_errors
+
+    collection = _shared_collection()
+    if collection is None or not keys:
+        return []
+
+    try:
+        cursor = collection.find({"_id": {"$in": keys}}, {"embedding": 1, "tokens": 1})
+        return await cursor.to_list(length=None)
+    except Exception as e:  # noqa: BLE001
+        _shared_errors += 1
+        logger.warning("Shared chunk embedding cache lookup failed: %s", e)
+        return []
+
+
+async def _store_shared(entries: list[tuple[str, list[float], int]], model: str, dimensions: int) -> None:
+    """Insert entries missing from the shared collection; failures are logged and ignored"""
+    global _shared_errors
+
+    collection = _shared_collection()
+    if collection is None or not entries:
+        return
+
+    now = datetime.now(UTC)
+    try:
+        await collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": key},
+                    {"$setOnInsert": {
+                        "model": model,
+                        "dimensions": dimensions,
+                        "embedding": vector_codec.encode(embedding, "float32"),
+                        "tokens": token_count,
+                        "created_at": now
+                    }},
+                    upsert=True
+                )
+                for key, embedding, token_count in entries
+            ],
+            ordered=False
+        )
+    except Exception as e:  # noqa: BLE001
+        _shared_errors += 1
+        logger.warning("Shared chunk embedding cache write failed: %s", e)
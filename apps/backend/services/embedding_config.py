@@ -0,0 +1,173 @@
+"""
+Active embedding configuration.
+The model, output dimensions and chunk field that queries and the vector
+index use are kept in one MongoDB document, so a re-embedding migration
+(services/embedding_migration.py) switches every replica over with a single
+atomic update. EMBEDDING_MODEL / EMBEDDING_DIMENSIONS only seed that document;
+without MongoDB they are used directly.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+import config
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_ID = "active"
+DEFAULT_FIELD = "embedding"
+
+# Last known active configuration (refreshed from MongoDB in the background)
+_active: dict = {
+    "model": config.settings.EMBEDDING_MODEL,
+    "dimensions": config.settings.EMBEDDING_DIMENSIONS,
+    "field": DEFAULT_FIELD,
+    "version": 1
+}
+
+_refresh_task: asyncio.Task | None = None
+
+
+def get_collection():
+    """Get the MongoDB collection holding the embedding configuration"""
+    if not config.mongodb_client:
+        raise RuntimeError("MongoDB client not initialized")
+
+    db = config.mongodb_client[config.settings.MONGODB_DB_NAME]
+    return db[config.settings.EMBEDDING_CONFIG_COLLECTION]
+
+
+def model() -> str:
+    """Embedding model of the active configuration"""
+    return _active["model"]
+
+
+def dimensions() -> int:
+    """Output dimensions of the active configuration (0 = model default)"""
+    return _active["dimensions"]
+
+
+def field() -> str:
+    """Chunk field holding embeddings of the active configuration"""
+    return _active["field"]
+
+
+def version() -> int:
+    """Version of the active configuration, incremented by each migration"""
+    return _active["version"]
+
+
+def active() -> dict:
+    """Copy of the active configuration, for work that must use one configuration throughout"""
+    return dict(_active)
+
+
+def embedding_kwargs(model_name: str | None = None, output_dimensions: int | None = None) -> dict:
+    """
+    Build the model/dimensions arguments for embeddings.create.
+
+    Args:
+        model_name: Model override (defaults to the active model)
+        output_dimensions: Dimensions override (defaults to the active dimensions)
+
+    Returns:
+        Keyword arguments; dimensions is omitted when 0 so the model default applies
+    """
+    model_name = model_name or model()
+    if output_dimensions is None:
+        output_dimensions = dimensions()
+
+    kwargs = {"model": model_name}
+    if output_dimensions:
+        kwargs["dimensions"] = output_dimensions
+    return kwargs
+
+
+def apply(doc: dict) -> bool:
+    """
+    Make a stored configuration document the active one.
+
+    Returns:
+        True if the active field changed
+    """
+    global _active
+    previous = _active["field"]
+    _active = {
+        "model": doc.get("model", config.settings.EMBEDDING_MODEL),
+        "dimensions": doc.get("dimensions", 0),
+        "field": doc.get("field", DEFAULT_FIELD),
+        "version": doc.get("version", 1)
+    }
+    return _active["field"] != previous
+
+
+async def load() -> None:
+    """
+    Load the active configuration, creating it from the environment on first run.
+    Called from the main.py lifespan once MongoDB is connected.
+    """
+    collection = get_collection()
+    await collection.update_one(
+        {"_id": ACTIVE_ID},
+        {"$setOnInsert": {
+            "model": config.settings.EMBEDDING_MODEL,
+            "dimensions": config.settings.EMBEDDING_DIMENSIONS,
+            "field": DEFAULT_FIELD,
+            "version": 1
+        }},
+        upsert=True
+    )
+    apply(await collection.find_one({"_id": ACTIVE_ID}))
+
+    if (model(), dimensions()) != (config.settings.EMBEDDING_MODEL, config.settings.EMBEDDING_DIMENSIONS):
+        logger.warning(
+            "Stored embeddings use %s (%s dimensions); EMBEDDING_MODEL / EMBEDDING_DIMENSIONS "
+            "take effect after a re-embedding migration",
+            model(), dimensions() or "default"
+        )
+
+
+def start_refresh(on_switch: Callable[[dict], Awaitable[None]]) -> None:
+    """
+    Poll for switchovers made by a migration on any replica.
+
+    Args:
+        on_switch: Called with the stored configuration when its field differs
+            from the active one; it must apply() the document itself once the
+            vector index for the new field is ready
+    """
+    global _refresh_task
+    if _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_periodically(on_switch))
+
+
+async def stop_refresh() -> None:
+    """Stop polling for configuration changes"""
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
+
+
+async def _refresh_periodically(on_switch: Callable[[dict], Awaitable[None]]) -> None:
+    while True:
+        await asyncio.sleep(config.settings.EMBEDDING_CONFIG_REFRESH_SECONDS)
+        try:
+            doc = await get_collection().find_one({"_id": ACTIVE_ID})
+            if not doc:
+                continue
+            if doc.get("field", DEFAULT_FIELD) == field():
+                apply(doc)
+                continue
+            await on_switch(doc)
+            logger.info(
+                "Switched to embeddings in '%s' (%s, %s dimensions)",
+                field(), model(), dimensions() or "default"
+            )
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Embedding config refresh failed: %s", e)
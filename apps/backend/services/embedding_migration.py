@@ -0,0 +1,359 @@
+"""
+Online re-embedding migration.
+Re-embeds every chunk with a new model and/or output dimensions into a new
+field (embedding_v2, embedding_v3, ...) while searches keep using the active
+field. Once every chunk has the new field, the active configuration document
+is switched in one atomic update and each replica builds the vector index for
+the new field before it starts embedding queries with the new model.
+
+Replicas that have not seen the switch yet keep writing uploads to the old
+field for up to EMBEDDING_CONFIG_REFRESH_SECONDS, so the migration stays
+"finalizing" for EMBEDDING_MIGRATION_SETTLE_SECONDS and then backfills those
+chunks before it is "completed".
+
+Progress lives in the configuration document, so a migration survives pod
+restarts; a lease makes sure only one replica works on it at a time.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import UTC, datetime, timedelta
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+
+import config
+from services import answer_cache, document_service, embedding_config, vector_store
+from utils import vector_codec
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process as the lease holder
+_owner = f"{socket.gethostname()}-{os.getpid()}"
+
+_task: asyncio.Task | None = None
+
+# Statuses of a migration that still has work to do
+ACTIVE_STATUSES = ("running", "finalizing")
+
+# Serializes switchovers started by the migration worker and the config refresh
+_switch_lock = asyncio.Lock()
+
+
+async def start(model: str, dimensions: int) -> dict:
+    """
+    Start re-embedding all chunks with a new model and/or dimensions.
+
+    Args:
+        model: Target embedding model
+        dimensions: Target output dimensions (0 = model default)
+
+    Returns:
+        Migration status
+
+    Raises:
+        HTTPException: 409 if a migration is already running or nothing would change
+    """
+    collection = embedding_config.get_collection()
+    active = await collection.find_one({"_id": embedding_config.ACTIVE_ID}) or {}
+
+    if (active.get("model"), active.get("dimensions")) == (model, dimensions):
+        raise HTTPException(
+            status_code=409,
+            detail="Embeddings already use this model and dimensions"
+        )
+
+    version = active.get("version", 1) + 1
+    migration = {
+        "model": model,
+        "dimensions": dimensions,
+        "field": f"{embedding_config.DEFAULT_FIELD}_v{version}",
+        "version": version,
+        "status": "running",
+        "migrated": 0,
+        "started_at": datetime.now(UTC).isoformat(),
+        "owner": None,
+        "lease_until": None
+    }
+
+    result = await collection.update_one(
+        {"_id": embedding_config.ACTIVE_ID, "migration.status": {"$nin": list(ACTIVE_STATUSES)}},
+        {"$set": {"migration": migration}}
+    )
+    if result.modified_count == 0:
+        raise HTTPException(
+            status_code=409,
+            detail="A re-embedding migration is already running"
+        )
+
+    _ensure_running()
+    return await get_status()
+
+
+async def get_status() -> dict:
+    """
+    Get the active embedding configuration and the latest migration.
+
+    Returns:
+        Dictionary with the active model/dimensions/field and migration progress
+    """
+    collection = embedding_config.get_collection()
+    doc = await collection.find_one({"_id": embedding_config.ACTIVE_ID}) or {}
+    migration = doc.get("migration")
+
+    if migration:
+        chunks = await vector_store.get_collection()
+        migration = {
+            key: value for key, value in migration.items()
+            if key not in ("owner", "lease_until")
+        }
+        migration["remaining"] = await chunks.count_documents(
+            {migration["field"]: {"$exists": False}}
+        )
+
+    return {
+        "active": {
+            "model": doc.get("model", embedding_config.model()),
+            "dimensions": doc.get("dimensions", embedding_config.dimensions()),
+            "field": doc.get("field", embedding_config.field()),
+            "version": doc.get("version", embedding_config.version())
+        },
+        "migration": migration
+    }
+
+
+async def resume() -> None:
+    """
+    Pick up a migration left running by a restarted pod.
+    Called from the main.py lifespan once MongoDB and OpenAI are available.
+    """
+    doc = await embedding_config.get_collection().find_one({"_id": embedding_config.ACTIVE_ID})
+    if doc and (doc.get("migration") or {}).get("status") in ACTIVE_STATUSES:
+        logger.info("Resuming re-embedding migration to '%s'", doc["migration"]["field"])
+        _ensure_running()
+
+
+async def stop() -> None:
+    """Stop this replica's migration worker (the lease expires and another replica resumes)"""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+async def apply_switch(doc: dict) -> None:
+    """
+    Switch this replica to a configuration document a migration activated.
+
+    The vector index for the new field is built first while searches keep
+    using the old one. The configuration, the searched index and the answer
+    cache then change with no await in between, so queries are never
+    embedded with the new model and searched against the old index.
+
+    Args:
+        doc: Stored embedding configuration document
+    """
+    async with _switch_lock:
+        if doc.get("field") == embedding_config.field():
+            return
+        index = await vector_store.build_index(doc["field"])
+        embedding_config.apply(doc)
+        answer_cache.invalidate()
+        await vector_store.use_index(index)
+
+
+def _ensure_running() -> None:
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_run())
+
+
+async def _run() -> None:
+    """Worker loop: hold the lease, backfill the new field, then switch over"""
+    try:
+        while True:
+            migration = await _acquire_lease()
+            if migration is None:
+                return
+            if migration == "busy":
+                await asyncio.sleep(config.settings.EMBEDDING_MIGRATION_LEASE_SECONDS)
+                continue
+
+            if migration["status"] == "finalizing":
+                # Wait (renewing the lease) until every replica has switched and
+                # finished the upload batches it embedded for the old field
+                settle = datetime.fromisoformat(migration["switched_at"]) + timedelta(
+                    seconds=config.settings.EMBEDDING_MIGRATION_SETTLE_SECONDS
+                )
+                remaining = (settle - datetime.now(UTC)).total_seconds()
+                if remaining > 0:
+                    await asyncio.sleep(min(remaining, config.settings.EMBEDDING_MIGRATION_LEASE_SECONDS / 2))
+                    continue
+                await _backfill(migration, final=True)
+                await _complete(migration)
+                logger.info("Re-embedding migration to '%s' complete", migration["field"])
+                return
+
+            migrated = await _backfill(migration)
+            if migrated is None:
+                continue  # Lease lost mid-run; re-check who owns it
+
+            doc = await _switch(migration)
+            if doc is None:
+                return
+            await apply_switch(doc)
+            logger.info(
+                "Re-embedding migration switched to '%s' (%s, %s dimensions)",
+                migration["field"], migration["model"], migration["dimensions"] or "default"
+            )
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.exception("Re-embedding migration failed")
+        await embedding_config.get_collection().update_one(
+            {"_id": embedding_config.ACTIVE_ID, "migration.owner": _owner},
+            {"$set": {"migration.status": "failed", "migration.error": str(e)}}
+        )
+
+
+async def _acquire_lease() -> dict | str | None:
+    """
+    Take or renew the migration lease.
+
+    Returns:
+        The running migration if this replica holds the lease, "busy" if
+        another replica does, or None when no migration is running
+    """
+    now = datetime.now(UTC)
+    lease_until = now + timedelta(seconds=config.settings.EMBEDDING_MIGRATION_LEASE_SECONDS)
+    collection = embedding_config.get_collection()
+
+    doc = await collection.find_one_and_update(
+        {
+            "_id": embedding_config.ACTIVE_ID,
+            "migration.status": {"$in": list(ACTIVE_STATUSES)},
+            "$or": [
+                {"migration.owner": _owner},
+                {"migration.lease_until": None},
+                {"migration.lease_until": {"$lt": now}}
+            ]
+        },
+        {"$set": {"migration.owner": _owner, "migration.lease_until": lease_until}},
+        return_document=ReturnDocument.AFTER
+    )
+    if doc is not None:
+        return doc["migration"]
+
+    doc = await collection.find_one({"_id": embedding_config.ACTIVE_ID})
+    if doc and (doc.get("migration") or {}).get("status") in ACTIVE_STATUSES:
+        return "busy"
+    return None
+
+
+async def _backfill(migration: dict, final: bool = False) -> int | None:
+    """
+    Embed every chunk missing the migration's field.
+
+    Returns:
+        Number of chunks embedded, or None if the lease was lost
+    """
+    chunks = await vector_store.get_collection()
+    target = migration["field"]
+    storage_format = config.settings.EMBEDDING_STORAGE_FORMAT
+    keep_full_precision = (
+        config.settings.EMBEDDING_RESCORE
+        and storage_format in vector_codec.QUANTIZED_FORMATS
+    )
+    total = 0
+
+    while True:
+        batch = await chunks.find(
+            {target: {"$exists": False}},
+            {"_id": 1, "content": 1}
+        ).limit(config.settings.EMBEDDING_MIGRATION_BATCH_SIZE).to_list(length=None)
+        if not batch:
+            return total
+
+        embeddings = await document_service.generate_embeddings(
+            [chunk.get("content") or "" for chunk in batch],
+            model=migration["model"],
+            dimensions=migration["dimensions"]
+        )
+
+        updates = []
+        for chunk, embedding in zip(batch, embeddings):
+            fields = {target: vector_codec.encode(embedding, storage_format)}
+            if keep_full_precision:
+                fields[vector_codec.full_precision_field(target)] = vector_codec.encode(embedding, "float32")
+            updates.append(UpdateOne({"_id": chunk["_id"]}, {"$set": fields}))
+        await chunks.bulk_write(updates, ordered=False)
+        total += len(batch)
+
+        if final:
+            continue
+
+        # Record progress and renew the lease in one write
+        result = await embedding_config.get_collection().update_one(
+            {"_id": embedding_config.ACTIVE_ID, "migration.owner": _owner, "migration.status": "running"},
+            {
+                "$inc": {"migration.migrated": len(batch)},
+                "$set": {"migration.lease_until": datetime.now(UTC) + timedelta(
+                    seconds=config.settings.EMBEDDING_MIGRATION_LEASE_SECONDS
+                )}
+            }
+        )
+        if result.modified_count == 0:
+            return None
+
+
+async def _switch(migration: dict) -> dict | None:
+    """
+    Atomically make the migration's field the active one.
+
+    Returns:
+        The updated configuration document if this replica performed the
+        switch (apply it with apply_switch), otherwise None
+    """
+    collection = embedding_config.get_collection()
+    result = await collection.update_one(
+        {
+            "_id": embedding_config.ACTIVE_ID,
+            "migration.field": migration["field"],
+            "migration.owner": _owner,
+            "migration.status": "running"
+        },
+        {"$set": {
+            "model": migration["model"],
+            "dimensions": migration["dimensions"],
+            "field": migration["field"],
+            "version": migration["version"],
+            "migration.status": "finalizing",
+            "migration.switched_at": datetime.now(UTC).isoformat()
+        }}
+    )
+    if result.modified_count == 0:
+        return None
+
+    return await collection.find_one({"_id": embedding_config.ACTIVE_ID})
+
+
+async def _complete(migration: dict) -> None:
+    """Mark a finalized migration completed"""
+    await embedding_config.get_collection().update_one(
+        {
+            "_id": embedding_config.ACTIVE_ID,
+            "migration.field": migration["field"],
+            "migration.owner": _owner,
+            "migration.status": "finalizing"
+        },
+        {"$set": {
+            "migration.status": "completed",
+            "migration.completed_at": datetime.now(UTC).isoformat()
+        }}
+    )
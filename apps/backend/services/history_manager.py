@@ -0,0 +1,167 @@
+"""
+Conversation history compaction.
+Keeps the history sent to GPT within a token budget so per-turn prompt size
+(and latency) stays flat as a conversation grows.
+
+The most recent turns are kept verbatim. Older turns are folded into a
+rolling summary that is cached per conversation. Folding happens in blocks
+(down to HISTORY_KEEP_RECENT_TOKENS) so a summarization call is only needed
+every few turns rather than on every request.
+"""
+
+import hashlib
+import json
+import logging
+
+import config
+from models.chat import ChatMessage
+from utils import metrics, resilience
+from utils.cache import TTLCache
+from utils.tokens import count_message_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """Summarize the conversation below between a website visitor and an AI assistant for Draco Cheng's portfolio.
+Keep the visitor's questions, any facts the assistant stated, and open follow-ups. Be concise and factual."""
+
+# conversation key -> {"folded": int, "prefix_hash": str, "summary": str}
+_summaries = TTLCache(
+    max_size=config.settings.HISTORY_SUMMARY_CACHE_SIZE,
+    ttl_seconds=config.settings.HISTORY_SUMMARY_TTL_SECONDS
+)
+
+_summarize_calls = 0
+_summarize_failures = 0
+
+
+async def compact_history(
+    history: list[ChatMessage],
+    conversation_id: str | None = None
+) -> list[dict]:
+    """
+    Fit conversation history into HISTORY_MAX_TOKENS.
+
+    Args:
+        history: Full conversation history from the client
+        conversation_id: Client-supplied conversation ID (optional)
+
+    Returns:
+        Message dictionaries: an optional summary system message followed by recent turns
+    """
+    messages = [{"role": msg.role, "content": msg.content} for msg in history]
+    if not messages or count_message_tokens(messages) <= config.settings.HISTORY_MAX_TOKENS:
+        return messages
+
+    key = _conversation_key(messages, conversation_id)
+    state = _summaries.get(key)
+
+    # Reuse the cached summary if its prefix still matches and the rest fits
+    if state and state["prefix_hash"] == _prefix_hash(messages, state["folded"]):
+        compacted = [_summary_message(state["summary"])] + messages[state["folded"]:]
+        if count_message_tokens(compacted) <= config.settings.HISTORY_MAX_TOKENS:
+            metrics.record_cache("history_summary", True)
+            return compacted
+    else:
+        state = None
+    metrics.record_cache("history_summary", False)
+
+    # Fold older turns until the recent ones fit the smaller "keep" budget
+    fold_at = _fold_point(messages)
+    folded_from = state["folded"] if state else 0
+    previous_summary = state["summary"] if state else ""
+
+    summary = await _summarize(previous_summary, messages[folded_from:fold_at])
+    if summary is None:
+        # Summarization failed: keep recent turns only
+        return _fit_recent(messages[fold_at:])
+
+    _summaries.set(key, {
+        "folded": fold_at,
+        "prefix_hash": _prefix_hash(messages, fold_at),
+        "summary": summary
+    })
+    return [_summary_message(summary)] + _fit_recent(messages[fold_at:])
+
+
+def get_stats() -> dict:
+    """
+    Get summary cache counters for monitoring.
+
+    Returns:
+        Dictionary with cache stats and summarization call counts
+    """
+    return {
+        **_summaries.stats(),
+        "summarize_calls": _summarize_calls,
+        "summarize_failures": _summarize_failures
+    }
+
+
+def _conversation_key(messages: list[dict], conversation_id: str | None) -> str:
+    """Use the client's conversation ID, or fall back to the opening message"""
+    if conversation_id:
+        return f"id:{conversation_id}"
+    return "first:" + _prefix_hash(messages, 1)
+
+
+def _prefix_hash(messages: list[dict], count: int) -> str:
+    payload = json.dumps([[m["role"], m["content"]] for m in messages[:count]])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _fold_point(messages: list[dict]) -> int:
+    """Index of the first message kept verbatim (always keeps at least the last message)"""
+    budget = config.settings.HISTORY_KEEP_RECENT_TOKENS
+    fold_at = len(messages) - 1
+    while fold_at > 0 and count_message_tokens(messages[fold_at - 1:]) <= budget:
+        fold_at -= 1
+    return fold_at
+
+
+def _fit_recent(messages: list[dict]) -> list[dict]:
+    """Truncate the oldest kept message if a single long turn blows the budget"""
+    budget = config.settings.HISTORY_KEEP_RECENT_TOKENS
+    if len(messages) == 1 and count_message_tokens(messages) > budget:
+        return [{**messages[0], "content": truncate_tokens(messages[0]["content"], budget)}]
+    return messages
+
+
+def _summary_message(summary: str) -> dict:
+    return {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+
+
+async def _summarize(previous_summary: str, messages: list[dict]) -> str | None:
+    """Fold messages into the rolling summary with a short GPT call"""
+    global _summarize_calls, _summarize_failures
+
+    if not config.openai_client:
+        return None
+
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    if previous_summary:
+        transcript = f"Earlier summary:\n{previous_summary}\n\nNew messages:\n{transcript}"
+
+    _summarize_calls += 1
+    try:
+        # No retries: on failure the older turns are simply dropped
+        response = await resilience.openai_call(
+            "openai.history_summary",
+            lambda: config.openai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": transcript}
+                ],
+                temperature=0,
+                max_tokens=config.settings.HISTORY_SUMMARY_MAX_TOKENS
+            ),
+            timeout=config.settings.OPENAI_COMPLETION_TIMEOUT_SECONDS,
+            retries=0
+        )
+        metrics.record_tokens("history_summary", getattr(response, "usage", None))
+        return response.choices[0].message.content
+    except Exception as e:  # noqa: BLE001
+        _summarize_failures += 1
+        metrics.record_error("history_summary", e)
+        logger.warning("History summarization failed: %s", e)
+        return None
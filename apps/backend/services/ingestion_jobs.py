@@ -0,0 +1,400 @@
+"""
+Background ingestion of uploaded documents.
+
+An upload is stored and answered with a job ID straight away; a bounded pool
+of worker tasks then parses, embeds and stores it. Job state lives in MongoDB
+(the uploaded file and the parsed chunks in GridFS), so a job interrupted by
+a pod restart is resumed by any replica from its last completed stage once
+its lease expires:
+
+    queued -> parsing -> embedding -> done
+                                   \\-> failed
+
+Parsing streams the document into a file of chunks; the chunks are then
+read back, embedded and inserted in batches of PROGRESS_BATCH_SIZE, so a
+job holds one batch of chunks and vectors in memory at a time.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+from typing import BinaryIO
+
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+
+import config
+from services import answer_cache, document_service, embedding_config, vector_store
+from utils import metrics, resilience, tracing
+
+logger = logging.getLogger(__name__)
+
+# Statuses of a job that still has work to do
+ACTIVE_STATUSES = ("queued", "parsing", "embedding")
+
+# Fields kept internal to the job store
+PRIVATE_FIELDS = ("owner", "lease_until", "file_id", "chunks_file_id")
+
+# Chunks embedded and inserted at a time, between two progress updates
+PROGRESS_BATCH_SIZE = 100
+
+# Identifies this process as a lease holder
+_owner = f"{socket.gethostname()}-{os.getpid()}"
+
+_workers: list[asyncio.Task] = []
+_wakeup: asyncio.Event | None = None
+
+
+class LeaseLost(Exception):
+    """Another replica took over the job (this one stalled past its lease)"""
+
+
+class JobStore(ABC):
+    """Persistence of jobs and their payloads"""
+
+    @abstractmethod
+    async def create(self, job: dict, source: BinaryIO) -> None:
+        """Store a new job together with the uploaded file (streamed from `source`)"""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> dict | None:
+        """Fetch a job by id (None if it does not exist)"""
+
+    @abstractmethod
+    async def claim(self, owner: str, lease_until: datetime) -> dict | None:
+        """Take the oldest active job that nobody holds a live lease on"""
+
+    @abstractmethod
+    async def update(self, job_id: str, owner: str, fields: dict) -> bool:
+        """Update a job held by `owner`; False if the lease was lost"""
+
+    @abstractmethod
+    async def load_file(self, job: dict, destination: BinaryIO) -> None:
+        """Stream the job's uploaded file into `destination`"""
+
+    @abstractmethod
+    async def save_chunks(self, job: dict, source: BinaryIO) -> dict:
+        """Checkpoint parsed chunks (JSON lines streamed from `source`); returns fields to record on the job"""
+
+    @abstractmethod
+    async def load_chunks(self, job: dict, destination: BinaryIO) -> None:
+        """Stream the job's parsed chunks (JSON lines) into `destination`"""
+
+    @abstractmethod
+    async def delete_payload(self, job: dict) -> None:
+        """Drop the stored file and chunks of a finished job"""
+
+
+class MongoJobStore(JobStore):
+    """Jobs in INGESTION_JOBS_COLLECTION, files and chunks in a GridFS bucket"""
+
+    def _collection(self):
+        if not config.mongodb_client:
+            raise RuntimeError("MongoDB client not initialized")
+
+        db = config.mongodb_client[config.settings.MONGODB_DB_NAME]
+        return db[config.settings.INGESTION_JOBS_COLLECTION]
+
+    def _bucket(self) -> AsyncIOMotorGridFSBucket:
+        db = config.mongodb_client[config.settings.MONGODB_DB_NAME]
+        return AsyncIOMotorGridFSBucket(db, bucket_name=config.settings.INGESTION_JOBS_COLLECTION)
+
+    async def create(self, job: dict, source: BinaryIO) -> None:
+        job["file_id"] = await self._bucket().upload_from_stream(job["filename"], source)
+        await self._collection().insert_one(job)
+
+    async def get(self, job_id: str) -> dict | None:
+        collection = self._collection()
+        return await resilience.mongodb_call("mongodb.get_job", lambda: collection.find_one({"_id": job_id}))
+
+    async def claim(self, owner: str, lease_until: datetime) -> dict | None:
+        return await self._collection().find_one_and_update(
+            {
+                "status": {"$in": list(ACTIVE_STATUSES)},
+                "$or": [{"lease_until": None}, {"lease_until": {"$lt": datetime.now(UTC)}}]
+            },
+            {"$set": {"owner": owner, "lease_until": lease_until}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def update(self, job_id: str, owner: str, fields: dict) -> bool:
+        result = await self._collection().update_one({"_id": job_id, "owner": owner}, {"$set": fields})
+        return result.matched_count == 1
+
+    async def load_file(self, job: dict, destination: BinaryIO) -> None:
+        await self._bucket().download_to_stream(job["file_id"], destination)
+
+    async def save_chunks(self, job: dict, source: BinaryIO) -> dict:
+        chunks_file_id = await self._bucket().upload_from_stream(f"{job['_id']}.chunks.jsonl", source)
+        return {"chunks_file_id": chunks_file_id}
+
+    async def load_chunks(self, job: dict, destination: BinaryIO) -> None:
+        await self._bucket().download_to_stream(job["chunks_file_id"], destination)
+
+    async def delete_payload(self, job: dict) -> None:
+        bucket = self._bucket()
+        for key in ("file_id", "chunks_file_id"):
+            if job.get(key) is not None:
+                try:
+                    await bucket.delete(job[key])
+                except Exception as e:  # noqa: BLE001
+                    logger.warning("Could not delete %s of ingestion job %s: %s", key, job["_id"], e)
+
+
+_store: JobStore = MongoJobStore()
+
+
+async def submit(filename: str, source: BinaryIO, size_bytes: int) -> dict:
+    """
+    Queue an uploaded document for background processing.
+
+    Args:
+        filename: Original filename
+        source: Validated file content (read in chunks, never as a whole)
+        size_bytes: File size
+
+    Returns:
+        The queued job
+    """
+    now = datetime.now(UTC).isoformat()
+    job = {
+        "_id": str(uuid.uuid4()),
+        "document_id": str(uuid.uuid4()),
+        "filename": filename,
+        "size_bytes": size_bytes,
+        "status": "queued",
+        "chunk_count": None,
+        "chunks_embedded": 0,
+        "attempts": 0,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        "owner": None,
+        "lease_until": None
+    }
+    with metrics.upload_stage("read"):
+        tracing.set_attribute("file.size_bytes", size_bytes)
+        await _store.create(job, source)
+
+    if _wakeup is not None:
+        _wakeup.set()
+    return public_view(job)
+
+
+async def get_job(job_id: str) -> dict | None:
+    """
+    Get a job's status and progress.
+
+    Returns:
+        The job, or None if it does not exist
+    """
+    job = await _store.get(job_id)
+    return public_view(job) if job else None
+
+
+def public_view(job: dict) -> dict:
+    """A job without the store's internal fields, with `id` instead of `_id`"""
+    view = {key: value for key, value in job.items() if key not in PRIVATE_FIELDS and key != "_id"}
+    return {"id": job["_id"], **view}
+
+
+def start() -> None:
+    """
+    Start the worker pool (INGESTION_WORKERS tasks).
+    Called from the main.py lifespan; picks up jobs left by restarted pods.
+    """
+    global _wakeup
+    if _workers:
+        return
+    _wakeup = asyncio.Event()
+    for _ in range(max(1, config.settings.INGESTION_WORKERS)):
+        _workers.append(asyncio.create_task(_worker()))
+    logger.info("Started %d ingestion workers", len(_workers))
+
+
+async def stop() -> None:
+    """Stop the workers; unfinished jobs are resumed after their lease expires"""
+    global _wakeup
+    for task in _workers:
+        task.cancel()
+    for task in _workers:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _workers.clear()
+    _wakeup = None
+
+
+def _lease_until() -> datetime:
+    return datetime.now(UTC) + timedelta(seconds=config.settings.INGESTION_LEASE_SECONDS)
+
+
+async def _worker() -> None:
+    """Claim and process jobs one at a time; sleep until woken or the poll interval passes"""
+    while True:
+        _wakeup.clear()
+        try:
+            job = await _store.claim(_owner, _lease_until())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Could not claim ingestion job: %s", e)
+            job = None
+
+        if job is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), config.settings.INGESTION_POLL_SECONDS)
+            except TimeoutError:
+                pass
+            continue
+
+        await _process(job)
+
+
+async def _update(job: dict, **fields) -> None:
+    """Record progress on a job and renew its lease"""
+    fields["updated_at"] = datetime.now(UTC).isoformat()
+    fields["lease_until"] = _lease_until()
+    if not await _store.update(job["_id"], _owner, fields):
+        raise LeaseLost(job["_id"])
+    job.update(fields)
+
+
+async def _process(job: dict) -> None:
+    """Run a claimed job from its current stage to done or failed"""
+    logger.info("Processing ingestion job %s (%s, %s)", job["_id"], job["filename"], job["status"])
+    try:
+        with tracing.span("upload.job", **{"job.status": job["status"]}), \
+                resilience.deadline(config.settings.UPLOAD_DEADLINE_SECONDS):
+            await _run_stages(job)
+    except asyncio.CancelledError:
+        # Shutting down: hand the job to the next replica without waiting for the lease
+        try:
+            await _store.update(job["_id"], _owner, {"lease_until": None})
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Could not release ingestion job %s: %s", job["_id"], e)
+        raise
+    except LeaseLost:
+        logger.warning("Lost the lease on ingestion job %s", job["_id"])
+    except Exception as e:  # noqa: BLE001
+        await _handle_failure(job, e)
+
+
+async def _run_stages(job: dict) -> None:
+    # A job that keeps taking its worker down (e.g. OOM while parsing) must not be retried forever
+    if job.get("attempts", 0) >= config.settings.INGESTION_MAX_ATTEMPTS:
+        raise RuntimeError(f"Gave up after {job['attempts']} attempts")
+
+    with tempfile.NamedTemporaryFile(suffix=".jsonl") as chunks_file:
+        if job["status"] in ("queued", "parsing"):
+            await _update(job, status="parsing", attempts=job.get("attempts", 0) + 1)
+            # Parsers read the file from disk rather than from a copy in memory
+            suffix = document_service.file_extension(job["filename"])
+            with tempfile.NamedTemporaryFile(suffix=suffix) as spool:
+                await _store.load_file(job, spool)
+                spool.flush()
+                chunk_count = await document_service.extract_chunks(spool.name, job["filename"], chunks_file.name)
+            checkpoint = await _store.save_chunks(job, chunks_file)
+            await _update(job, status="embedding", chunk_count=chunk_count, chunks_embedded=0, **checkpoint)
+        else:
+            await _store.load_chunks(job, chunks_file)
+            chunks_file.flush()
+            await _update(job, attempts=job.get("attempts", 0) + 1)
+
+            # Embedding resumes from the parsed chunks; chunks a crashed attempt
+            # already inserted are removed first so none are duplicated (always:
+            # a batch inserted just before a crash is not in chunks_embedded yet)
+            await vector_store.delete_document(job["document_id"])
+            await _update(job, chunks_embedded=0)
+
+        chunks_file.seek(0)
+        await _embed_and_store(job, chunks_file)
+
+    answer_cache.invalidate()
+
+    await _update(job, status="done", error=None)
+    await _store.delete_payload(job)
+    logger.info("Ingestion job %s done: %d chunks", job["_id"], job["chunk_count"])
+
+
+async def _embed_and_store(job: dict, chunks_file: BinaryIO) -> None:
+    """Embed and insert the chunks of a JSON-lines file, PROGRESS_BATCH_SIZE at a time"""
+    embedded = 0
+    for batch in _read_batches(chunks_file, PROGRESS_BATCH_SIZE):
+        # Vectors go in the field of the configuration they were embedded
+        # with, even if a migration switches over while they are created
+        active = embedding_config.active()
+        with metrics.upload_stage("embed"):
+            tracing.set_attribute("chunk.count", len(batch))
+            embeddings = await document_service.generate_embeddings(
+                batch, model=active["model"], dimensions=active["dimensions"]
+            )
+
+        chunk_documents = document_service.build_chunk_documents(
+            batch, embeddings, job["document_id"], job["filename"], job["created_at"],
+            first_index=embedded, total_chunks=job["chunk_count"], field=active["field"]
+        )
+        with metrics.upload_stage("insert"):
+            tracing.set_attribute("chunk.count", len(chunk_documents))
+            await vector_store.insert_chunks(chunk_documents)
+
+        embedded += len(batch)
+        await _update(job, chunks_embedded=embedded)
+
+
+def _read_batches(chunks_file: BinaryIO, size: int) -> Iterator[list[str]]:
+    """Read a JSON-lines chunks file in lists of up to `size` chunks"""
+    batch = []
+    for line in chunks_file:
+        batch.append(json.loads(line))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _handle_failure(job: dict, error: Exception) -> None:
+    """Retry transient failures after a backoff; fail the job otherwise"""
+    transient = isinstance(error, resilience.ResilienceError) or resilience.is_transient(error)
+    attempts = job.get("attempts", 0)
+    try:
+        if transient and 0 < attempts < config.settings.INGESTION_MAX_ATTEMPTS:
+            logger.warning("Ingestion job %s failed (attempt %d), will retry: %s", job["_id"], attempts, error)
+            # Keep the stage; the job is claimable again once the backoff lease expires
+            await _store.update(job["_id"], _owner, {
+                "error": str(error),
+                "updated_at": datetime.now(UTC).isoformat(),
+                "lease_until": datetime.now(UTC) + timedelta(
+                    seconds=config.settings.INGESTION_POLL_SECONDS * 2 ** attempts
+                )
+            })
+            return
+
+        if not isinstance(error, ValueError):
+            logger.error("Ingestion job %s failed: %s", job["_id"], error, exc_info=error)
+        metrics.record_error("upload_job", error)
+        await _store.update(job["_id"], _owner, {
+            "status": "failed",
+            "error": str(error),
+            "updated_at": datetime.now(UTC).isoformat()
+        })
+        await _store.delete_payload(job)
+    except Exception as e:  # noqa: BLE001
+        logger.warning("Could not record failure of ingestion job %s: %s", job["_id"], e)
+        return
+
+    # A failed document must not stay half searchable
+    try:
+        await vector_store.delete_document(job["document_id"])
+    except Exception as e:  # noqa: BLE001
+        logger.warning("Could not delete chunks of failed ingestion job %s: %s", job["_id"], e)
@@ -0,0 +1,242 @@
+"""
+Lexical (BM25) index over chunk content.
+Complements vector search for exact-term queries such as company or
+technology names, and lets decisive exact matches skip the embedding call.
+
+The index is built from MongoDB at startup and updated by
+vector_store.insert_chunks / delete_document and the change stream.
+"""
+
+import logging
+import math
+import re
+from collections import Counter
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Keeps tech names such as "c++", "c#", "node.js" and "ci-cd" as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[.\-][a-z0-9+#]+)*")
+
+STOPWORDS = frozenset({
+    "a", "about", "an", "and", "are", "as", "at", "be", "by", "can", "did", "do", "does",
+    "for", "from", "has", "have", "he", "her", "his", "how", "i", "in", "is", "it", "its",
+    "me", "my", "of", "on", "or", "our", "she", "so", "tell", "that", "the", "their", "them",
+    "they", "this", "to", "was", "we", "were", "what", "when", "where", "which", "who", "why",
+    "will", "with", "you", "your"
+})
+
+# Fields kept per chunk so lexical hits can be returned like vector results
+RESULT_FIELDS = ("_id", "filename", "chunk_index", "content", "metadata")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase and split text into index terms, dropping stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict] = {}        # term -> {chunk _id: term frequency}
+        self._lengths: dict = {}                     # chunk _id -> token count
+        self._docs: dict = {}                        # chunk _id -> result fields
+        self._document_chunks: dict[str, set] = {}   # document_id -> chunk _ids
+        self._total_length = 0
+
+    def add(self, chunks: list[dict]) -> None:
+        """Index chunks (each must include _id and content); re-adding is a no-op"""
+        for chunk in chunks:
+            chunk_id = chunk.get("_id")
+            if chunk_id is None or chunk_id in self._docs:
+                continue
+
+            terms = Counter(tokenize(chunk.get("content", "")))
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[chunk_id] = frequency
+
+            length = sum(terms.values())
+            self._lengths[chunk_id] = length
+            self._total_length += length
+            self._docs[chunk_id] = {field: chunk.get(field) for field in RESULT_FIELDS}
+            document_id = (chunk.get("metadata") or {}).get("document_id")
+            self._document_chunks.setdefault(document_id, set()).add(chunk_id)
+
+    def remove(self, chunk_id) -> None:
+        """Remove a single chunk"""
+        doc = self._docs.pop(chunk_id, None)
+        if doc is None:
+            return
+
+        for term in set(tokenize(doc.get("content") or "")):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+
+        self._total_length -= self._lengths.pop(chunk_id, 0)
+        document_id = (doc.get("metadata") or {}).get("document_id")
+        chunk_ids = self._document_chunks.get(document_id)
+        if chunk_ids is not None:
+            chunk_ids.discard(chunk_id)
+            if not chunk_ids:
+                del self._document_chunks[document_id]
+
+    def remove_document(self, document_id: str) -> None:
+        """Remove all chunks of a document"""
+        for chunk_id in list(self._document_chunks.get(document_id, ())):
+            self.remove(chunk_id)
+
+    def clear(self) -> None:
+        """Remove every chunk"""
+        self._postings.clear()
+        self._lengths.clear()
+        self._docs.clear()
+        self._document_chunks.clear()
+        self._total_length = 0
+
+    def search(self, query: str, top_k: int = 5) -> list[dict]:
+        """
+        Rank chunks by BM25 score.
+
+        Returns:
+            Chunks (result fields plus `lexical_score` and `matched_terms`), best first
+        """
+        terms = set(tokenize(query))
+        if not terms or not self._docs:
+            return []
+
+        total = len(self._docs)
+        avg_length = self._total_length / total if total else 0
+        scores: dict = {}
+        matched: dict = {}
+
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / (avg_length or 1))
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+                matched[chunk_id] = matched.get(chunk_id, 0) + 1
+
+        ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        return [
+            {**self._docs[chunk_id], "lexical_score": scores[chunk_id], "matched_terms": matched[chunk_id]}
+            for chunk_id in ranked
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "chunks": len(self._docs),
+            "documents": len(self._document_chunks),
+            "terms": len(self._postings)
+        }
+
+
+_index = BM25Index()
+
+
+def enabled() -> bool:
+    return config.settings.LEXICAL_SEARCH_ENABLED
+
+
+async def load(collection) -> None:
+    """Build the index from every chunk stored in MongoDB"""
+    _index.clear()
+    batch = []
+    async for chunk in collection.find({}, {field: 1 for field in RESULT_FIELDS}):
+        batch.append(chunk)
+        if len(batch) >= 500:
+            _index.add(batch)
+            batch = []
+    _index.add(batch)
+    logger.info("Lexical index loaded %d chunks", _index.stats()["chunks"])
+
+
+def add(chunks: list[dict]) -> None:
+    if enabled():
+        _index.add(chunks)
+
+
+def remove(chunk_id) -> None:
+    if enabled():
+        _index.remove(chunk_id)
+
+
+def remove_document(document_id: str) -> None:
+    if enabled():
+        _index.remove_document(document_id)
+
+
+def search(query: str, top_k: int = 5) -> list[dict]:
+    """BM25 search; returns an empty list when lexical search is disabled"""
+    if not enabled():
+        return []
+    return _index.search(query, top_k)
+
+
+def fast_path(query: str, top_k: int = 5) -> list[dict] | None:
+    """
+    Return lexical results when they decisively answer the query on their own.
+
+    A short query is decisive when its best hit contains every query term (at
+    least LEXICAL_FAST_PATH_MIN_TERMS of them), scores at least
+    LEXICAL_FAST_PATH_MIN_SCORE, which only terms that are rare in the corpus
+    reach, and outscores the best partial match by LEXICAL_FAST_PATH_MARGIN.
+    A single word or words found in most chunks ("experience") never are.
+
+    Results have no `score`: there is no cosine similarity to report, and a
+    BM25 value in its place would bypass the vector score threshold.
+
+    Returns:
+        Full-match chunks, or None if vector search is still needed
+    """
+    terms = set(tokenize(query))
+    settings = config.settings
+    if not enabled() or not settings.LEXICAL_FAST_PATH_MIN_TERMS <= len(terms) <= settings.LEXICAL_FAST_PATH_MAX_TERMS:
+        return None
+
+    hits = _index.search(query, top_k=top_k * 2)
+    if not hits or hits[0]["matched_terms"] < len(terms) or hits[0]["lexical_score"] < settings.LEXICAL_FAST_PATH_MIN_SCORE:
+        return None
+
+    full = [hit for hit in hits if hit["matched_terms"] == len(terms)][:top_k]
+    partial = [hit for hit in hits if hit["matched_terms"] < len(terms)]
+    if partial and full[0]["lexical_score"] < settings.LEXICAL_FAST_PATH_MARGIN * partial[0]["lexical_score"]:
+        return None
+
+    return full
+
+
+def reciprocal_rank_fusion(result_lists: list[list[dict]], top_k: int, k: int = 60) -> list[dict]:
+    """
+    Merge ranked result lists with reciprocal-rank fusion.
+
+    Each chunk scores sum(1 / (k + rank)) over the lists it appears in.
+    A chunk keeps its vector `score` when it has one; lexical-only hits have
+    no `score`, as BM25 values are not comparable with cosine similarity.
+    """
+    fused: dict = {}
+    merged: dict = {}
+
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            chunk_id = result["_id"]
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (k + rank)
+            entry = merged.setdefault(chunk_id, {field: result.get(field) for field in RESULT_FIELDS})
+            if "score" in result:
+                entry["score"] = result["score"]
+
+    ranked = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [{**merged[chunk_id], "rrf_score": fused[chunk_id]} for chunk_id in ranked]
+
+
+def stats() -> dict:
+    return {"enabled": enabled(), **_index.stats()}
@@ -0,0 +1,158 @@
+"""
+Query embedding cache.
+Avoids an OpenAI round trip when the same question is asked repeatedly.
+
+Entries live in a bounded in-process LRU/TTL cache. When
+QUERY_EMBEDDING_CACHE_COLLECTION is set, misses fall back to a shared
+MongoDB collection so all replicas benefit from each other's lookups.
+"""
+
+import hashlib
+import logging
+from array import array
+from datetime import UTC, datetime
+
+import config
+from services import embedding_config
+from utils.cache import TTLCache, ensure_ttl_index
+
+logger = logging.getLogger(__name__)
+
+# Vectors are held as float32 arrays (~6 KB each) rather than lists of Python floats
+_cache = TTLCache(
+    max_size=config.settings.QUERY_EMBEDDING_CACHE_SIZE,
+    ttl_seconds=config.settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS
+)
+
+_shared_hits = 0
+_shared_errors = 0
+
+
+def normalize_query(query: str) -> str:
+    """Normalize query text so trivially different spellings share an entry"""
+    return " ".join(query.lower().split())
+
+
+def cache_key(query: str) -> str:
+    """Build the cache key from the normalized query and active embedding model/dimensions"""
+    raw = f"{embedding_config.model()}:{embedding_config.dimensions()}\n{normalize_query(query)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def get(query: str) -> list[float] | None:
+    """
+    Look up a cached embedding for a query.
+
+    Args:
+        query: User's question
+
+    Returns:
+        Embedding vector, or None on a miss
+    """
+    global _shared_hits
+
+    key = cache_key(query)
+    vector = _cache.get(key)
+    if vector is not None:
+        return vector.tolist()
+
+    doc = await _find_shared(key)
+    if doc is None:
+        return None
+
+    _shared_hits += 1
+    _cache.set(key, array("f", doc["embedding"]))
+    return list(doc["embedding"])
+
+
+async def put(query: str, embedding: list[float]) -> None:
+    """
+    Store a query embedding in the local cache and, if enabled, the shared collection.
+
+    Args:
+        query: User's question
+        embedding: Embedding vector returned by OpenAI
+    """
+    key = cache_key(query)
+    _cache.set(key, array("f", embedding))
+    await _store_shared(key, embedding)
+
+
+def get_stats() -> dict:
+    """
+    Get cache counters for monitoring.
+
+    Returns:
+        Dictionary with local cache stats plus shared collection hits/errors
+    """
+    return {
+        **_cache.stats(),
+        "shared_enabled": _shared_collection() is not None,
+        "shared_hits": _shared_hits,
+        "shared_errors": _shared_errors
+    }
+
+
+async def ensure_indexes() -> None:
+    """Create or update the TTL index expiring shared entries (called at startup)"""
+    collection = _shared_collection()
+    if collection is None:
+        return
+
+    try:
+        # MongoDB removes expired entries in the background
+        await ensure_ttl_index(collection, "created_at", config.settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS)
+    except Exception as e:  # noqa: BLE001
+        logger.warning("Could not create the shared query embedding cache TTL index: %s", e)
+
+
+def _shared_collection():
+    """Get the shared MongoDB cache collection, or None if disabled"""
+    if not config.settings.QUERY_EMBEDDING_CACHE_COLLECTION or not config.mongodb_client:
+        return None
+
+    db = config.mongodb_client[config.settings.MONGODB_DB_NAME]
+    return db[config.settings.QUERY_EMBEDDING_CACHE_COLLECTION]
+
+
+async def _find_shared(key: str) -> dict | None:
+    """Fetch an entry from the shared collection; failures degrade to a miss"""
+    global _shared_errors
+
+    collection = _shared_collection()
+    if collection is None:
+        return None
+
+    try:
+        return await collection.find_one(
+            {"_id": key, "model": config.settings.EMBEDDING_MODEL},
+            {"embedding": 1}
+        )
+    except Exception as e:  # noqa: BLE001
+        _shared_errors += 1
+        logger.warning("Shared query embedding cache lookup failed: %s", e)
+        return None
+
+
+async def _store_shared(key: str, embedding: list[float]) -> None:
+    """Upsert an entry into the shared collection; failures are logged and ignored"""
+    global _shared_errors
+
+    collection = _shared_collection()
+    if collection is None:
+        return
+
+    try:
+        await collection.replace_one(
+            {"_id": key},
+            {
+                "_id": key,
+                "model": config.settings.EMBEDDING_MODEL,
+                "embedding": embedding,
+                "created_at": datetime.now(UTC)
+            },
+            upsert=True
+        )
+    except Exception as e:  # noqa: BLE001
+        _shared_errors += 1
+        logger.warning("Shared query embedding cache write failed: %s", e)
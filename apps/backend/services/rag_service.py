@@ -3,47 +3,197 @@ RAG (Retrieval-Augmented Generation) service.
 Handles vector search, prompt building, and response generation.
 """
 
+import logging
+import time
+from collections.abc import AsyncIterator
 
 import config
 from models.chat import ChatMessage
-from services import vector_store
-
-
-async def retrieve_relevant_chunks(query: str, top_k: int = 5, score_threshold: float = 0.5) -> list[dict]:
+from services import (
+    answer_cache,
+    context_packer,
+    embedding_config,
+    history_manager,
+    lexical_index,
+    query_embedding_cache,
+    vector_store,
+)
+from utils import metrics, resilience, tracing
+from utils.batcher import MicroBatcher
+from utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# In-flight deduplication of identical concurrent work
+_embedding_flights = SingleFlight()
+_search_flights = SingleFlight()
+_answer_flights = SingleFlight()
+
+# Batches distinct concurrent query embeddings into one OpenAI request
+_embedding_batcher = MicroBatcher(
+    handler=lambda queries: _embed_query_batch(queries),
+    window_seconds=config.settings.EMBEDDING_BATCH_WINDOW_MS / 1000,
+    max_batch_size=config.settings.EMBEDDING_BATCH_MAX_SIZE
+)
+
+
+async def retrieve_relevant_chunks(
+    query: str,
+    top_k: int = 5,
+    score_threshold: float = 0.5,
+    query_embedding: list[float] | None = None,
+    fast_results: list[dict] | None = None
+) -> list[dict]:
     """
-    Retrieve relevant document chunks for a query using vector search.
+    Retrieve relevant document chunks for a query using hybrid search.
+
+    Vector results are fused with BM25 lexical results using reciprocal-rank
+    fusion. When no embedding is supplied and the lexical match is decisive,
+    lexical results are returned directly without an embedding call.
 
     Args:
         query: User's question
         top_k: Number of chunks to retrieve
         score_threshold: Minimum similarity score (0-1)
+        query_embedding: Precomputed query embedding (embedded on demand if omitted)
+        fast_results: Lexical fast-path results already found by check_answer_cache
 
     Returns:
         List of relevant chunks with scores
     """
+    # Exact-term queries can skip the embedding call entirely
+    if query_embedding is None:
+        if fast_results is None:
+            fast_results = lexical_fast_path(query, top_k=top_k)
+        if fast_results is not None:
+            logger.debug("Lexical fast path hit", extra={"chunks": len(fast_results)})
+            return fast_results
+
+        # Generate (or reuse a cached) embedding for the query
+        query_embedding = await embed_query(query)
+
+    # Perform vector search (identical concurrent searches share one call)
+    with metrics.rag_stage("vector_search"):
+        results = await _search_flights.do(
+            (tuple(query_embedding), top_k, score_threshold),
+            lambda: vector_store.vector_search(
+                query_embedding=query_embedding,
+                top_k=top_k,
+                score_threshold=score_threshold
+            )
+        )
+        tracing.set_attribute("chunk.count", len(results))
+
+    # Merge with lexical matches
+    with metrics.rag_stage("lexical_search"):
+        lexical_results = lexical_index.search(query, top_k=config.settings.LEXICAL_TOP_K)
+        tracing.set_attribute("chunk.count", len(lexical_results))
+    if lexical_results:
+        results = lexical_index.reciprocal_rank_fusion([results, lexical_results], top_k=top_k)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Hybrid search complete", extra={
+            "chunks": len(results),
+            "top": [
+                {"filename": result.get("filename"), "score": round(result.get("score", 0), 3)}
+                for result in results[:3]
+            ]
+        })
+
+    return results
+
+
+def lexical_fast_path(query: str, top_k: int = 5) -> list[dict] | None:
+    """Lexical fast-path results for a query (see lexical_index.fast_path), counted as cache hits/misses"""
+    fast_results = lexical_index.fast_path(query, top_k=top_k)
+    metrics.record_cache("lexical_fast_path", fast_results is not None)
+    return fast_results
+
+
+async def check_answer_cache(
+    query: str,
+    history: list[ChatMessage]
+) -> tuple[list[float] | None, list[dict] | None, tuple[str, list[dict]] | None]:
+    """
+    Embed the query and look it up in the semantic answer cache.
+
+    Queries served by the lexical fast path are not sent to OpenAI for an
+    embedding; they still use the answer cache when the query embedding cache
+    already holds their embedding.
+
+    Args:
+        query: User's question
+        history: Conversation history
+
+    Returns:
+        Tuple of (query_embedding or None, lexical fast-path results or None,
+        cached (response_text, sources) or None); pass the first two on to
+        build_rag_messages
+    """
+    fast_results = lexical_fast_path(query)
+    if fast_results is None:
+        query_embedding = await embed_query(query)
+    else:
+        query_embedding = await query_embedding_cache.get(query)
+        if query_embedding is None:
+            return None, fast_results, None
+
+    with metrics.rag_stage("answer_cache_lookup"):
+        cached = answer_cache.lookup(query_embedding, history)
+    metrics.record_cache("answer", cached is not None)
+    return query_embedding, fast_results, cached
+
+
+async def embed_query(query: str) -> list[float]:
+    """
+    Get the embedding for a query, using the query embedding cache when possible.
+
+    Args:
+        query: User's question
+
+    Returns:
+        Query embedding vector
+    """
+    cached = await query_embedding_cache.get(query)
+    metrics.record_cache("query_embedding", cached is not None)
+    if cached is not None:
+        return cached
+
     if not config.openai_client:
         raise RuntimeError("OpenAI client not available")
 
-    # Generate embedding for the query
-    response = config.openai_client.embeddings.create(
-        input=[query],
-        model=config.settings.EMBEDDING_MODEL
-    )
+    async def create_embedding() -> list[float]:
+        # Concurrent distinct queries are sent to OpenAI in one batched request
+        with metrics.rag_stage("query_embedding"):
+            query_embedding = await _embedding_batcher.submit(query)
+        await query_embedding_cache.put(query, query_embedding)
+        return query_embedding
 
-    query_embedding = response.data[0].embedding
+    # Identical concurrent queries share one embedding call
+    return await _embedding_flights.do(query_embedding_cache.cache_key(query), create_embedding)
 
-    # Perform vector search
-    results = await vector_store.vector_search(
-        query_embedding=query_embedding,
-        top_k=top_k,
-        score_threshold=score_threshold
-    )
 
-    print(f"[DEBUG] Vector search returned {len(results)} chunks for query: {query[:50]}...")
-    for i, result in enumerate(results[:3]):  # Print first 3 results
-        print(f"[DEBUG]   Chunk {i+1}: {result.get('filename')} (score: {result.get('score', 0):.3f})")
+async def _embed_query_batch(queries: list[str]) -> list[list[float]]:
+    """Embed a micro-batch of queries with a single OpenAI request"""
+    if not config.openai_client:
+        raise RuntimeError("OpenAI client not available")
 
-    return results
+    async def create():
+        return await config.openai_client.embeddings.create(
+            input=queries,
+            **embedding_config.embedding_kwargs()
+        )
+
+    # Embeddings are idempotent, so a slow attempt can be hedged with a second one
+    response = await resilience.openai_call(
+        "openai.query_embeddings",
+        lambda: resilience.hedge(
+            "openai.query_embeddings", create, config.settings.EMBEDDING_HEDGE_DELAY_MS / 1000
+        ),
+        timeout=config.settings.OPENAI_EMBEDDING_TIMEOUT_SECONDS
+    )
+    metrics.record_tokens("embedding", getattr(response, "usage", None))
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
 
 
 def build_rag_prompt(system_prompt: str, query: str, chunks: list[dict]) -> list[dict]:
@@ -60,13 +210,9 @@ def build_rag_prompt(system_prompt: str, query: str, chunks: list[dict]) -> list
     """
     messages = [{"role": "system", "content": system_prompt}]
 
-    # Add retrieved context as system message
-    if chunks:
-        context_parts = []
-        for chunk in chunks:
-            content = chunk.get("content", "")
-            context_parts.append(content)
-
+    # Add retrieved context (merged, deduplicated and fit to the token budget) as system message
+    context_parts = context_packer.pack_context(chunks, config.settings.RAG_CONTEXT_MAX_TOKENS)
+    if context_parts:
         context_message = (
             "Here is information about Draco:\n\n" +
             "\n\n".join(context_parts) +
@@ -89,60 +235,61 @@ def build_rag_prompt(system_prompt: str, query: str, chunks: list[dict]) -> list
     return messages
 
 
-async def generate_rag_response(
+async def build_rag_messages(
     query: str,
     history: list[ChatMessage],
-    system_prompt: str
-) -> tuple[str, list[dict]]:
+    system_prompt: str,
+    query_embedding: list[float] | None = None,
+    conversation_id: str | None = None,
+    fast_results: list[dict] | None = None
+) -> tuple[list[dict], list[dict]]:
     """
-    Generate a response using RAG (Retrieval-Augmented Generation).
-
-    Steps:
-    1. Retrieve relevant chunks from vector store
-    2. Build prompt with context
-    3. Call GPT to generate response
-    4. Return response and sources
+    Retrieve context for a query and build the full message list for GPT.
 
     Args:
         query: User's question
         history: Conversation history
         system_prompt: Base system prompt
+        query_embedding: Precomputed query embedding (embedded on demand if omitted)
+        conversation_id: Client conversation ID used to cache the history summary
+        fast_results: Lexical fast-path results already found by check_answer_cache
 
     Returns:
-        Tuple of (response_text, sources)
+        Tuple of (messages, sources)
     """
-    if not config.openai_client:
-        raise RuntimeError("OpenAI client not available")
-
-    # Step 1: Retrieve relevant chunks
-    chunks = await retrieve_relevant_chunks(query, top_k=5, score_threshold=0.5)
+    # Retrieve relevant chunks
+    chunks = await retrieve_relevant_chunks(
+        query,
+        top_k=5,
+        score_threshold=0.5,
+        query_embedding=query_embedding,
+        fast_results=fast_results
+    )
 
-    # Step 2: Build prompt with context
+    # Build prompt with context
     messages = build_rag_prompt(system_prompt, query, chunks)
 
-    # Add conversation history before the current query
+    # Add conversation history (compacted to the token budget) before the current query
     # Insert history after system messages but before current query
     if history:
-        history_messages = []
-        for msg in history:
-            history_messages.append({
-                "role": msg.role,
-                "content": msg.content
-            })
+        with metrics.rag_stage("history_compaction"):
+            history_messages = await history_manager.compact_history(history, conversation_id)
         # Insert history before the last message (current query)
         messages = messages[:-1] + history_messages + [messages[-1]]
 
-    # Step 3: Call GPT
-    response = config.openai_client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages,
-        temperature=0.3,  # Lower temperature for more factual, less creative responses
-        max_tokens=500
-    )
+    return messages, format_sources(chunks)
 
-    assistant_message = response.choices[0].message.content
 
-    # Step 4: Format sources
+def format_sources(chunks: list[dict]) -> list[dict]:
+    """
+    Format retrieved chunks as source citations.
+
+    Args:
+        chunks: Retrieved document chunks
+
+    Returns:
+        List of source dictionaries with content previews
+    """
     sources = []
     for chunk in chunks:
         sources.append({
@@ -151,10 +298,182 @@ async def generate_rag_response(
             "content": chunk.get("content", "")[:200] + "...",  # Preview only
             "score": chunk.get("score", 0)
         })
+    return sources
+
+
+async def generate_rag_response(
+    query: str,
+    history: list[ChatMessage],
+    system_prompt: str,
+    conversation_id: str | None = None
+) -> tuple[str, list[dict]]:
+    """
+    Generate a response using RAG (Retrieval-Augmented Generation).
+
+    Steps:
+    1. Serve a cached answer for a near-duplicate question if available
+    2. Retrieve relevant chunks from vector store
+    3. Build prompt with context
+    4. Call GPT to generate response
+    5. Cache and return response and sources
+
+    Args:
+        query: User's question
+        history: Conversation history
+        system_prompt: Base system prompt
+        conversation_id: Client conversation ID used to cache the history summary
+
+    Returns:
+        Tuple of (response_text, sources)
+    """
+    # Concurrent identical first questions share one answer
+    if not history:
+        key = (query_embedding_cache.normalize_query(query), system_prompt)
+        return await _answer_flights.do(
+            key,
+            lambda: _generate_rag_response(query, history, system_prompt, conversation_id)
+        )
+
+    return await _generate_rag_response(query, history, system_prompt, conversation_id)
+
+
+async def _generate_rag_response(
+    query: str,
+    history: list[ChatMessage],
+    system_prompt: str,
+    conversation_id: str | None
+) -> tuple[str, list[dict]]:
+    if not config.openai_client:
+        raise RuntimeError("OpenAI client not available")
+
+    # Step 1: Check the semantic answer cache
+    query_embedding, fast_results, cached = await check_answer_cache(query, history)
+    if cached is not None:
+        return cached
+
+    corpus_generation = answer_cache.generation()
+
+    # Step 2-3: Retrieve relevant chunks and build prompt with context
+    messages, sources = await build_rag_messages(
+        query,
+        history,
+        system_prompt,
+        query_embedding=query_embedding,
+        conversation_id=conversation_id,
+        fast_results=fast_results
+    )
+
+    # Step 4: Call GPT
+    with metrics.rag_stage("completion"):
+        response = await resilience.openai_call(
+            "openai.chat",
+            lambda: config.openai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=messages,
+                temperature=0.3,  # Lower temperature for more factual, less creative responses
+                max_tokens=500
+            ),
+            timeout=config.settings.OPENAI_COMPLETION_TIMEOUT_SECONDS
+        )
+        metrics.record_tokens("chat", getattr(response, "usage", None))
+
+    assistant_message = response.choices[0].message.content
+
+    # Step 5: Cache and return response and sources
+    answer_cache.store(query_embedding, history, assistant_message, sources, corpus_generation)
 
     return assistant_message, sources
 
 
+async def stream_completion(messages: list[dict], temperature: float) -> AsyncIterator[str]:
+    """
+    Stream a GPT completion token by token.
+
+    Args:
+        messages: Message list for the OpenAI API
+        temperature: Sampling temperature
+
+    Yields:
+        Content deltas as they arrive from OpenAI
+    """
+    if not config.openai_client:
+        raise RuntimeError("OpenAI client not available")
+
+    # No yield inside a stage: its histogram and span would include the time the
+    # client takes to read the stream, and the span would leak into the caller
+    with metrics.rag_stage("completion_stream"):
+        # Only opening the stream is retried; nothing has been sent to the client yet
+        stream = await resilience.openai_call(
+            "openai.chat_stream",
+            lambda: config.openai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=messages,
+                temperature=temperature,
+                max_tokens=500,
+                stream=True,
+                stream_options={"include_usage": True}  # Final event carries token usage
+            ),
+            timeout=config.settings.OPENAI_COMPLETION_TIMEOUT_SECONDS
+        )
+        events = aiter(stream)
+        try:
+            token = await _next_token(events)
+        except BaseException:
+            await stream.close()
+            raise
+
+    # The rest of the stream: only the time spent waiting on OpenAI is counted
+    read_seconds = 0.0
+    try:
+        while token is not None:
+            yield token
+            started = time.perf_counter()
+            try:
+                token = await _next_token(events)
+            finally:
+                read_seconds += time.perf_counter() - started
+    except Exception as e:
+        metrics.record_error("completion_stream_read", e)
+        raise
+    finally:
+        # Hands the connection back to the shared pool, also when the client went away mid-stream
+        await stream.close()
+        metrics.RAG_STAGE_SECONDS.labels(stage="completion_stream_read").observe(read_seconds)
+
+
+async def _next_token(events: AsyncIterator) -> str | None:
+    """Read stream events up to the next content delta (None at the end), counting token usage"""
+    async for event in events:
+        metrics.record_tokens("chat", getattr(event, "usage", None))
+        if event.choices and event.choices[0].delta.content:
+            return event.choices[0].delta.content
+    return None
+
+
+def get_coalescing_stats() -> dict:
+    """
+    Get single-flight counters for monitoring.
+
+    Returns:
+        Dictionary of calls/coalesced counts for embeddings, vector search and answers
+    """
+    return {
+        "embeddings": _embedding_flights.stats(),
+        "vector_search": _search_flights.stats(),
+        "answers": _answer_flights.stats()
+    }
+
+
+def get_batching_stats() -> dict:
+    """
+    Get query embedding micro-batching counters for monitoring.
+
+    Returns:
+        Dictionary with batches sent and items embedded
+    """
+    return _embedding_batcher.stats()
+
+
 async def has_documents() -> bool:
     """
     Check if there are any documents in the vector store.
@@ -163,7 +482,9 @@ async def has_documents() -> bool:
         True if documents exist, False otherwise
     """
     try:
-        stats = await vector_store.get_storage_stats()
+        with metrics.rag_stage("has_documents"):
+            stats = await vector_store.get_storage_stats()
+            tracing.set_attribute("document.count", stats.get("total_documents", 0))
         return stats.get("total_documents", 0) > 0
     except Exception:  # noqa: BLE001
         return False
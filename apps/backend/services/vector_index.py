@@ -0,0 +1,647 @@
+"""
+Vector index backends.
+Provides the similarity search used by vector_store.vector_search.
+
+Backends (selected with VECTOR_STORE_BACKEND):
+- atlas:  MongoDB Atlas $vectorSearch (default)
+- memory: In-process brute-force index over a contiguous float32 matrix,
+          loaded from MongoDB at startup (vector_store keeps it in sync)
+- ivf:    In-process IVF-Flat approximate index on top of the memory backend,
+          optionally persisted to VECTOR_INDEX_PATH so restarts skip rebuilding
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+from bson import json_util
+
+import config
+from services import embedding_config
+from utils import vector_codec
+
+logger = logging.getLogger(__name__)
+
+# Fields needed to serve search results without another MongoDB round trip
+RESULT_FIELDS = {"_id": 1, "filename": 1, "chunk_index": 1, "content": 1, "metadata": 1}
+
+
+class VectorIndex(ABC):
+    """Interface for vector similarity search backends"""
+
+    name = "base"
+
+    # Chunk field holding the embeddings this index searches
+    field = "embedding"
+
+    async def start(self, collection) -> None:
+        """Prepare the index (load data, start background sync)"""
+
+    async def stop(self) -> None:
+        """Release resources and stop background tasks"""
+
+    @abstractmethod
+    async def search(
+        self,
+        collection,
+        query_embedding: list[float],
+        top_k: int,
+        score_threshold: float
+    ) -> list[dict]:
+        """
+        Find the chunks most similar to the query vector.
+
+        Returns:
+            List of chunks (_id, filename, content, metadata, score), best first
+        """
+
+    def add(self, chunks: list[dict]) -> None:
+        """Index newly inserted chunks (each must include _id and embedding)"""
+
+    def remove(self, chunk_id) -> None:
+        """Drop a single chunk from the index"""
+
+    def remove_document(self, document_id: str) -> None:
+        """Drop all chunks of a document from the index"""
+
+    def stats(self) -> dict:
+        """Backend statistics for monitoring"""
+        return {"backend": self.name}
+
+    @property
+    def in_process(self) -> bool:
+        """Whether the index lives in this process and must follow writes from other replicas"""
+        return False
+
+
+class AtlasVectorIndex(VectorIndex):
+    """MongoDB Atlas $vectorSearch backend; the index lives in Atlas"""
+
+    name = "atlas"
+
+    def __init__(
+        self,
+        storage_format: str = "array",
+        rescore: bool = False,
+        rescore_factor: int = 4,
+        field: str = "embedding"
+    ):
+        self.field = field
+        self.storage_format = storage_format
+        # Quantized vectors only pick candidates; full-precision copies rank them
+        self.rescore = rescore and storage_format in vector_codec.QUANTIZED_FORMATS
+        self.rescore_factor = max(1, rescore_factor)
+
+    async def search(self, collection, query_embedding, top_k, score_threshold):
+        limit = top_k * self.rescore_factor if self.rescore else top_k
+
+        # int8 / packed_bit indexes must be queried with a vector of the same type
+        query_vector = (
+            vector_codec.encode(query_embedding, self.storage_format)
+            if self.storage_format in vector_codec.QUANTIZED_FORMATS
+            else query_embedding
+        )
+
+        projection = {**RESULT_FIELDS, "score": {"$meta": "vectorSearchScore"}}
+        if self.rescore:
+            projection[vector_codec.full_precision_field(self.field)] = 1
+
+        pipeline = [
+            {
+                "$vectorSearch": {
+                    "index": config.settings.VECTOR_INDEX_NAME,
+                    "path": self.field,
+                    "queryVector": query_vector,
+                    "numCandidates": limit * 10,  # Search more candidates for better results
+                    "limit": limit
+                }
+            },
+            {
+                "$project": projection
+            }
+        ]
+
+        results = await collection.aggregate(pipeline).to_list(length=limit)
+
+        if self.storage_format == "packed_bit":
+            for result in results:
+                result["score"] = _hamming_score(result.get("score", 0), len(query_embedding))
+
+        if self.rescore:
+            results = _rescore(results, query_embedding, self.field)[:top_k]
+
+        # Filter by score threshold
+        return [
+            result for result in results
+            if result.get("score", 0) >= score_threshold
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "field": self.field,
+            "storage_format": self.storage_format,
+            "rescore": self.rescore
+        }
+
+
+class InMemoryVectorIndex(VectorIndex):
+    """
+    Brute-force in-process index.
+
+    All embeddings are kept L2-normalized in one contiguous float32 matrix,
+    so a search is a single matrix-vector product plus a partial sort.
+    Scores use Atlas' cosine scale, (1 + cosine) / 2, so thresholds match.
+    """
+
+    name = "memory"
+
+    def __init__(self, initial_capacity: int = 1024, field: str = "embedding"):
+        self.field = field
+        self._initial_capacity = initial_capacity
+        self._matrix: np.ndarray | None = None
+        self._size = 0
+        self._ids: list = []                       # row -> chunk _id
+        self._docs: list[dict] = []                # row -> result fields
+        self._rows: dict = {}                      # chunk _id -> row
+        self._document_chunks: dict[str, set] = {}  # document_id -> chunk _ids
+
+    async def start(self, collection) -> None:
+        await self.load(collection)
+
+    @property
+    def in_process(self) -> bool:
+        return True
+
+    async def load(self, collection) -> None:
+        """Load every chunk embedding from MongoDB"""
+        self._reset()
+        batch = []
+        async for chunk in collection.find({}, {**RESULT_FIELDS, **self._embedding_fields()}):
+            batch.append(chunk)
+            if len(batch) >= 500:
+                self.add(batch)
+                batch = []
+        self.add(batch)
+        logger.info("In-memory vector index loaded %d chunks", self._size)
+
+    async def search(self, collection, query_embedding, top_k, score_threshold):
+        if self._size == 0 or top_k <= 0:
+            return []
+
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+        scores = self._matrix[:self._size] @ query
+
+        k = min(top_k, self._size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for row in top:
+            score = (1.0 + float(scores[row])) / 2.0
+            if score < score_threshold:
+                break
+            results.append({**self._docs[row], "score": score})
+        return results
+
+    def add(self, chunks: list[dict]) -> None:
+        for chunk in chunks:
+            if chunk.get("_id") in self._rows:
+                continue
+            vector = vector_codec.chunk_vector(chunk, self.field)
+            if vector is None:
+                continue
+
+            vector = _normalize(vector)
+            self._ensure_capacity(len(vector))
+
+            row = self._size
+            self._matrix[row] = vector
+            self._ids.append(chunk["_id"])
+            self._docs.append({field: chunk.get(field) for field in RESULT_FIELDS})
+            self._rows[chunk["_id"]] = row
+            document_id = (chunk.get("metadata") or {}).get("document_id")
+            self._document_chunks.setdefault(document_id, set()).add(chunk["_id"])
+            self._size += 1
+
+    def remove_document(self, document_id: str) -> None:
+        for chunk_id in list(self._document_chunks.get(document_id, ())):
+            self.remove(chunk_id)
+
+    def remove(self, chunk_id) -> None:
+        """Remove one chunk by swapping the last row into its slot"""
+        row = self._rows.pop(chunk_id, None)
+        if row is None:
+            return
+
+        document_id = (self._docs[row].get("metadata") or {}).get("document_id")
+        chunk_ids = self._document_chunks.get(document_id)
+        if chunk_ids is not None:
+            chunk_ids.discard(chunk_id)
+            if not chunk_ids:
+                del self._document_chunks[document_id]
+
+        last = self._size - 1
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self._ids[row] = self._ids[last]
+            self._docs[row] = self._docs[last]
+            self._rows[self._ids[row]] = row
+
+        self._ids.pop()
+        self._docs.pop()
+        self._size -= 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "field": self.field,
+            "chunks": self._size,
+            "documents": len(self._document_chunks),
+            "dimensions": self._matrix.shape[1] if self._matrix is not None else 0,
+            "matrix_bytes": self._matrix.nbytes if self._matrix is not None else 0
+        }
+
+    def _embedding_fields(self) -> dict:
+        """Projection of the stored embedding (and its full-precision copy)"""
+        return {self.field: 1, vector_codec.full_precision_field(self.field): 1}
+
+    def _reset(self) -> None:
+        self._matrix = None
+        self._size = 0
+        self._ids = []
+        self._docs = []
+        self._rows = {}
+        self._document_chunks = {}
+
+    def _ensure_capacity(self, dimensions: int) -> None:
+        """Allocate or grow (doubling) the embedding matrix"""
+        if self._matrix is None:
+            self._matrix = np.zeros((self._initial_capacity, dimensions), dtype=np.float32)
+        elif self._matrix.shape[1] != dimensions:
+            raise ValueError(
+                f"Embedding has {dimensions} dimensions, index expects {self._matrix.shape[1]}"
+            )
+        elif self._size == self._matrix.shape[0]:
+            grown = np.zeros((self._matrix.shape[0] * 2, dimensions), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+
+
+class IVFFlatVectorIndex(InMemoryVectorIndex):
+    """
+    IVF-Flat approximate nearest-neighbour index.
+
+    Vectors are partitioned into `nlist` clusters by spherical k-means.
+    A search scores the centroids, then only the vectors in the `nprobe`
+    closest clusters; raising nprobe trades latency for recall. Until the
+    corpus reaches `min_train_size` vectors, searches are exact.
+
+    New vectors are assigned to their nearest centroid as they arrive and
+    deletions reuse the memory backend's swap-remove, so uploads and deletes
+    never require a rebuild. The index is retrained at startup once the
+    corpus has more than doubled since the last training.
+    """
+
+    name = "ivf"
+
+    def __init__(
+        self,
+        nlist: int = 0,
+        nprobe: int = 16,
+        min_train_size: int = 1024,
+        path: str = "",
+        save_interval_seconds: float = 300,
+        initial_capacity: int = 1024,
+        field: str = "embedding"
+    ):
+        super().__init__(initial_capacity=initial_capacity, field=field)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.path = path
+        self.save_interval_seconds = save_interval_seconds
+        self._centroids: np.ndarray | None = None
+        self._assign = np.zeros(initial_capacity, dtype=np.int32)  # row -> cluster
+        self._trained_size = 0
+        self._dirty = False
+        self._save_task: asyncio.Task | None = None
+
+    async def start(self, collection) -> None:
+        await super().start(collection)
+        if self.path:
+            self._save_task = asyncio.create_task(self._save_periodically())
+
+    async def stop(self) -> None:
+        if self._save_task:
+            self._save_task.cancel()
+            try:
+                await self._save_task
+            except asyncio.CancelledError:
+                pass
+            self._save_task = None
+        await super().stop()
+        if self.path and self._dirty:
+            self.save(self.path)
+
+    async def load(self, collection) -> None:
+        """Load the persisted snapshot if present and reconcile it with MongoDB"""
+        if self.path and os.path.exists(self.path):
+            try:
+                self.load_snapshot(self.path)
+                await self._reconcile(collection)
+                logger.info("IVF vector index restored %d chunks from %s", self._size, self.path)
+            except Exception as e:  # noqa: BLE001
+                logger.warning("IVF snapshot %s unusable, rebuilding: %s", self.path, e)
+                await super().load(collection)
+        else:
+            await super().load(collection)
+
+        if self._size >= self.min_train_size and (
+            self._centroids is None or self._size > 2 * self._trained_size
+        ):
+            await asyncio.to_thread(self.train)
+            self._dirty = True
+
+    def train(self, iterations: int = 10, seed: int = 0) -> None:
+        """Cluster the current vectors with spherical k-means and reassign every row"""
+        if self._size == 0:
+            return
+
+        vectors = self._matrix[:self._size]
+        nlist = self.nlist or max(1, int(4 * np.sqrt(self._size)))
+        nlist = min(nlist, self._size)
+        rng = np.random.default_rng(seed)
+
+        # Train on a bounded sample; assignment below still covers every vector
+        sample_size = min(self._size, nlist * 64)
+        sample = vectors[rng.choice(self._size, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.where(norms > 0, norms, 1)
+
+        self._centroids = centroids.astype(np.float32)
+        self._assign[:self._size] = self._nearest_centroids(vectors)
+        self._trained_size = self._size
+
+    async def search(self, collection, query_embedding, top_k, score_threshold):
+        if self._centroids is None or self._size == 0 or top_k <= 0:
+            return await super().search(collection, query_embedding, top_k, score_threshold)
+
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+
+        nprobe = min(self.nprobe, len(self._centroids))
+        probe = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        candidates = np.flatnonzero(np.isin(self._assign[:self._size], probe))
+        if len(candidates) == 0:
+            return []
+
+        scores = self._matrix[candidates] @ query
+        k = min(top_k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for idx in top:
+            score = (1.0 + float(scores[idx])) / 2.0
+            if score < score_threshold:
+                break
+            results.append({**self._docs[candidates[idx]], "score": score})
+        return results
+
+    def add(self, chunks: list[dict]) -> None:
+        start = self._size
+        super().add(chunks)
+        if self._size == start:
+            return
+
+        if len(self._assign) < len(self._matrix):
+            grown = np.zeros(len(self._matrix), dtype=np.int32)
+            grown[:start] = self._assign[:start]
+            self._assign = grown
+        if self._centroids is not None:
+            self._assign[start:self._size] = self._nearest_centroids(self._matrix[start:self._size])
+        self._dirty = True
+
+    def remove(self, chunk_id) -> None:
+        row = self._rows.get(chunk_id)
+        if row is None:
+            return
+        # Mirror the parent's swap-remove for the cluster assignments
+        self._assign[row] = self._assign[self._size - 1]
+        super().remove(chunk_id)
+        self._dirty = True
+
+    def save(self, path: str) -> None:
+        """Atomically write vectors, clusters and result fields to an .npz snapshot"""
+        self._write_snapshot(path, self._snapshot())
+
+    def _snapshot(self) -> dict:
+        """Copy the index state so it can be written from another thread"""
+        empty = np.zeros((0, 0), dtype=np.float32)
+        docs = json_util.dumps({"ids": self._ids, "docs": self._docs}).encode("utf-8")
+        self._dirty = False
+        return {
+            "matrix": self._matrix[:self._size].copy() if self._matrix is not None else empty,
+            "assign": self._assign[:self._size].copy(),
+            "centroids": self._centroids.copy() if self._centroids is not None else empty,
+            "trained_size": np.array([self._trained_size]),
+            "field": np.array([self.field]),
+            "docs": np.frombuffer(docs, dtype=np.uint8)
+        }
+
+    @staticmethod
+    def _write_snapshot(path: str, snapshot: dict) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **snapshot)
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, path: str) -> None:
+        """Restore the index from a snapshot written by save()"""
+        with np.load(path) as data:
+            # Snapshots from before a re-embedding migration hold the wrong vectors
+            field = str(data["field"][0]) if "field" in data else "embedding"
+            if field != self.field:
+                raise ValueError(f"snapshot indexes '{field}', expected '{self.field}'")
+            matrix = data["matrix"]
+            assign = data["assign"]
+            centroids = data["centroids"]
+            trained_size = int(data["trained_size"][0])
+            payload = json_util.loads(data["docs"].tobytes().decode("utf-8"))
+
+        self._reset()
+        if len(matrix):
+            capacity = max(self._initial_capacity, len(matrix))
+            self._matrix = np.zeros((capacity, matrix.shape[1]), dtype=np.float32)
+            self._matrix[:len(matrix)] = matrix
+            self._assign = np.zeros(capacity, dtype=np.int32)
+            self._assign[:len(matrix)] = assign
+        self._size = len(matrix)
+        self._ids = payload["ids"]
+        self._docs = payload["docs"]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        for chunk_id, doc in zip(self._ids, self._docs):
+            document_id = (doc.get("metadata") or {}).get("document_id")
+            self._document_chunks.setdefault(document_id, set()).add(chunk_id)
+        self._centroids = centroids if centroids.size else None
+        self._trained_size = trained_size
+        self._dirty = False
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "trained": self._centroids is not None,
+            "nlist": len(self._centroids) if self._centroids is not None else 0,
+            "nprobe": self.nprobe,
+            "trained_size": self._trained_size,
+            "persisted_to": self.path or None
+        }
+
+    def _reset(self) -> None:
+        super()._reset()
+        self._centroids = None
+        self._assign = np.zeros(self._initial_capacity, dtype=np.int32)
+        self._trained_size = 0
+
+    def _nearest_centroids(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    async def _reconcile(self, collection) -> None:
+        """Apply inserts and deletes that happened while this pod was down"""
+        stored_ids = set()
+        async for chunk in collection.find({}, {"_id": 1}):
+            stored_ids.add(chunk["_id"])
+
+        for chunk_id in [chunk_id for chunk_id in self._ids if chunk_id not in stored_ids]:
+            self.remove(chunk_id)
+
+        missing = [chunk_id for chunk_id in stored_ids if chunk_id not in self._rows]
+        for i in range(0, len(missing), 500):
+            batch = await collection.find(
+                {"_id": {"$in": missing[i:i + 500]}},
+                {**RESULT_FIELDS, **self._embedding_fields()}
+            ).to_list(length=None)
+            self.add(batch)
+
+    async def _save_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.save_interval_seconds)
+            if self._dirty:
+                try:
+                    started = time.perf_counter()
+                    snapshot = self._snapshot()
+                    await asyncio.to_thread(self._write_snapshot, self.path, snapshot)
+                    logger.info("IVF vector index saved in %.2fs", time.perf_counter() - started)
+                except Exception as e:  # noqa: BLE001
+                    logger.warning("IVF vector index save failed: %s", e)
+
+
+def create_index(backend: str, field: str | None = None) -> VectorIndex:
+    """
+    Create a vector index backend by name.
+
+    Args:
+        backend: VECTOR_STORE_BACKEND name
+        field: Chunk field to search (defaults to the active embedding field)
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    field = field or embedding_config.field()
+    if backend == "atlas":
+        return AtlasVectorIndex(
+            storage_format=config.settings.EMBEDDING_STORAGE_FORMAT,
+            rescore=config.settings.EMBEDDING_RESCORE,
+            rescore_factor=config.settings.EMBEDDING_RESCORE_FACTOR,
+            field=field
+        )
+    if backend == "memory":
+        return InMemoryVectorIndex(field=field)
+    if backend == "ivf":
+        return IVFFlatVectorIndex(
+            nlist=config.settings.IVF_NLIST,
+            nprobe=config.settings.IVF_NPROBE,
+            min_train_size=config.settings.IVF_MIN_TRAIN_SIZE,
+            path=config.settings.VECTOR_INDEX_PATH,
+            save_interval_seconds=config.settings.VECTOR_INDEX_SAVE_INTERVAL_SECONDS,
+            field=field
+        )
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {backend}")
+
+
+def atlas_index_definition(dimensions: int, storage_format: str, field: str = "embedding") -> dict:
+    """
+    Build the Atlas Vector Search index definition for the stored embeddings.
+
+    Packed-bit vectors only support euclidean (Hamming) similarity; every
+    other format uses cosine.
+
+    Args:
+        dimensions: Embedding dimensions
+        storage_format: EMBEDDING_STORAGE_FORMAT the chunks are written with
+        field: Chunk field holding the embeddings
+
+    Returns:
+        Index definition for createSearchIndexes / the Atlas UI
+    """
+    return {
+        "fields": [
+            {
+                "type": "vector",
+                "path": field,
+                "numDimensions": dimensions,
+                "similarity": "euclidean" if storage_format == "packed_bit" else "cosine"
+            },
+            {
+                "type": "filter",
+                "path": "metadata.document_id"
+            }
+        ]
+    }
+
+
+def _rescore(results: list[dict], query_embedding: list[float], field: str) -> list[dict]:
+    """Re-rank quantized candidates by full-precision cosine on Atlas' score scale"""
+    query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+    rescored = []
+    for result in results:
+        full = result.pop(vector_codec.full_precision_field(field), None)
+        if full is not None:
+            cosine = float(_normalize(vector_codec.decode(full)) @ query)
+            result["score"] = (1.0 + cosine) / 2.0
+        rescored.append(result)
+    return sorted(rescored, key=lambda result: result.get("score", 0), reverse=True)
+
+
+def _hamming_score(score: float, dimensions: int) -> float:
+    """
+    Map Atlas' packed_bit score, 1 / (1 + Hamming distance), onto the cosine
+    scale of the other formats so the same score_threshold applies.
+    The share of differing sign bits estimates the angle between the vectors.
+    """
+    if score <= 0 or dimensions <= 0:
+        return 0.0
+    distance = 1.0 / score - 1.0
+    cosine = math.cos(math.pi * min(distance / dimensions, 1.0))
+    return (1.0 + cosine) / 2.0
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    """Scale a vector to unit length so dot product equals cosine similarity"""
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
@@ -1,10 +1,24 @@
 """
 Vector store service for MongoDB Atlas Vector Search.
 Handles storage and retrieval of document embeddings.
+Similarity search is delegated to the backend in services/vector_index.py;
+writes also keep services/lexical_index.py up to date.
 """
 
+import asyncio
+import logging
 
 import config
+from services import lexical_index, vector_index
+from utils import resilience
+
+logger = logging.getLogger(__name__)
+
+# Active vector index backend (initialized in main.py lifespan)
+_index: vector_index.VectorIndex | None = None
+
+# Change stream task keeping in-process indexes in sync across replicas
+_sync_task: asyncio.Task | None = None
 
 
 async def get_collection():
@@ -16,6 +30,111 @@ async def get_collection():
     return db[config.settings.MONGODB_COLLECTION]
 
 
+def get_index() -> vector_index.VectorIndex:
+    """Get the active vector index backend (Atlas until init_index() runs)"""
+    global _index
+    if _index is None:
+        _index = vector_index.create_index("atlas")
+    return _index
+
+
+async def init_index() -> None:
+    """
+    Create and start the vector index backend selected by VECTOR_STORE_BACKEND,
+    build the lexical index, and follow writes from other replicas.
+    Called from the main.py lifespan once MongoDB is connected.
+    """
+    global _index, _sync_task
+    collection = await get_collection()
+
+    # Changes made while loading are replayed from this point (add/remove are idempotent)
+    reply = await collection.database.command("ping")
+    start_at = reply.get("operationTime")
+
+    index = vector_index.create_index(config.settings.VECTOR_STORE_BACKEND)
+    await index.start(collection)
+    _index = index
+
+    if lexical_index.enabled():
+        await lexical_index.load(collection)
+
+    if index.in_process or lexical_index.enabled():
+        _sync_task = asyncio.create_task(_watch_changes(collection, start_at))
+
+
+async def build_index(field: str) -> vector_index.VectorIndex:
+    """
+    Create and start a vector index backend over another embedding field.
+    Used when a re-embedding migration switches fields: searches keep using
+    the current index until use_index() swaps the new one in.
+    """
+    collection = await get_collection()
+    index = vector_index.create_index(config.settings.VECTOR_STORE_BACKEND, field=field)
+    await index.start(collection)
+    return index
+
+
+async def use_index(index: vector_index.VectorIndex) -> None:
+    """Search a built index from now on and stop the previous one"""
+    global _index
+    previous, _index = _index, index
+    if previous is not None:
+        await previous.stop()
+
+
+async def close_index() -> None:
+    """Stop index synchronization and the vector index backend's background tasks"""
+    global _index, _sync_task
+    if _sync_task is not None:
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
+        _sync_task = None
+
+    if _index is not None:
+        await _index.stop()
+        _index = None
+
+
+async def _watch_changes(collection, start_at=None) -> None:
+    """Apply inserts and deletes made by any replica to the in-process indexes"""
+    pipeline = [{"$match": {"operationType": {"$in": ["insert", "replace", "update", "delete"]}}}]
+    resume_token = None
+
+    while True:
+        try:
+            async with collection.watch(
+                pipeline,
+                resume_after=resume_token,
+                start_at_operation_time=start_at if resume_token is None else None,
+                full_document="updateLookup"
+            ) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    chunk_id = change["documentKey"]["_id"]
+
+                    # Updates only matter when they (re-)embed the field being searched
+                    if change["operationType"] == "update":
+                        updated = change.get("updateDescription", {}).get("updatedFields", {})
+                        if change.get("fullDocument") and get_index().field in updated:
+                            get_index().remove(chunk_id)
+                            get_index().add([change["fullDocument"]])
+                        continue
+
+                    get_index().remove(chunk_id)
+                    lexical_index.remove(chunk_id)
+                    if change["operationType"] != "delete":
+                        get_index().add([change["fullDocument"]])
+                        lexical_index.add([change["fullDocument"]])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Index change stream interrupted: %s", e)
+            await asyncio.sleep(5)
+
+
 async def insert_chunks(chunks: list[dict]) -> list[str]:
     """
     Insert document chunks with embeddings into MongoDB.
@@ -27,13 +146,19 @@ async def insert_chunks(chunks: list[dict]) -> list[str]:
         List of inserted document IDs
     """
     collection = await get_collection()
-    result = await collection.insert_many(chunks)
+    # Not retried: a retry after a lost reply would insert duplicates
+    result = await resilience.mongodb_call("mongodb.insert_chunks", lambda: collection.insert_many(chunks), retries=0)
+
+    # insert_many sets _id on each chunk dict
+    get_index().add(chunks)
+    lexical_index.add(chunks)
+
     return [str(id) for id in result.inserted_ids]
 
 
 async def vector_search(query_embedding: list[float], top_k: int = 5, score_threshold: float = 0.5) -> list[dict]:
     """
-    Perform vector similarity search using MongoDB Atlas Vector Search.
+    Perform vector similarity search using the configured index backend.
 
     Args:
         query_embedding: The query vector (1536 dimensions for OpenAI embeddings)
@@ -44,37 +169,11 @@ async def vector_search(query_embedding: list[float], top_k: int = 5, score_thre
         List of matching chunks with scores
     """
     collection = await get_collection()
-
-    pipeline = [
-        {
-            "$vectorSearch": {
-                "index": config.settings.VECTOR_INDEX_NAME,
-                "path": "embedding",
-                "queryVector": query_embedding,
-                "numCandidates": top_k * 10,  # Search more candidates for better results
-                "limit": top_k
-            }
-        },
-        {
-            "$project": {
-                "_id": 1,
-                "filename": 1,
-                "content": 1,
-                "metadata": 1,
-                "score": {"$meta": "vectorSearchScore"}
-            }
-        }
-    ]
-
-    results = await collection.aggregate(pipeline).to_list(length=top_k)
-
-    # Filter by score threshold
-    filtered_results = [
-        result for result in results
-        if result.get("score", 0) >= score_threshold
-    ]
-
-    return filtered_results
+    index = get_index()
+    return await resilience.mongodb_call(
+        "mongodb.vector_search",
+        lambda: index.search(collection, query_embedding, top_k, score_threshold)
+    )
 
 
 async def list_all_documents() -> list[dict]:
@@ -111,7 +210,10 @@ async def list_all_documents() -> list[dict]:
         }
     ]
 
-    results = await collection.aggregate(pipeline).to_list(length=None)
+    results = await resilience.mongodb_call(
+        "mongodb.list_documents",
+        lambda: collection.aggregate(pipeline).to_list(length=None)
+    )
     return results
 
 
@@ -127,9 +229,13 @@ async def delete_document(document_id: str) -> int:
     """
     collection = await get_collection()
 
-    result = await collection.delete_many({
-        "metadata.document_id": document_id
-    })
+    result = await resilience.mongodb_call(
+        "mongodb.delete_document",
+        lambda: collection.delete_many({"metadata.document_id": document_id})
+    )
+
+    get_index().remove_document(document_id)
+    lexical_index.remove_document(document_id)
 
     return result.deleted_count
 
@@ -147,17 +253,19 @@ async def get_document_by_id(document_id: str) -> dict | None:
     collection = await get_collection()
 
     # Get the first chunk to retrieve metadata
-    chunk = await collection.find_one({
-        "metadata.document_id": document_id
-    })
+    chunk = await resilience.mongodb_call(
+        "mongodb.get_document",
+        lambda: collection.find_one({"metadata.document_id": document_id})
+    )
 
     if not chunk:
         return None
 
     # Count total chunks
-    chunk_count = await collection.count_documents({
-        "metadata.document_id": document_id
-    })
+    chunk_count = await resilience.mongodb_call(
+        "mongodb.get_document",
+        lambda: collection.count_documents({"metadata.document_id": document_id})
+    )
 
     return {
         "id": document_id,
@@ -177,7 +285,7 @@ async def get_storage_stats() -> dict:
     """
     collection = await get_collection()
 
-    total_chunks = await collection.count_documents({})
+    total_chunks = await resilience.mongodb_call("mongodb.storage_stats", lambda: collection.count_documents({}))
 
     # Get unique document count
     pipeline = [
@@ -191,11 +299,16 @@ async def get_storage_stats() -> dict:
         }
     ]
 
-    doc_count_result = await collection.aggregate(pipeline).to_list(length=1)
+    doc_count_result = await resilience.mongodb_call(
+        "mongodb.storage_stats",
+        lambda: collection.aggregate(pipeline).to_list(length=1)
+    )
     total_documents = doc_count_result[0]["total_documents"] if doc_count_result else 0
 
     return {
         "total_documents": total_documents,
         "total_chunks": total_chunks,
-        "avg_chunks_per_document": round(total_chunks / total_documents, 2) if total_documents > 0 else 0
+        "avg_chunks_per_document": round(total_chunks / total_documents, 2) if total_documents > 0 else 0,
+        "vector_index": get_index().stats(),
+        "lexical_index": lexical_index.stats()
     }
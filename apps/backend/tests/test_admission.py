@@ -0,0 +1,133 @@
+import asyncio
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+import config
+from main import app
+from utils import admission
+
+client = TestClient(app)
+
+
+def make_limiter(**overrides):
+    options = {
+        "initial_limit": 2,
+        "min_limit": 1,
+        "max_limit": 4,
+        "max_queue": 1,
+        "queue_timeout": 0.05,
+        "latency_target": 1.0
+    }
+    options.update(overrides)
+    return admission.AdaptiveLimiter(**options)
+
+
+class TestAdaptiveLimiter:
+    def test_queues_then_sheds_when_full(self):
+        """Test that requests over the limit wait, and are shed once the queue is full."""
+        limiter = make_limiter()
+
+        async def run():
+            await limiter.acquire()
+            await limiter.acquire()
+            queued = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            with pytest.raises(admission.Overloaded) as error:
+                await limiter.acquire()
+            assert error.value.status_code == 429
+
+            limiter.release(0.1)
+            await queued
+            assert limiter.in_flight == 2
+
+        asyncio.run(run())
+        assert limiter.shed == {"queue_full": 1}
+
+    def test_queue_timeout_is_503(self):
+        """Test that a request waiting longer than the queue timeout is shed with 503."""
+        limiter = make_limiter(initial_limit=1)
+
+        async def run():
+            await limiter.acquire()
+            with pytest.raises(admission.Overloaded) as error:
+                await limiter.acquire()
+            assert error.value.status_code == 503
+            assert error.value.retry_after >= 1
+
+        asyncio.run(run())
+        assert limiter.stats()["queued"] == 0
+
+    def test_aimd(self):
+        """Test that fast requests raise the limit and slow or failed ones cut it."""
+        limiter = make_limiter()
+
+        async def cycle(latency, failed=False):
+            await limiter.acquire()
+            limiter.release(latency, failed)
+
+        for _ in range(10):
+            asyncio.run(cycle(0.1))
+        assert limiter.limit > 3
+
+        high = limiter.limit
+        asyncio.run(cycle(5.0))
+        assert limiter.limit == pytest.approx(high * 0.9)
+        asyncio.run(cycle(0.1, failed=True))
+        assert limiter.limit < high * 0.9
+
+        for _ in range(50):
+            asyncio.run(cycle(5.0))
+        assert limiter.limit == 1
+
+
+class TestMemoryCheck:
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+    def test_child_processes_count(self):
+        """Test that memory held by child processes (parser workers) counts against the limit."""
+        before = admission._rss_mb()
+        child = subprocess.Popen(
+            [sys.executable, "-c", "import sys; data = b'x' * (64 << 20); print(flush=True); sys.stdin.read()"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+        try:
+            child.stdout.readline()  # The child has filled its memory
+            assert admission._rss_mb() - before > 32
+        finally:
+            child.communicate(b"")
+
+
+class TestAdmissionMiddleware:
+    def test_health_is_never_shed(self, monkeypatch):
+        """Test that health checks pass while chat requests are shed."""
+        limiter = make_limiter(initial_limit=1, max_queue=0)
+        limiter.in_flight = 1
+        monkeypatch.setattr(admission, "_limiter", limiter)
+        monkeypatch.setattr(config.settings, "ADMISSION_ENABLED", True)
+
+        response = client.post("/chat", json={"message": "Hello"})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+
+        assert client.get("/health").status_code == 200
+        assert client.get("/").status_code == 200
+
+    def test_fallback_replies_count_as_failures(self, monkeypatch):
+        """Test that 200 responses carrying the degraded reply or an SSE error event cut the limit."""
+        from utils import resilience
+
+        breaker = resilience.CircuitBreaker("openai", failure_threshold=1, reset_seconds=60)
+        breaker.record_failure()
+        monkeypatch.setattr(resilience, "openai_breaker", breaker)
+        monkeypatch.setattr(config, "openai_client", object())
+        monkeypatch.setattr(config.settings, "ADMISSION_ENABLED", True)
+
+        for path in ("/chat", "/chat/stream"):
+            limiter = make_limiter(initial_limit=4)
+            monkeypatch.setattr(admission, "_limiter", limiter)
+
+            response = client.post(path, json={"message": "Hello"})
+            assert response.status_code == 200
+            assert limiter.limit < 4
@@ -0,0 +1,103 @@
+import asyncio
+
+from utils.batcher import MicroBatcher
+
+
+class TestMicroBatcher:
+    def test_concurrent_items_share_one_batch(self):
+        """Test that items submitted within the window are handled together."""
+        calls = []
+
+        async def handler(items):
+            calls.append(list(items))
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(handler, window_seconds=0.01, max_batch_size=10)
+
+        async def run():
+            return await asyncio.gather(*(batcher.submit(i) for i in range(4)))
+
+        assert asyncio.run(run()) == [0, 2, 4, 6]
+        assert calls == [[0, 1, 2, 3]]
+        assert batcher.stats()["largest_batch"] == 4
+
+    def test_max_batch_size_flushes_early(self):
+        """Test that a full batch is sent without waiting for the window."""
+        calls = []
+
+        async def handler(items):
+            calls.append(list(items))
+            return items
+
+        batcher = MicroBatcher(handler, window_seconds=10, max_batch_size=2)
+
+        async def run():
+            return await asyncio.wait_for(
+                asyncio.gather(*(batcher.submit(i) for i in range(4))), timeout=1
+            )
+
+        assert asyncio.run(run()) == [0, 1, 2, 3]
+        assert calls == [[0, 1], [2, 3]]
+
+    def test_handler_failure_reaches_every_caller(self):
+        """Test that a failed batch raises to all of its callers."""
+        async def handler(items):
+            raise ValueError("boom")
+
+        batcher = MicroBatcher(handler, window_seconds=0.01, max_batch_size=10)
+
+        async def run():
+            return await asyncio.gather(
+                batcher.submit(1), batcher.submit(2), return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_missing_results_fail_every_caller(self):
+        """Test that a handler returning fewer results than items fails the batch instead of hanging."""
+        async def handler(items):
+            return items[:1]
+
+        batcher = MicroBatcher(handler, window_seconds=0.01, max_batch_size=10)
+
+        async def run():
+            return await asyncio.wait_for(
+                asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True), timeout=1
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_cancelled_batch_cancels_its_callers(self):
+        """Test that callers of a batch cancelled mid-flight do not wait forever."""
+        async def handler(items):
+            await asyncio.sleep(10)
+
+        batcher = MicroBatcher(handler, window_seconds=0.01, max_batch_size=10)
+
+        async def run():
+            callers = asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+            await asyncio.sleep(0.05)
+            for task in list(batcher._running):
+                task.cancel()
+            return await asyncio.wait_for(callers, timeout=1)
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+
+    def test_zero_window_disables_batching(self):
+        """Test that a zero window handles each item on its own."""
+        calls = []
+
+        async def handler(items):
+            calls.append(list(items))
+            return items
+
+        batcher = MicroBatcher(handler, window_seconds=0, max_batch_size=10)
+
+        async def run():
+            return await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+        assert asyncio.run(run()) == [1, 2]
+        assert calls == [[1], [2]]
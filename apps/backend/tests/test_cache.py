@@ -0,0 +1,227 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import OperationFailure
+
+import config
+from utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    def test_get_returns_cached_value_and_counts_hits(self):
+        """Test that a stored value is returned and counted as a hit."""
+        cache = TTLCache(max_size=2, ttl_seconds=60)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.get("missing") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that the LRU entry is evicted when the cache is full."""
+        cache = TTLCache(max_size=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_entries_expire_after_ttl(self):
+        """Test that entries are treated as misses once their TTL elapses."""
+        clock = FakeClock()
+        cache = TTLCache(max_size=2, ttl_seconds=10, clock=clock)
+        cache.set("a", 1)
+        clock.now = 9.9
+        assert cache.get("a") == 1
+        clock.now = 10.0
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestQueryEmbeddingCache:
+    def test_normalized_queries_share_a_key(self):
+        """Test that case and whitespace differences map to the same entry."""
+        from services import query_embedding_cache
+
+        assert query_embedding_cache.cache_key("What is your  experience?") == \
+            query_embedding_cache.cache_key("  what is your experience? ")
+
+    def test_changed_ttl_updates_the_existing_index(self, monkeypatch):
+        """Test that a TTL index created with another expiry is updated with collMod rather than failing."""
+        from services import query_embedding_cache
+
+        collection = FakeIndexedCollection(expire_after=3600)
+        monkeypatch.setattr(query_embedding_cache, "_shared_collection", lambda: collection)
+        monkeypatch.setattr(config.settings, "QUERY_EMBEDDING_CACHE_TTL_SECONDS", 600.0)
+
+        asyncio.run(query_embedding_cache.ensure_indexes())
+        assert collection.expire_after == 600
+        assert collection.database.commands == [
+            ("collMod", "cache", {"keyPattern": {"created_at": 1}, "expireAfterSeconds": 600})
+        ]
+
+
+class FakeIndexedCollection:
+    """Collection whose created_at TTL index already exists"""
+
+    def __init__(self, expire_after):
+        self.name = "cache"
+        self.expire_after = expire_after
+        self.database = SimpleNamespace(commands=[], command=self._command)
+
+    async def create_index(self, field, expireAfterSeconds):
+        if expireAfterSeconds != self.expire_after:
+            raise OperationFailure("Index already exists with different options", code=85)
+
+    async def _command(self, name, collection, index):
+        self.database.commands.append((name, collection, index))
+        self.expire_after = index["expireAfterSeconds"]
+
+
+class FakeEmbeddingsAPI:
+    """OpenAI client whose embeddings.create records the inputs it was sent"""
+
+    def __init__(self):
+        self.requests = []
+        self.embeddings = self
+
+    async def create(self, input, model, dimensions=None):
+        self.requests.append(list(input))
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=[float(len(text)), 1.0]) for text in input],
+            usage=SimpleNamespace(prompt_tokens=2 * len(input), total_tokens=2 * len(input))
+        )
+
+
+class FakeSharedCollection:
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, query, projection=None):
+        docs = [self.docs[key] for key in query["_id"]["$in"] if key in self.docs]
+        return SimpleNamespace(to_list=lambda length=None: asyncio.sleep(0, docs))
+
+    async def bulk_write(self, updates, ordered=True):
+        for update in updates:
+            self.docs.setdefault(update._filter["_id"], {"_id": update._filter["_id"], **update._doc["$setOnInsert"]})
+
+
+@pytest.fixture
+def chunk_cache(monkeypatch):
+    from services import embedding_cache
+
+    api = FakeEmbeddingsAPI()
+    monkeypatch.setattr(config, "openai_client", api)
+    monkeypatch.setattr(embedding_cache, "_cache", TTLCache(max_size=100, ttl_seconds=60))
+    monkeypatch.setattr(embedding_cache, "_saved_requests", 0)
+    monkeypatch.setattr(embedding_cache, "_saved_tokens", 0)
+    return api
+
+
+class TestEmbeddingCache:
+    def test_only_misses_are_embedded(self, chunk_cache):
+        """Test that re-embedding a changed document sends only new texts, each once."""
+        from services import document_service, embedding_cache
+
+        first = asyncio.run(document_service.generate_embeddings(["summary", "experience", "skills"]))
+        second = asyncio.run(document_service.generate_embeddings(["summary", "new role", "skills", "new role"]))
+
+        assert chunk_cache.requests == [["summary", "experience", "skills"], ["new role"]]
+        assert second == [first[0], [8.0, 1.0], first[2], [8.0, 1.0]]
+
+        asyncio.run(document_service.generate_embeddings(["summary", "skills"]))
+        assert len(chunk_cache.requests) == 2
+        stats = embedding_cache.get_stats()
+        assert stats["saved_requests"] == 1
+        # The first request was billed 6 tokens: 1 for "summary", 2 for "experience", 3 for "skills"
+        assert stats["saved_tokens"] == 2 * (1 + 3)
+
+    def test_billed_tokens_are_shared_by_length(self):
+        """Test that a request's prompt tokens are split among its texts without losing any."""
+        from services import embedding_cache
+
+        assert embedding_cache._split_tokens(["ab", "abcdef"], 9) == [2, 7]
+        assert embedding_cache._split_tokens(["a", "b", "c"], 10) == [3, 3, 4]
+        assert embedding_cache._split_tokens([], 5) == []
+
+    def test_shared_entries_expire_with_the_ttl_setting(self, monkeypatch):
+        """Test that the shared collection gets a created_at TTL index following EMBEDDING_CACHE_TTL_SECONDS."""
+        from services import embedding_cache
+
+        collection = FakeIndexedCollection(expire_after=86400)
+        monkeypatch.setattr(embedding_cache, "_shared_collection", lambda: collection)
+        monkeypatch.setattr(config.settings, "EMBEDDING_CACHE_TTL_SECONDS", 3600.0)
+
+        asyncio.run(embedding_cache.ensure_indexes())
+        assert collection.expire_after == 3600
+
+    def test_keyed_by_model_and_dimensions(self):
+        """Test that the same text under another embedding configuration is a different entry."""
+        from services import embedding_cache
+
+        key = embedding_cache.cache_key("summary", "text-embedding-3-small", 0)
+        assert key != embedding_cache.cache_key("summary", "text-embedding-3-large", 0)
+        assert key != embedding_cache.cache_key("summary", "text-embedding-3-small", 512)
+        assert key != embedding_cache.cache_key("summary ", "text-embedding-3-small", 0)
+
+    def test_shared_collection_serves_other_replicas(self, chunk_cache, monkeypatch):
+        """Test that embeddings stored by one replica are reused by another with a cold local cache."""
+        from services import document_service, embedding_cache
+
+        shared = FakeSharedCollection()
+        monkeypatch.setattr(embedding_cache, "_shared_collection", lambda: shared)
+        first = asyncio.run(document_service.generate_embeddings(["summary", "skills"]))
+
+        monkeypatch.setattr(embedding_cache, "_cache", TTLCache(max_size=100, ttl_seconds=60))
+        assert asyncio.run(document_service.generate_embeddings(["skills", "summary"])) == first[::-1]
+        assert len(chunk_cache.requests) == 1
+        assert embedding_cache.get_stats()["shared_hits"] == 2
+
+
+class TestAnswerCache:
+    def setup_method(self):
+        from services import answer_cache
+        answer_cache.invalidate()
+
+    def test_near_duplicate_question_hits(self):
+        """Test that a question within the cosine distance reuses the answer."""
+        from services import answer_cache
+
+        sources = [{"document_id": "d1", "filename": "cv.pdf", "content": "...", "score": 0.9}]
+        answer_cache.store([1.0, 0.0, 0.0], [], "answer", sources, answer_cache.generation())
+
+        assert answer_cache.lookup([0.99, 0.01, 0.0], []) == ("answer", sources)
+        assert answer_cache.lookup([0.0, 1.0, 0.0], []) is None
+
+    def test_different_history_misses(self):
+        """Test that answers are not reused across different conversation history."""
+        from models.chat import ChatMessage
+        from services import answer_cache
+
+        answer_cache.store([1.0, 0.0], [], "answer", [], answer_cache.generation())
+        history = [ChatMessage(role="user", content="Hi")]
+        assert answer_cache.lookup([1.0, 0.0], history) is None
+
+    def test_corpus_change_invalidates(self):
+        """Test that invalidation drops entries and rejects answers computed before it."""
+        from services import answer_cache
+
+        stale_generation = answer_cache.generation()
+        answer_cache.store([1.0, 0.0], [], "answer", [], stale_generation)
+        answer_cache.invalidate()
+        assert answer_cache.lookup([1.0, 0.0], []) is None
+
+        answer_cache.store([1.0, 0.0], [], "stale", [], stale_generation)
+        assert answer_cache.lookup([1.0, 0.0], []) is None
@@ -0,0 +1,57 @@
+from services.context_packer import merge_adjacent_chunks, pack_context
+from utils.tokens import count_tokens
+
+
+def make_chunk(index, content, score, document_id="doc-1"):
+    return {
+        "chunk_index": index,
+        "content": content,
+        "score": score,
+        "metadata": {"document_id": document_id}
+    }
+
+
+class TestMergeAdjacentChunks:
+    def test_adjacent_chunks_merge_without_repeating_overlap(self):
+        """Test that consecutive chunks are joined and their overlap removed."""
+        overlap = "shared overlapping sentence between chunks."
+        chunks = [
+            make_chunk(1, f"{overlap} Second part.", 0.7),
+            make_chunk(0, f"First part. {overlap}", 0.9),
+        ]
+
+        passages = merge_adjacent_chunks(chunks)
+        assert len(passages) == 1
+        assert passages[0]["content"] == f"First part. {overlap} Second part."
+        assert passages[0]["score"] == 0.9
+
+    def test_non_adjacent_chunks_stay_separate(self):
+        """Test that gaps in chunk_index or different documents are not merged."""
+        chunks = [
+            make_chunk(0, "Alpha text here.", 0.9),
+            make_chunk(2, "Gamma text here.", 0.8),
+            make_chunk(1, "Beta text here.", 0.7, document_id="doc-2"),
+        ]
+        assert len(merge_adjacent_chunks(chunks)) == 3
+
+
+class TestPackContext:
+    def test_orders_by_score_and_drops_near_duplicates(self):
+        """Test that passages are ordered by score and duplicates removed."""
+        text = "Draco built a distributed tracing platform used across the company"
+        chunks = [
+            make_chunk(0, "Unrelated low scoring passage about hobbies and travel", 0.6),
+            make_chunk(5, text, 0.9),
+            make_chunk(0, text + " daily", 0.8, document_id="doc-2"),
+        ]
+        assert pack_context(chunks, max_tokens=1000) == [
+            text,
+            "Unrelated low scoring passage about hobbies and travel",
+        ]
+
+    def test_respects_token_budget(self):
+        """Test that the packed context never exceeds the budget."""
+        chunks = [make_chunk(i * 2, f"passage {i} " + "word " * 200, 1 - i / 10) for i in range(5)]
+        passages = pack_context(chunks, max_tokens=300)
+        assert sum(count_tokens(p) for p in passages) <= 300
+        assert passages[0].startswith("passage 0")
@@ -0,0 +1,195 @@
+import asyncio
+import copy
+from types import SimpleNamespace
+
+import pytest
+
+import config
+from services import (
+    document_service,
+    embedding_config,
+    embedding_migration,
+    vector_store,
+)
+from utils import vector_codec
+
+
+def get_path(doc, path):
+    for key in path.split("."):
+        if not isinstance(doc, dict) or key not in doc:
+            return None
+        doc = doc[key]
+    return doc
+
+
+def set_path(doc, path, value):
+    *parents, last = path.split(".")
+    for key in parents:
+        doc = doc.setdefault(key, {})
+    doc[last] = value
+
+
+def matches(doc, query):
+    for path, condition in query.items():
+        if path == "$or":
+            continue  # Lease conditions always pass for a single worker
+        value = get_path(doc, path)
+        if isinstance(condition, dict) and "$ne" in condition:
+            if value == condition["$ne"]:
+                return False
+        elif isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif isinstance(condition, dict) and "$nin" in condition:
+            if value in condition["$nin"]:
+                return False
+        elif isinstance(condition, dict) and "$exists" in condition:
+            if (value is not None) != condition["$exists"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeConfigCollection:
+    def __init__(self, doc):
+        self.doc = doc
+
+    async def find_one(self, query):
+        return copy.deepcopy(self.doc)
+
+    async def update_one(self, query, update, upsert=False):
+        if not matches(self.doc, query):
+            return SimpleNamespace(modified_count=0)
+        for path, value in update.get("$set", {}).items():
+            set_path(self.doc, path, value)
+        for path, value in update.get("$inc", {}).items():
+            set_path(self.doc, path, (get_path(self.doc, path) or 0) + value)
+        return SimpleNamespace(modified_count=1)
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        result = await self.update_one(query, update)
+        return copy.deepcopy(self.doc) if result.modified_count else None
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def limit(self, count):
+        return FakeCursor(self.docs[:count])
+
+    async def to_list(self, length=None):
+        return copy.deepcopy(self.docs)
+
+
+class FakeChunkCollection:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def find(self, query, projection=None):
+        return FakeCursor([chunk for chunk in self.chunks if matches(chunk, query)])
+
+    async def count_documents(self, query):
+        return len([chunk for chunk in self.chunks if matches(chunk, query)])
+
+    async def bulk_write(self, updates, ordered=True):
+        by_id = {chunk["_id"]: chunk for chunk in self.chunks}
+        for update in updates:
+            by_id[update._filter["_id"]].update(update._doc["$set"])
+
+
+@pytest.fixture
+def migration_env(monkeypatch):
+    config_collection = FakeConfigCollection({
+        "_id": "active", "model": "text-embedding-3-small", "dimensions": 0, "field": "embedding", "version": 1
+    })
+    chunks = FakeChunkCollection([
+        {"_id": i, "content": f"chunk {i}", "embedding": [1.0, 0.0, 0.0]} for i in range(5)
+    ])
+    requests = []
+    switches = []
+
+    async def fake_generate_embeddings(texts, model=None, dimensions=None):
+        requests.append((len(texts), model, dimensions))
+        return [[1.0] * dimensions for _ in texts]
+
+    async def fake_get_chunks():
+        return chunks
+
+    async def fake_build_index(field):
+        # Queries must keep using the old configuration while the new index is built
+        switches.append(("build", field, embedding_config.field()))
+        return SimpleNamespace(field=field)
+
+    async def fake_use_index(index):
+        switches.append(("use", index.field, embedding_config.field()))
+        # An upload from a replica that has not seen the switch yet
+        chunks.chunks.append({"_id": 99, "content": "late upload", "embedding": [1.0, 0.0, 0.0]})
+
+    monkeypatch.setattr(embedding_config, "_active", dict(embedding_config._active))
+    monkeypatch.setattr(embedding_config, "get_collection", lambda: config_collection)
+    monkeypatch.setattr(vector_store, "get_collection", fake_get_chunks)
+    monkeypatch.setattr(vector_store, "build_index", fake_build_index)
+    monkeypatch.setattr(vector_store, "use_index", fake_use_index)
+    monkeypatch.setattr(document_service, "generate_embeddings", fake_generate_embeddings)
+    monkeypatch.setattr(config.settings, "EMBEDDING_MIGRATION_BATCH_SIZE", 2)
+    monkeypatch.setattr(config.settings, "EMBEDDING_STORAGE_FORMAT", "float32")
+    monkeypatch.setattr(config.settings, "EMBEDDING_MIGRATION_SETTLE_SECONDS", 0)
+    return SimpleNamespace(config=config_collection, chunks=chunks, requests=requests, switches=switches)
+
+
+class TestEmbeddingConfig:
+    def test_default_dimensions_are_omitted(self, monkeypatch):
+        """Test that dimensions=0 lets the model use its native size."""
+        monkeypatch.setattr(embedding_config, "_active", {
+            "model": "text-embedding-3-small", "dimensions": 0, "field": "embedding", "version": 1
+        })
+        assert embedding_config.embedding_kwargs() == {"model": "text-embedding-3-small"}
+        assert embedding_config.embedding_kwargs(output_dimensions=512) == {
+            "model": "text-embedding-3-small", "dimensions": 512
+        }
+
+
+class TestEmbeddingMigration:
+    def test_migration_backfills_then_switches(self, migration_env):
+        """Test that every chunk is re-embedded before the active field flips."""
+        async def run():
+            status = await embedding_migration.start("text-embedding-3-small", 4)
+            assert status["active"]["field"] == "embedding"
+            assert status["migration"]["field"] == "embedding_v2"
+            await embedding_migration._task
+
+        asyncio.run(run())
+
+        assert all(vector_codec.decode(chunk["embedding_v2"]).shape == (4,) for chunk in migration_env.chunks.chunks)
+        assert [size for size, _, _ in migration_env.requests] == [2, 2, 1, 1]
+        assert migration_env.config.doc["field"] == "embedding_v2"
+        assert migration_env.config.doc["dimensions"] == 4
+        assert migration_env.config.doc["migration"]["status"] == "completed"
+        assert migration_env.config.doc["migration"]["migrated"] == 5
+        assert embedding_config.field() == "embedding_v2"
+        assert migration_env.switches == [("build", "embedding_v2", "embedding"), ("use", "embedding_v2", "embedding_v2")]
+
+    def test_refresh_switches_after_the_new_index_is_built(self, migration_env, monkeypatch):
+        """Test that another replica keeps its configuration until the index for the new field is ready."""
+        migration_env.config.doc.update({"model": "text-embedding-3-large", "dimensions": 256, "field": "embedding_v2"})
+        monkeypatch.setattr(config.settings, "EMBEDDING_CONFIG_REFRESH_SECONDS", 0)
+
+        async def run():
+            embedding_config.start_refresh(embedding_migration.apply_switch)
+            while embedding_config.field() != "embedding_v2":
+                await asyncio.sleep(0)
+            await embedding_config.stop_refresh()
+
+        asyncio.run(asyncio.wait_for(run(), timeout=1))
+        assert migration_env.switches[0] == ("build", "embedding_v2", "embedding")
+        assert embedding_config.dimensions() == 256
+
+    def test_second_migration_is_rejected_while_running(self, migration_env):
+        """Test that only one migration can run at a time."""
+        migration_env.config.doc["migration"] = {"status": "running", "field": "embedding_v2"}
+
+        with pytest.raises(embedding_migration.HTTPException) as exc_info:
+            asyncio.run(embedding_migration.start("text-embedding-3-small", 512))
+        assert exc_info.value.status_code == 409
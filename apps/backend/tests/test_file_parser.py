@@ -0,0 +1,43 @@
+from benchmarks import synthetic_files
+from utils import file_parser
+
+
+class TestFileSources:
+    def test_path_and_bytes_parse_alike(self, tmp_path):
+        """Test that every parser gives the same text from a spooled file as from bytes."""
+        for file_format in synthetic_files.FORMATS:
+            content = synthetic_files.make_file(file_format, 20_000, seed=1)
+            path = tmp_path / f"upload.{file_format}"
+            path.write_bytes(content)
+
+            filename = f"resume.{file_format}"
+            assert file_parser.parse_file(str(path), filename) == file_parser.parse_file(content, filename)
+
+    def test_text_encodings_from_memory_map(self, tmp_path):
+        """Test that text files are decoded from the memory map, including fallbacks and empty files."""
+        path = tmp_path / "notes.txt"
+        path.write_bytes("Café résumé".encode("latin-1"))
+        assert file_parser.parse_text(path) == "Café résumé"
+
+        path.write_bytes(b"")
+        assert file_parser.parse_text(path) == ""
+
+
+class TestStreaming:
+    def test_streamed_cleaning_matches_whole_text(self):
+        """Test that cleaning the parsed pieces one by one gives the text clean_text gives for the whole document."""
+        for file_format in synthetic_files.FORMATS:
+            content = synthetic_files.make_file(file_format, 50_000, seed=2)
+            filename = f"resume.{file_format}"
+
+            streamed = "".join(file_parser.iter_clean_text(file_parser.iter_file(content, filename)))
+            assert streamed == file_parser.clean_text(file_parser.parse_file(content, filename))
+
+    def test_text_blocks_split_at_line_breaks(self, monkeypatch):
+        """Test that text files are decoded in blocks of whole lines, even across multi-byte characters."""
+        monkeypatch.setattr(file_parser, "TEXT_BLOCK_BYTES", 8)
+        text = "Café one\nrésumé two\n\nthree"
+
+        blocks = list(file_parser.iter_text(text.encode("utf-8")))
+        assert len(blocks) > 1
+        assert "\n".join(blocks) == text
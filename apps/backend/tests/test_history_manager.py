@@ -0,0 +1,63 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import config
+from models.chat import ChatMessage
+from services import history_manager
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=f"summary #{self.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    fake = FakeCompletions()
+    monkeypatch.setattr(config, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=fake)))
+    monkeypatch.setattr(config.settings, "HISTORY_MAX_TOKENS", 200)
+    monkeypatch.setattr(config.settings, "HISTORY_KEEP_RECENT_TOKENS", 100)
+    history_manager._summaries.clear()
+    return fake
+
+
+def make_history(turns):
+    return [
+        ChatMessage(role="user" if i % 2 == 0 else "assistant", content=f"message {i} " + "word " * 30)
+        for i in range(turns)
+    ]
+
+
+def compact(history, conversation_id="conv-1"):
+    return asyncio.run(history_manager.compact_history(history, conversation_id))
+
+
+class TestCompactHistory:
+    def test_short_history_is_unchanged(self, completions):
+        """Test that history within budget is forwarded as-is without summarizing."""
+        history = make_history(2)
+        assert compact(history) == [{"role": m.role, "content": m.content} for m in history]
+        assert completions.calls == 0
+
+    def test_long_history_is_summarized_and_recent_turns_kept(self, completions):
+        """Test that older turns are folded into a summary message."""
+        history = make_history(10)
+        messages = compact(history)
+        assert messages[0]["role"] == "system"
+        assert "summary #1" in messages[0]["content"]
+        assert messages[-1]["content"] == history[-1].content
+        assert completions.calls == 1
+
+    def test_cached_summary_is_reused_on_the_next_turn(self, completions):
+        """Test that the following turn reuses the summary instead of re-summarizing."""
+        history = make_history(10)
+        compact(history)
+        compact(history + make_history(1))
+        assert completions.calls == 1
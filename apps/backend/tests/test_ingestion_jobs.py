@@ -0,0 +1,202 @@
+import asyncio
+import io
+from datetime import UTC, datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import config
+from benchmarks.memory_store import MemoryJobStore
+from main import app
+from services import answer_cache, document_service, ingestion_jobs, vector_store
+
+client = TestClient(app)
+
+TEXT = ("Draco builds retrieval pipelines with FastAPI and MongoDB. " * 40).encode("utf-8")
+
+
+@pytest.fixture
+def store(monkeypatch):
+    memory = MemoryJobStore()
+    monkeypatch.setattr(ingestion_jobs, "_store", memory)
+    return memory
+
+
+@pytest.fixture
+def inserted(monkeypatch):
+    """Chunks passed to vector_store.insert_chunks, with fake embeddings"""
+    chunks = []
+
+    async def fake_embeddings(texts, model=None, dimensions=None):
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+    async def fake_insert(documents):
+        chunks.extend(documents)
+        return [str(i) for i in range(len(documents))]
+
+    async def fake_delete(document_id):
+        kept = [chunk for chunk in chunks if chunk["metadata"]["document_id"] != document_id]
+        deleted = len(chunks) - len(kept)
+        chunks[:] = kept
+        return deleted
+
+    monkeypatch.setattr(document_service, "generate_embeddings", fake_embeddings)
+    monkeypatch.setattr(vector_store, "insert_chunks", fake_insert)
+    monkeypatch.setattr(vector_store, "delete_document", fake_delete)
+    monkeypatch.setattr(answer_cache, "invalidate", lambda: None)
+    monkeypatch.setattr(config.settings, "EMBEDDING_STORAGE_FORMAT", "array")
+    return chunks
+
+
+def submit(filename, content):
+    return asyncio.run(ingestion_jobs.submit(filename, io.BytesIO(content), len(content)))
+
+
+def run_next_job(store):
+    async def run():
+        job = await store.claim(ingestion_jobs._owner, ingestion_jobs._lease_until())
+        assert job is not None
+        await ingestion_jobs._process(job)
+
+    asyncio.run(run())
+
+
+class TestIngestionJobs:
+    def test_job_runs_to_done(self, store, inserted):
+        """Test that a queued upload is parsed, embedded and stored, then its payload dropped."""
+        job = submit("notes.txt", TEXT)
+        assert job["status"] == "queued"
+
+        run_next_job(store)
+
+        done = asyncio.run(ingestion_jobs.get_job(job["id"]))
+        assert done["status"] == "done"
+        assert done["chunk_count"] == len(inserted) == done["chunks_embedded"]
+        assert {chunk["metadata"]["document_id"] for chunk in inserted} == {job["document_id"]}
+        assert store.files == {} and store.chunks == {}
+
+    def test_resume_after_parsing(self, store, inserted, monkeypatch):
+        """Test that a job interrupted while embedding resumes from its parsed chunks."""
+        deleted = []
+
+        async def fake_delete(document_id):
+            deleted.append(document_id)
+            return 1
+
+        monkeypatch.setattr(vector_store, "delete_document", fake_delete)
+        job = submit("notes.txt", TEXT)
+        store.jobs[job["id"]].update(status="embedding", chunk_count=2, chunks_embedded=1, attempts=1)
+        store.chunks[job["id"]] = b'"first chunk"\n"second chunk"\n'
+        del store.files[job["id"]]  # Parsing again would fail
+
+        run_next_job(store)
+
+        assert store.jobs[job["id"]]["status"] == "done"
+        assert deleted == [job["document_id"]]  # Partial inserts of the crashed attempt
+        assert [chunk["content"] for chunk in inserted] == ["first chunk", "second chunk"]
+
+    def test_resume_removes_chunks_inserted_before_progress_was_recorded(self, store, inserted):
+        """Test that a batch inserted just before a crash is not duplicated when chunks_embedded is still 0."""
+        job = submit("notes.txt", TEXT)
+        store.jobs[job["id"]].update(status="embedding", chunk_count=1, chunks_embedded=0, attempts=1)
+        store.chunks[job["id"]] = b'"only chunk"\n'
+        inserted.append({"content": "only chunk", "metadata": {"document_id": job["document_id"]}})
+
+        run_next_job(store)
+
+        assert store.jobs[job["id"]]["status"] == "done"
+        assert [chunk["content"] for chunk in inserted] == ["only chunk"]
+
+    def test_failed_job_removes_its_chunks(self, store, inserted, monkeypatch):
+        """Test that chunks inserted before a terminal failure are deleted with the job."""
+        calls = []
+
+        async def fail_second_batch(texts, model=None, dimensions=None):
+            calls.append(len(texts))
+            if len(calls) > 1:
+                raise ValueError("rejected by the embedding model")
+            return [[0.1, 0.2, 0.3] for _ in texts]
+
+        monkeypatch.setattr(document_service, "generate_embeddings", fail_second_batch)
+        monkeypatch.setattr(ingestion_jobs, "PROGRESS_BATCH_SIZE", 1)
+        monkeypatch.setattr(config.settings, "CHUNK_SIZE", 200)
+        monkeypatch.setattr(config.settings, "CHUNK_OVERLAP", 20)
+        job = submit("notes.txt", TEXT)
+        run_next_job(store)
+
+        assert store.jobs[job["id"]]["status"] == "failed"
+        assert len(calls) == 2
+        assert inserted == []
+
+    def test_bad_file_fails(self, store, inserted):
+        """Test that a file without text fails the job with the reason."""
+        job = submit("empty.txt", b"   \n  ")
+        run_next_job(store)
+
+        failed = asyncio.run(ingestion_jobs.get_job(job["id"]))
+        assert failed["status"] == "failed"
+        assert "insufficient text" in failed["error"]
+        assert inserted == []
+
+    def test_transient_failure_is_retried_later(self, store, inserted, monkeypatch):
+        """Test that an upstream outage keeps the job in its stage until the backoff passes."""
+        async def unavailable(texts, model=None, dimensions=None):
+            raise ConnectionError("OpenAI unreachable")
+
+        monkeypatch.setattr(document_service, "generate_embeddings", unavailable)
+        job = submit("notes.txt", TEXT)
+        run_next_job(store)
+
+        stored = store.jobs[job["id"]]
+        assert stored["status"] == "embedding"
+        assert stored["error"] == "OpenAI unreachable"
+        assert stored["lease_until"] > datetime.now(UTC)
+
+    def test_upload_returns_202_and_status(self, store, monkeypatch):
+        """Test that the upload endpoint queues a job readable through the status endpoint."""
+        monkeypatch.setattr(config.settings, "ADMIN_API_KEY", "secret")
+        monkeypatch.setattr(config, "openai_client", object())
+        monkeypatch.setattr(config, "mongodb_client", object())
+        headers = {"X-API-Key": "secret"}
+
+        response = client.post(
+            "/admin/documents/upload",
+            headers=headers,
+            files={"file": ("notes.txt", TEXT, "text/plain")}
+        )
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+
+        status = client.get(f"/admin/documents/jobs/{job_id}", headers=headers)
+        assert status.status_code == 200
+        assert status.json()["status"] == "queued"
+        assert client.get("/admin/documents/jobs/missing", headers=headers).status_code == 404
+
+    def test_chunks_are_inserted_in_batches(self, store, inserted, monkeypatch):
+        """Test that chunks are embedded and inserted batch by batch with document-wide indexes."""
+        batches = []
+
+        async def record_insert(documents):
+            batches.append(len(documents))
+            inserted.extend(documents)
+            return [str(i) for i in range(len(documents))]
+
+        monkeypatch.setattr(vector_store, "insert_chunks", record_insert)
+        monkeypatch.setattr(ingestion_jobs, "PROGRESS_BATCH_SIZE", 3)
+        monkeypatch.setattr(config.settings, "CHUNK_SIZE", 200)
+        monkeypatch.setattr(config.settings, "CHUNK_OVERLAP", 20)
+        job = submit("notes.txt", TEXT)
+        run_next_job(store)
+
+        total = store.jobs[job["id"]]["chunk_count"]
+        assert total > 3 and max(batches) == 3 and sum(batches) == total
+        assert [chunk["chunk_index"] for chunk in inserted] == list(range(total))
+        assert {chunk["metadata"]["total_chunks"] for chunk in inserted} == {total}
+
+    def test_partial_store_cannot_be_created(self):
+        """Test that a job store missing a method fails when instantiated, not when a job first needs it."""
+        class PartialStore(MemoryJobStore):
+            delete_payload = ingestion_jobs.JobStore.delete_payload
+
+        with pytest.raises(TypeError, match="delete_payload"):
+            PartialStore()
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from services import lexical_index
+from services.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def make_chunk(chunk_id, content, document_id="doc-1"):
+    return {
+        "_id": chunk_id,
+        "filename": "resume.pdf",
+        "content": content,
+        "metadata": {"document_id": document_id}
+    }
+
+
+@pytest.fixture
+def corpus(monkeypatch):
+    """Populate the module-level index with a small corpus."""
+    monkeypatch.setattr(lexical_index.config.settings, "LEXICAL_SEARCH_ENABLED", True)
+    lexical_index._index.clear()
+    lexical_index.add([
+        make_chunk(1, "Worked at Acme Corp building Kubernetes platforms."),
+        make_chunk(2, "Frontend work with React and Next.js for several years."),
+        make_chunk(3, "Led a team of engineers; mentoring and hiring.", "doc-2"),
+        *(make_chunk(10 + i, f"Experience {i}: shipped features and reviewed code.", "doc-3") for i in range(20)),
+    ])
+    yield
+    lexical_index._index.clear()
+
+
+class TestTokenize:
+    def test_keeps_technology_names_and_drops_stopwords(self):
+        """Test that tech names survive tokenization and stopwords are removed."""
+        assert tokenize("What is your C++, C# and Node.js experience?") == ["c++", "c#", "node.js", "experience"]
+
+
+class TestBM25Index:
+    def test_ranks_chunks_containing_rare_terms_first(self):
+        """Test that a chunk matching the query term outranks the rest."""
+        index = BM25Index()
+        index.add([make_chunk(1, "python python fastapi"), make_chunk(2, "react frontend")])
+        results = index.search("fastapi")
+        assert [r["_id"] for r in results] == [1]
+
+    def test_remove_document_removes_postings(self):
+        """Test that deleted chunks no longer match."""
+        index = BM25Index()
+        index.add([make_chunk(1, "kubernetes", "doc-1"), make_chunk(2, "kubernetes", "doc-2")])
+        index.remove_document("doc-1")
+        assert [r["_id"] for r in index.search("kubernetes")] == [2]
+        assert index.stats()["chunks"] == 1
+
+
+class TestFastPath:
+    def test_decisive_exact_term_match(self, corpus):
+        """Test that an exact company name is answered lexically."""
+        results = lexical_index.fast_path("Acme Corp")
+        assert [r["_id"] for r in results] == [1]
+        assert "score" not in results[0]
+
+    def test_long_or_unmatched_queries_need_vector_search(self, corpus):
+        """Test that vague or long questions fall through to vector search."""
+        assert lexical_index.fast_path("Describe your leadership philosophy and mentoring style") is None
+        assert lexical_index.fast_path("Golang") is None
+
+    def test_single_or_common_terms_need_vector_search(self, corpus):
+        """Test that one-word hits and terms found in most chunks never skip vector search."""
+        assert lexical_index.fast_path("Kubernetes") is None
+        assert lexical_index.fast_path("What is your experience?") is None
+        assert lexical_index.fast_path("shipped features") is None
+
+
+    def test_chat_checks_the_fast_path_once(self, corpus, monkeypatch):
+        """Test that the fast-path result found by the answer cache check is reused for retrieval."""
+        from services import rag_service
+
+        calls = []
+        fast_path = lexical_index.fast_path
+        monkeypatch.setattr(lexical_index, "fast_path", lambda *args, **kwargs: calls.append(args) or fast_path(*args, **kwargs))
+
+        async def run():
+            query_embedding, fast_results, cached = await rag_service.check_answer_cache("Acme Corp", [])
+            assert query_embedding is None and cached is None
+            return await rag_service.build_rag_messages(
+                "Acme Corp", [], "prompt", query_embedding=query_embedding, fast_results=fast_results
+            )
+
+        _, sources = asyncio.run(run())
+        assert len(calls) == 1
+        assert [source["score"] for source in sources] == [0]
+
+
+class TestReciprocalRankFusion:
+    def test_chunks_found_by_both_rankers_come_first(self):
+        """Test that RRF promotes agreement and keeps the vector score."""
+        vector = [{**make_chunk(1, "a"), "score": 0.9}, {**make_chunk(2, "b"), "score": 0.8}]
+        lexical = [{**make_chunk(2, "b"), "lexical_score": 4.0}, {**make_chunk(3, "c"), "lexical_score": 2.0}]
+        fused = reciprocal_rank_fusion([vector, lexical], top_k=3)
+        assert [r["_id"] for r in fused] == [2, 1, 3]
+        assert fused[0]["score"] == 0.8
+        assert "score" not in fused[2]
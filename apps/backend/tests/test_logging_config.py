@@ -0,0 +1,63 @@
+import json
+import logging
+
+from fastapi.testclient import TestClient
+
+from main import app
+from utils.logging_config import (
+    DebugSamplingFilter,
+    JsonFormatter,
+    RequestIdFilter,
+    parse_levels,
+    request_id_var,
+)
+
+client = TestClient(app)
+
+
+def make_record(level=logging.INFO, **extra):
+    record = logging.LogRecord("services.rag_service", level, __file__, 1, "hello %s", ("world",), None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class TestLoggingConfig:
+    def test_json_formatter_includes_request_id_and_extra_fields(self):
+        """Test that records become one JSON object with context and extra fields."""
+        token = request_id_var.set("req-123")
+        try:
+            record = make_record(chunks=3)
+            RequestIdFilter().filter(record)
+        finally:
+            request_id_var.reset(token)
+
+        payload = json.loads(JsonFormatter().format(record))
+        assert payload["message"] == "hello world"
+        assert payload["logger"] == "services.rag_service"
+        assert payload["request_id"] == "req-123"
+        assert payload["chunks"] == 3
+
+    def test_debug_sampling_is_consistent_per_request(self):
+        """Test that a request's debug records are all kept or all dropped."""
+        sampler = DebugSamplingFilter(rate=0.5)
+        for request_id in ("a", "b", "c", "d"):
+            decisions = {
+                sampler.filter(make_record(logging.DEBUG, request_id=request_id)) for _ in range(5)
+            }
+            assert len(decisions) == 1
+
+        assert sampler.filter(make_record(logging.WARNING, request_id="a"))
+        assert not DebugSamplingFilter(rate=0).filter(make_record(logging.DEBUG))
+
+    def test_parse_levels(self):
+        """Test per-logger level parsing from LOG_LEVELS."""
+        assert parse_levels("services.rag_service=debug, uvicorn.access=WARNING,,bad") == {
+            "services.rag_service": "DEBUG",
+            "uvicorn.access": "WARNING"
+        }
+
+    def test_request_id_header_is_echoed_or_generated(self):
+        """Test that responses carry the incoming or a generated request ID."""
+        assert client.get("/ping", headers={"X-Request-ID": "abc"}).headers["x-request-id"] == "abc"
+        assert len(client.get("/ping").headers["x-request-id"]) == 32
@@ -1,3 +1,5 @@
+from types import SimpleNamespace
+
 from fastapi.testclient import TestClient
 
 from main import app
@@ -48,3 +50,125 @@ class TestChatEndpoint:
             data = response.json()
             assert "response" in data
             assert isinstance(data["response"], str)
+
+    def test_chat_direct_mode_uses_async_client(self, monkeypatch):
+        """Test that direct mode awaits the shared async OpenAI client."""
+        import config
+
+        class FakeCompletions:
+            async def create(self, **kwargs):
+                message = SimpleNamespace(content=f"echo: {kwargs['messages'][-1]['content']}")
+                return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        fake_client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+        monkeypatch.setattr(config, "openai_client", fake_client)
+
+        response = client.post(
+            "/chat",
+            json={"message": "Hello", "use_rag": False}
+        )
+        assert response.status_code == 200
+        assert response.json()["response"] == "echo: Hello"
+
+
+class TestChatStreamEndpoint:
+    def test_chat_stream_empty_message_returns_400(self):
+        """Test that empty messages are rejected before streaming starts."""
+        response = client.post(
+            "/chat/stream",
+            json={"message": "   "}
+        )
+        assert response.status_code == 400
+
+    def test_chat_stream_direct_mode_emits_sources_tokens_done(self, monkeypatch):
+        """Test that the stream sends sources first, then tokens, then done."""
+        import config
+
+        class FakeStream:
+            def __init__(self, tokens):
+                self._tokens = iter(tokens)
+
+            def __aiter__(self):
+                return self
+
+            async def close(self):
+                pass
+
+            async def __anext__(self):
+                try:
+                    token = next(self._tokens)
+                except StopIteration:
+                    raise StopAsyncIteration from None
+                delta = SimpleNamespace(content=token)
+                return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+        class FakeCompletions:
+            async def create(self, **kwargs):
+                assert kwargs["stream"] is True
+                return FakeStream(["Hel", "lo"])
+
+        fake_client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+        monkeypatch.setattr(config, "openai_client", fake_client)
+
+        response = client.post(
+            "/chat/stream",
+            json={"message": "Hi", "use_rag": False}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = [
+            line.removeprefix("event: ")
+            for line in response.text.splitlines()
+            if line.startswith("event: ")
+        ]
+        assert events == ["sources", "token", "token", "done"]
+        assert 'data: {"content": "Hel"}' in response.text
+
+    def test_chat_stream_deadline_skips_client_reads(self, monkeypatch):
+        """Test that the request deadline bounds opening the stream but not the time the client takes to read it."""
+        import asyncio
+
+        from fastapi import Request
+
+        import config
+        from models.chat import ChatRequest
+        from routers.chat import stream_chat_events
+        from utils import resilience
+
+        budgets = []
+
+        class FakeStream:
+            def __init__(self):
+                self._tokens = iter(["Hel", "lo"])
+
+            def __aiter__(self):
+                return self
+
+            async def close(self):
+                pass
+
+            async def __anext__(self):
+                budgets.append(resilience.remaining())
+                token = next(self._tokens, None)
+                if token is None:
+                    raise StopAsyncIteration
+                return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+        class FakeCompletions:
+            async def create(self, **kwargs):
+                return FakeStream()
+
+        monkeypatch.setattr(config, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions())))
+        monkeypatch.setattr(config.settings, "CHAT_DEADLINE_SECONDS", 0.05)
+
+        async def run():
+            events = []
+            async for event in stream_chat_events(ChatRequest(message="Hi", use_rag=False), Request({"type": "http"})):
+                await asyncio.sleep(0.1)  # A client slower than the whole deadline
+                events.append(event.split("\n")[0])
+            return events
+
+        assert asyncio.run(run()) == ["event: sources", "event: token", "event: token", "event: done"]
+        assert budgets[0] is not None
+        assert budgets[1:] == [None, None]
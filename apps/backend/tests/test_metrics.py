@@ -0,0 +1,51 @@
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import config
+from main import app
+from utils import metrics
+
+client = TestClient(app)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetrics:
+    def test_stage_records_latency_and_errors(self):
+        """Test that a failing stage is both timed and counted by exception type."""
+        before_count = sample("rag_stage_duration_seconds_count", stage="test_stage")
+        before_errors = sample("errors_total", stage="test_stage", type="KeyError")
+
+        with pytest.raises(KeyError), metrics.rag_stage("test_stage"):
+            raise KeyError("missing")
+
+        assert sample("rag_stage_duration_seconds_count", stage="test_stage") == before_count + 1
+        assert sample("errors_total", stage="test_stage", type="KeyError") == before_errors + 1
+
+    def test_token_usage_is_counted_by_direction(self):
+        """Test that prompt and completion tokens are counted separately."""
+        before_in = sample("openai_tokens_total", operation="test", direction="in")
+        usage = type("Usage", (), {"prompt_tokens": 12, "completion_tokens": 5})()
+
+        metrics.record_tokens("test", usage)
+        metrics.record_tokens("test", None)
+
+        assert sample("openai_tokens_total", operation="test", direction="in") == before_in + 12
+
+    def test_metrics_endpoint_serves_prometheus_text(self):
+        """Test that /metrics exposes the stage histograms."""
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "rag_stage_duration_seconds" in response.text
+
+    def test_metrics_token_is_required_when_set(self, monkeypatch):
+        """Test that /metrics needs the bearer token once METRICS_TOKEN is configured."""
+        monkeypatch.setattr(config.settings, "METRICS_TOKEN", "scrape")
+
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer scrape"}).status_code == 200
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from utils import process_pool
+
+
+def square(x):
+    return x * x
+
+
+def sleep_then_pid(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def allocate(mb):
+    return len(bytearray(mb * 1024 * 1024))
+
+
+def is_loaded(module):
+    return module in sys.modules
+
+
+def die():
+    os._exit(1)
+
+
+def fail():
+    raise ValueError("not a document")
+
+
+@pytest.fixture
+def pool():
+    # Workers import this module to unpickle the tasks; it must be loaded before the memory cap
+    pool = process_pool.WorkerPool("test", workers=1, timeout=2, memory_limit_mb=64, preload=(__name__,))
+    yield pool
+    pool.shutdown()
+
+
+class TestWorkerPool:
+    def test_runs_in_another_process(self, pool):
+        """Test that tasks run in a worker process and errors come back as raised."""
+        async def run():
+            assert await pool.run(square, 7) == 49
+            assert await pool.run(sleep_then_pid, 0) != os.getpid()
+            with pytest.raises(ValueError, match="not a document"):
+                await pool.run(fail)
+
+        asyncio.run(run())
+        assert pool.stats()["tasks"] == {"ok": 2, "error": 1}
+
+    def test_timeout_kills_worker_and_recovers(self, pool):
+        """Test that a task past the timeout is killed and the next task gets a fresh worker."""
+        pool.timeout = 0.5
+
+        async def run():
+            first = await pool.run(sleep_then_pid, 0)
+            with pytest.raises(process_pool.TaskTimeout):
+                await pool.run(sleep_then_pid, 30)
+            assert await pool.run(sleep_then_pid, 0) != first
+
+        started = time.monotonic()
+        asyncio.run(run())
+        assert time.monotonic() - started < 10
+        assert pool.stats()["tasks"]["timeout"] == 1
+
+    def test_memory_cap(self, pool):
+        """Test that a task allocating past the memory cap fails with MemoryError without killing the pool."""
+        async def run():
+            with pytest.raises(MemoryError):
+                await pool.run(allocate, 256)
+            assert await pool.run(allocate, 8) == 8 * 1024 * 1024
+
+        asyncio.run(run())
+        assert pool.stats()["tasks"] == {"memory": 1, "ok": 1}
+
+    def test_preload_is_imported_before_the_cap(self):
+        """Test that preloaded modules are imported by the worker and do not count against its memory cap."""
+        pool = process_pool.WorkerPool("test", memory_limit_mb=64, preload=(__name__, "utils.extraction"))
+
+        async def run():
+            assert await pool.run(is_loaded, "utils.extraction")
+            assert await pool.run(allocate, 32) == 32 * 1024 * 1024
+
+        try:
+            asyncio.run(run())
+        finally:
+            pool.shutdown()
+
+    def test_worker_initializer_stays_light(self):
+        """Test that starting a worker does not import the application (config, metrics, OpenAI)."""
+        check = "import sys, utils.pool_worker; print(sorted({'config', 'openai', 'utils.metrics'} & set(sys.modules)))"
+        output = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True).stdout
+        assert output.strip() == "[]"
+
+    def test_crashed_worker_is_replaced(self, pool):
+        """Test that a worker dying mid-task raises WorkerCrashed and the pool restarts."""
+        async def run():
+            with pytest.raises(process_pool.WorkerCrashed):
+                await pool.run(die)
+            assert await pool.run(square, 3) == 9
+
+        asyncio.run(run())
+
+    def test_inline_mode(self):
+        """Test that inline mode runs tasks on the calling thread."""
+        pool = process_pool.WorkerPool("test", mode="inline")
+        assert asyncio.run(pool.run(sleep_then_pid, 0)) == os.getpid()
+        with pytest.raises(ValueError, match="Unknown executor mode"):
+            process_pool.WorkerPool("test", mode="fork")
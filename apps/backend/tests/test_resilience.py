@@ -0,0 +1,195 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import config
+from main import app
+from utils import resilience
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(config.settings, "RETRY_BACKOFF_BASE_MS", 0)
+
+
+class Flaky:
+    """Coroutine function failing with the given errors before succeeding"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class TestCall:
+    def test_retries_transient_failures(self):
+        """Test that timeouts and connection errors are retried."""
+        func = Flaky(ConnectionError("reset"), TimeoutError())
+        assert asyncio.run(resilience.call("test", func, timeout=1, retries=2)) == "ok"
+        assert func.calls == 3
+
+    def test_does_not_retry_other_errors(self):
+        """Test that a bad request fails on the first attempt."""
+        func = Flaky(ValueError("bad input"))
+        with pytest.raises(ValueError):
+            asyncio.run(resilience.call("test", func, timeout=1, retries=2))
+        assert func.calls == 1
+
+    def test_gives_up_after_retries(self):
+        """Test that the last transient error is raised once retries run out."""
+        func = Flaky(ConnectionError("1"), ConnectionError("2"))
+        with pytest.raises(ConnectionError, match="2"):
+            asyncio.run(resilience.call("test", func, timeout=1, retries=1))
+
+    def test_deadline_caps_the_timeout(self):
+        """Test that a call is cut off by the request deadline, not its own timeout."""
+        async def slow():
+            await asyncio.sleep(1)
+
+        async def run():
+            with resilience.deadline(0.05):
+                await resilience.call("test", slow, timeout=10, retries=3)
+
+        started = time.perf_counter()
+        with pytest.raises(resilience.DeadlineExceeded):
+            asyncio.run(run())
+        assert time.perf_counter() - started < 0.5
+
+    def test_expired_deadline_skips_the_call(self):
+        """Test that no call is made once the deadline has passed."""
+        func = Flaky()
+
+        async def run():
+            with resilience.deadline(0):
+                await resilience.call("test", func, timeout=1)
+
+        with pytest.raises(resilience.DeadlineExceeded):
+            asyncio.run(run())
+        assert func.calls == 0
+
+
+class TestCircuitBreaker:
+    def test_opens_and_fails_fast(self):
+        """Test that consecutive transient failures open the circuit."""
+        breaker = resilience.CircuitBreaker("test", failure_threshold=2, reset_seconds=60)
+        func = Flaky(*[ConnectionError()] * 5)
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                asyncio.run(resilience.call("test", func, timeout=1, breaker=breaker))
+
+        assert breaker.is_open()
+        with pytest.raises(resilience.CircuitOpenError) as error:
+            asyncio.run(resilience.call("test", func, timeout=1, breaker=breaker))
+        assert func.calls == 2
+        assert error.value.retry_after > 0
+
+    def test_bad_requests_do_not_open_the_circuit(self):
+        """Test that non-transient errors count as the upstream being healthy."""
+        breaker = resilience.CircuitBreaker("test", failure_threshold=1, reset_seconds=60)
+        with pytest.raises(ValueError):
+            asyncio.run(resilience.call("test", Flaky(ValueError()), timeout=1, breaker=breaker))
+        assert breaker.state == "closed"
+
+    def test_half_open_probe(self):
+        """Test that one probe is let through after the reset time and its result decides the state."""
+        breaker = resilience.CircuitBreaker("test", failure_threshold=1, reset_seconds=0)
+        breaker.record_failure()
+        assert breaker.allow()
+        assert not breaker.allow()  # Only one probe at a time
+
+        breaker.record_failure()
+        assert breaker.state == "open"
+
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+        assert breaker.allow()
+
+    def test_cancelled_probe_is_released(self):
+        """Test that a probe cancelled mid-call lets the next call probe instead of failing fast forever."""
+        breaker = resilience.CircuitBreaker("test", failure_threshold=1, reset_seconds=0)
+        breaker.record_failure()
+
+        async def slow():
+            await asyncio.sleep(10)
+
+        async def run():
+            probe = asyncio.create_task(resilience.call("test", slow, timeout=30, breaker=breaker))
+            await asyncio.sleep(0.01)
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+            return await resilience.call("test", Flaky(), timeout=1, breaker=breaker)
+
+        assert asyncio.run(run()) == "ok"
+        assert breaker.state == "closed"
+
+    def test_deadline_does_not_open_the_circuit(self):
+        """Test that calls cut short by a tight request deadline leave a slow but healthy upstream's breaker closed."""
+        breaker = resilience.CircuitBreaker("test", failure_threshold=1, reset_seconds=60)
+
+        async def slow():
+            await asyncio.sleep(0.1)
+            return "ok"
+
+        async def run():
+            with resilience.deadline(0.01):
+                await resilience.call("test", slow, timeout=1, breaker=breaker)
+
+        for _ in range(3):
+            with pytest.raises(resilience.DeadlineExceeded):
+                asyncio.run(run())
+        assert breaker.state == "closed"
+        assert asyncio.run(resilience.call("test", slow, timeout=1, breaker=breaker)) == "ok"
+
+    def test_stale_probe_times_out(self):
+        """Test that a probe that never reports back is given up after the probe timeout."""
+        breaker = resilience.CircuitBreaker("test", failure_threshold=1, reset_seconds=0, probe_timeout_seconds=0.01)
+        breaker.record_failure()
+        assert breaker.allow()
+        assert not breaker.allow()
+
+        time.sleep(0.02)
+        assert breaker.allow()
+
+
+class TestHedge:
+    def test_returns_the_faster_attempt(self):
+        """Test that a slow first attempt is overtaken by the hedged one."""
+        delays = [1.0, 0.0]
+
+        async def func():
+            await asyncio.sleep(delays.pop(0))
+            return "done"
+
+        started = time.perf_counter()
+        assert asyncio.run(resilience.hedge("test", func, delay_seconds=0.02)) == "done"
+        assert time.perf_counter() - started < 0.5
+
+    def test_no_hedge_when_fast(self):
+        """Test that a call finishing before the delay is not duplicated."""
+        func = Flaky()
+        assert asyncio.run(resilience.hedge("test", func, delay_seconds=0.5)) == "ok"
+        assert func.calls == 1
+
+
+class TestDegradedChat:
+    def test_open_circuit_returns_fallback(self, monkeypatch):
+        """Test that /chat answers with the fallback message while OpenAI is down."""
+        breaker = resilience.CircuitBreaker("openai", failure_threshold=1, reset_seconds=60)
+        breaker.record_failure()
+        monkeypatch.setattr(resilience, "openai_breaker", breaker)
+        monkeypatch.setattr(config, "openai_client", object())
+
+        response = client.post("/chat", json={"message": "Hello"})
+        assert response.status_code == 200
+        assert "temporarily unavailable" in response.json()["response"]
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from utils.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    def test_concurrent_identical_calls_share_one_execution(self):
+        """Test that concurrent callers with the same key coalesce."""
+        flights = SingleFlight()
+        executions = 0
+
+        async def work():
+            nonlocal executions
+            executions += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def run():
+            return await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+
+        assert asyncio.run(run()) == ["result"] * 5
+        assert executions == 1
+        assert flights.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+    def test_exceptions_propagate_to_every_caller(self):
+        """Test that a failure is delivered to all coalesced callers."""
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def run():
+            return await asyncio.gather(
+                flights.do("key", work), flights.do("key", work), return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_sequential_calls_are_not_coalesced(self):
+        """Test that a finished call is not reused for later requests."""
+        flights = SingleFlight()
+
+        async def work():
+            return 1
+
+        async def run():
+            await flights.do("key", work)
+            await flights.do("key", work)
+
+        asyncio.run(run())
+        assert flights.stats()["calls"] == 2
+
+    def test_cancelled_caller_does_not_cancel_shared_call(self):
+        """Test that other callers still get the result when one is cancelled."""
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def run():
+            first = asyncio.ensure_future(flights.do("key", work))
+            second = asyncio.ensure_future(flights.do("key", work))
+            await asyncio.sleep(0.005)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(run()) == "done"
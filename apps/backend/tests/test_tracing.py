@@ -0,0 +1,186 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import config
+from main import app
+from utils import metrics, tracing
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    memory = tracing.InMemoryExporter(100)
+    monkeypatch.setattr(tracing, "_exporter", memory)
+    monkeypatch.setattr(config.settings, "TRACING_SAMPLE_RATE", 1.0)
+    return memory
+
+
+class FakeStream:
+    """OpenAI AsyncStream stand-in that remembers whether it was closed"""
+
+    def __init__(self):
+        self.closed = False
+        self._events = iter(("Hi", " there"))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        content = next(self._events, None)
+        if content is None:
+            raise StopAsyncIteration
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], usage=None)
+
+    async def close(self):
+        self.closed = True
+
+
+def install_stream(monkeypatch):
+    stream = FakeStream()
+
+    async def create(**kwargs):
+        return stream
+
+    completions = SimpleNamespace(create=create)
+    monkeypatch.setattr(config, "openai_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    return stream
+
+
+class TestTracing:
+    def test_disabled_tracing_yields_no_span(self, monkeypatch):
+        """Test that spans are no-ops when no exporter is configured."""
+        monkeypatch.setattr(tracing, "_exporter", None)
+        with tracing.span("rag.vector_search") as span:
+            assert span is None
+            tracing.set_attribute("chunk.count", 3)
+
+    def test_stages_nest_under_the_current_span(self, exporter):
+        """Test that metrics stages become child spans carrying attributes."""
+        with tracing.span("POST /chat", kind="SERVER") as root:
+            with metrics.rag_stage("vector_search"):
+                tracing.set_attribute("chunk.count", 5)
+            with metrics.rag_stage("completion"):
+                metrics.record_tokens("chat", type("Usage", (), {"prompt_tokens": 120, "completion_tokens": 30})())
+
+        [trace] = exporter.recent_traces()
+        assert trace["trace_id"] == root.trace_id
+        [tree] = trace["spans"]
+        assert tree["name"] == "POST /chat"
+        assert [child["name"] for child in tree["children"]] == ["rag.vector_search", "rag.completion"]
+        assert tree["children"][0]["attributes"] == {"chunk.count": 5}
+        assert tree["children"][1]["attributes"] == {
+            "gen_ai.usage.input_tokens": 120, "gen_ai.usage.output_tokens": 30
+        }
+
+    def test_exception_marks_span_as_error(self, exporter):
+        """Test that a failing stage is exported with an error status."""
+        with pytest.raises(ValueError), metrics.upload_stage("parse"):
+            raise ValueError("bad pdf")
+
+        [trace] = exporter.recent_traces()
+        assert trace["spans"][0]["status"] == "ERROR"
+
+    def test_spans_follow_task_context(self, exporter):
+        """Test that concurrent requests keep separate traces."""
+        async def request(name):
+            with tracing.span(name):
+                await asyncio.sleep(0)
+                with tracing.span(f"{name}.child"):
+                    await asyncio.sleep(0)
+
+        async def run():
+            await asyncio.gather(request("a"), request("b"))
+
+        asyncio.run(run())
+
+        traces = exporter.recent_traces()
+        assert len(traces) == 2
+        for trace in traces:
+            [tree] = trace["spans"]
+            assert [child["name"] for child in tree["children"]] == [f"{tree['name']}.child"]
+
+    def test_stream_stage_excludes_client_reads(self, exporter, monkeypatch):
+        """Test that the completion_stream span ends before tokens are yielded to the client."""
+        from services import rag_service
+
+        install_stream(monkeypatch)
+
+        async def run():
+            tokens = []
+            with tracing.span("POST /chat/stream", kind="SERVER") as root:
+                async for token in rag_service.stream_completion([], temperature=0.3):
+                    assert tracing._current_span.get() is root
+                    await asyncio.sleep(0.05)  # A slow client
+                    tokens.append(token)
+            return tokens
+
+        assert asyncio.run(run()) == ["Hi", " there"]
+        [trace] = exporter.recent_traces()
+        [stage] = trace["spans"][0]["children"]
+        assert stage["name"] == "rag.completion_stream"
+        assert stage["duration_ms"] < 50
+
+    def test_stream_closed_when_client_leaves(self, monkeypatch):
+        """Test that the OpenAI stream is closed when the generator is closed after the first token."""
+        from services import rag_service
+
+        stream = install_stream(monkeypatch)
+
+        async def run():
+            tokens = rag_service.stream_completion([], temperature=0.3)
+            assert await anext(tokens) == "Hi"
+            await tokens.aclose()
+
+        asyncio.run(run())
+        assert stream.closed
+
+    def test_parse_traceparent(self):
+        """Test W3C traceparent parsing and rejection of malformed headers."""
+        header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        assert tracing.parse_traceparent(header) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7")
+        assert tracing.parse_traceparent("") is None
+        assert tracing.parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+        assert tracing.parse_traceparent("00-xyz-00f067aa0ba902b7-01") is None
+
+    def test_otlp_serialization(self, exporter):
+        """Test that spans serialize to the OTLP/JSON shape."""
+        with tracing.span("upload.insert", **{"chunk.count": 4, "file.type": "pdf"}) as span:
+            pass
+
+        otlp = span.to_otlp()
+        assert otlp["kind"] == "SPAN_KIND_INTERNAL"
+        assert otlp["status"]["code"] == "STATUS_CODE_UNSET"
+        assert {"key": "chunk.count", "value": {"intValue": "4"}} in otlp["attributes"]
+        assert {"key": "file.type", "value": {"stringValue": "pdf"}} in otlp["attributes"]
+        assert "parentSpanId" not in otlp
+
+    def test_file_exporter_writes_otlp_lines(self, tmp_path):
+        """Test that the file exporter flushes spans as OTLP/JSON lines."""
+        path = tmp_path / "traces.jsonl"
+        file_exporter = tracing.FileExporter(str(path), flush_interval_seconds=0.01)
+        file_exporter.export(tracing.Span("GET /documents", "a" * 32, None, True, "SERVER"))
+        file_exporter.shutdown()
+
+        [line] = path.read_text().splitlines()
+        [span] = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert span["name"] == "GET /documents"
+        assert span["kind"] == "SPAN_KIND_SERVER"
+
+    def test_middleware_continues_remote_trace(self, exporter):
+        """Test that requests get a SERVER root span joined to an incoming traceparent."""
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+        client.get("/health")
+        client.get("/metrics")
+        client.get("/ping")
+        client.get("/nonexistent", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+
+        [trace] = exporter.recent_traces()
+        assert trace["trace_id"] == trace_id
+        root = trace["spans"][0]
+        assert root["name"] == "GET /nonexistent"
+        assert root["attributes"]["http.response.status_code"] == 404
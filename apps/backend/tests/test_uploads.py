@@ -0,0 +1,67 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import config
+from main import app
+from utils import uploads
+
+client = TestClient(app)
+
+HEADERS = {"X-API-Key": "secret"}
+
+
+@pytest.fixture(autouse=True)
+def small_limit(monkeypatch):
+    monkeypatch.setattr(config.settings, "ADMIN_API_KEY", "secret")
+    monkeypatch.setattr(config.settings, "MAX_FILE_SIZE_MB", 0.1)
+    monkeypatch.setattr(config, "openai_client", object())
+    monkeypatch.setattr(config, "mongodb_client", object())
+
+
+class TestUploadSizeLimit:
+    def test_rejects_by_content_length(self):
+        """Test that an oversized upload is rejected from its Content-Length header."""
+        response = client.post(
+            "/admin/documents/upload",
+            headers=HEADERS,
+            files={"file": ("big.txt", b"x" * 300_000, "text/plain")}
+        )
+        assert response.status_code == 413
+        assert "File too large" in response.json()["detail"]
+
+    def test_rejects_chunked_body_once_over_limit(self):
+        """Test that a body without Content-Length is cut off once it passes the limit."""
+        def body():
+            boundary = b"--limit\r\n"
+            yield boundary + b'Content-Disposition: form-data; name="file"; filename="big.txt"\r\n\r\n'
+            for _ in range(100):
+                yield b"x" * 10_000
+
+        response = client.post(
+            "/admin/documents/upload",
+            headers={**HEADERS, "Content-Type": "multipart/form-data; boundary=limit"},
+            content=body()
+        )
+        assert response.status_code == 413
+
+    def test_file_over_limit_inside_overhead(self):
+        """Test that a file just over the limit is still rejected by the handler."""
+        response = client.post(
+            "/admin/documents/upload",
+            headers=HEADERS,
+            files={"file": ("big.txt", b"x" * 110_000, "text/plain")}
+        )
+        assert response.status_code == 413
+
+
+    def test_per_type_limit(self, monkeypatch):
+        """Test that MAX_FILE_SIZE_MB_BY_TYPE lowers the limit for the listed formats only."""
+        monkeypatch.setattr(config.settings, "MAX_FILE_SIZE_MB_BY_TYPE", "docx=0.05")
+        response = client.post(
+            "/admin/documents/upload",
+            headers=HEADERS,
+            files={"file": ("report.docx", b"x" * 60_000, "application/octet-stream")}
+        )
+        assert response.status_code == 413
+        assert response.json()["detail"] == "File too large. Maximum size for .docx files: 0.05MB"
+        assert uploads.max_file_mb(".txt") == 0.1
@@ -0,0 +1,45 @@
+import numpy as np
+from bson.binary import BinaryVectorDtype
+
+from utils import vector_codec
+
+
+def cosine(a, b):
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+class TestVectorCodec:
+    def test_float32_round_trips_exactly(self):
+        """Test that float32 binary vectors decode to the original values."""
+        vector = [0.25, -0.5, 0.125, 1.0]
+        encoded = vector_codec.encode(vector, "float32")
+        assert encoded.as_vector().dtype == BinaryVectorDtype.FLOAT32
+        assert vector_codec.decode(encoded).tolist() == vector
+        assert len(encoded) == 2 + 4 * len(vector)
+
+    def test_int8_preserves_direction(self):
+        """Test that int8 quantization keeps cosine similarity close to the original."""
+        vector = np.random.default_rng(0).normal(size=256).astype(np.float32)
+        encoded = vector_codec.encode(vector, "int8")
+        assert encoded.as_vector().dtype == BinaryVectorDtype.INT8
+        assert cosine(vector_codec.decode(encoded), vector) > 0.99
+
+    def test_packed_bit_keeps_signs_and_padding(self):
+        """Test that packed bits decode to -1/+1 signs with padding stripped."""
+        vector = [0.3, -0.2, 0.0, 0.9, -0.1, 0.4, 0.2, -0.7, 0.5, -0.5]
+        encoded = vector_codec.encode(vector, "packed_bit")
+        assert encoded.as_vector().padding == 6
+        assert vector_codec.decode(encoded).tolist() == [1, -1, -1, 1, -1, 1, 1, -1, 1, -1]
+
+    def test_legacy_arrays_still_decode(self):
+        """Test that chunks stored as arrays of doubles are still readable."""
+        assert vector_codec.decode([1.0, 2.0]).dtype == np.float32
+
+    def test_chunk_vector_prefers_full_precision_copy(self):
+        """Test that rescoring copies win over quantized embeddings."""
+        chunk = {
+            "embedding": vector_codec.encode([0.5, -0.5], "packed_bit"),
+            "embedding_full": vector_codec.encode([0.3, -0.1], "float32")
+        }
+        assert np.allclose(vector_codec.chunk_vector(chunk), [0.3, -0.1])
+        assert vector_codec.chunk_vector({}) is None
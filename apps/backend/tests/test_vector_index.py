@@ -0,0 +1,167 @@
+import asyncio
+
+from services.vector_index import AtlasVectorIndex, InMemoryVectorIndex
+from utils import vector_codec
+
+
+def make_chunk(chunk_id, embedding, document_id="doc-1"):
+    return {
+        "_id": chunk_id,
+        "filename": "resume.pdf",
+        "content": f"chunk {chunk_id}",
+        "embedding": embedding,
+        "metadata": {"document_id": document_id}
+    }
+
+
+def search(index, query, top_k=5, score_threshold=0.0):
+    return asyncio.run(index.search(None, query, top_k, score_threshold))
+
+
+class TestInMemoryVectorIndex:
+    def test_search_returns_best_matches_first(self):
+        """Test that results are ordered by cosine similarity."""
+        index = InMemoryVectorIndex(initial_capacity=1)
+        index.add([
+            make_chunk(1, [1.0, 0.0]),
+            make_chunk(2, [0.6, 0.8]),
+            make_chunk(3, [0.0, 1.0]),
+        ])
+        results = search(index, [1.0, 0.1], top_k=2)
+        assert [r["_id"] for r in results] == [1, 2]
+        assert "embedding" not in results[0]
+
+    def test_scores_use_atlas_cosine_scale(self):
+        """Test that scores match Atlas' (1 + cosine) / 2 so thresholds carry over."""
+        index = InMemoryVectorIndex()
+        index.add([make_chunk(1, [1.0, 0.0]), make_chunk(2, [-1.0, 0.0])])
+        results = search(index, [1.0, 0.0], score_threshold=0.5)
+        assert [r["_id"] for r in results] == [1]
+        assert abs(results[0]["score"] - 1.0) < 1e-6
+
+    def test_remove_document_drops_all_its_chunks(self):
+        """Test that deleting a document removes its rows and keeps others searchable."""
+        index = InMemoryVectorIndex()
+        index.add([
+            make_chunk(1, [1.0, 0.0], "doc-1"),
+            make_chunk(2, [0.9, 0.1], "doc-2"),
+            make_chunk(3, [0.8, 0.2], "doc-1"),
+        ])
+        index.remove_document("doc-1")
+        assert [r["_id"] for r in search(index, [1.0, 0.0])] == [2]
+        assert index.stats()["chunks"] == 1
+
+    def test_add_is_idempotent(self):
+        """Test that re-adding a chunk (e.g. from the change stream) is ignored."""
+        index = InMemoryVectorIndex()
+        index.add([make_chunk(1, [1.0, 0.0])])
+        index.add([make_chunk(1, [1.0, 0.0])])
+        assert index.stats()["chunks"] == 1
+
+
+class TestIVFFlatVectorIndex:
+    def make_index(self, **kwargs):
+        import numpy as np
+
+        from services.vector_index import IVFFlatVectorIndex
+
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((200, 8)).astype(np.float32)
+        index = IVFFlatVectorIndex(nlist=8, nprobe=8, min_train_size=1, **kwargs)
+        index.add([make_chunk(i, vector, f"doc-{i % 4}") for i, vector in enumerate(vectors)])
+        index.train()
+        return index, vectors
+
+    def test_full_probe_matches_exact_search(self):
+        """Test that probing every cluster returns the exact top-k."""
+        index, vectors = self.make_index()
+        exact = InMemoryVectorIndex()
+        exact.add([make_chunk(i, vector) for i, vector in enumerate(vectors)])
+
+        query = vectors[3]
+        assert [r["_id"] for r in search(index, query)] == [r["_id"] for r in search(exact, query)]
+
+    def test_incremental_add_and_delete(self):
+        """Test that vectors added after training are searchable and deletes apply."""
+        index, _ = self.make_index()
+        index.add([make_chunk("new", [5.0] * 8, "doc-new")])
+        assert search(index, [5.0] * 8, top_k=1)[0]["_id"] == "new"
+
+        index.remove_document("doc-new")
+        assert all(r["_id"] != "new" for r in search(index, [5.0] * 8))
+
+    def test_snapshot_round_trip(self, tmp_path):
+        """Test that a saved index restores with identical search results."""
+        from services.vector_index import IVFFlatVectorIndex
+
+        index, vectors = self.make_index()
+        path = str(tmp_path / "index.npz")
+        index.save(path)
+
+        restored = IVFFlatVectorIndex(nprobe=8)
+        restored.load_snapshot(path)
+        assert restored.stats()["chunks"] == 200
+        assert search(restored, vectors[7]) == search(index, vectors[7])
+
+
+class FakeAggregateCollection:
+    def __init__(self, results):
+        self.results = results
+        self.pipeline = None
+
+    def aggregate(self, pipeline):
+        self.pipeline = pipeline
+        return self
+
+    async def to_list(self, length=None):
+        return [dict(result) for result in self.results]
+
+
+class TestEmbeddingStorage:
+    def test_memory_index_loads_binary_vectors(self):
+        """Test that BSON binary embeddings are decoded into the matrix."""
+        index = InMemoryVectorIndex()
+        index.add([
+            make_chunk(1, vector_codec.encode([1.0, 0.0], "float32")),
+            make_chunk(2, vector_codec.encode([0.0, 1.0], "int8")),
+        ])
+        assert [r["_id"] for r in search(index, [0.1, 1.0], top_k=1)] == [2]
+
+    def test_atlas_rescores_quantized_candidates(self):
+        """Test that full-precision copies re-rank quantized Atlas candidates."""
+        collection = FakeAggregateCollection([
+            {"_id": 1, "score": 0.9, "embedding_full": vector_codec.encode([0.0, 1.0], "float32")},
+            {"_id": 2, "score": 0.8, "embedding_full": vector_codec.encode([1.0, 0.0], "float32")},
+        ])
+        index = AtlasVectorIndex(storage_format="packed_bit", rescore=True, rescore_factor=2)
+        results = asyncio.run(index.search(collection, [1.0, 0.0], 1, 0.0))
+
+        stage = collection.pipeline[0]["$vectorSearch"]
+        assert stage["limit"] == 2
+        assert stage["queryVector"].subtype == 9
+        assert [r["_id"] for r in results] == [2]
+        assert "embedding_full" not in results[0]
+
+    def test_atlas_packed_bit_scores_on_cosine_scale(self):
+        """Test that packed_bit Hamming scores pass the default threshold like cosine scores would."""
+        dimensions = 1536
+        collection = FakeAggregateCollection([
+            {"_id": 1, "score": 1 / (1 + 200)},   # ~24 degrees apart
+            {"_id": 2, "score": 1 / (1 + 1000)},  # More than 90 degrees apart
+        ])
+        index = AtlasVectorIndex(storage_format="packed_bit")
+        results = asyncio.run(index.search(collection, [1.0] * dimensions, 5, 0.5))
+
+        assert [r["_id"] for r in results] == [1]
+        assert 0.9 < results[0]["score"] < 1.0
+
+    def test_atlas_packed_bit_candidates_without_full_copy(self):
+        """Test that rescoring keeps mapped scores for candidates written before full copies were stored."""
+        collection = FakeAggregateCollection([
+            {"_id": 1, "score": 1 / (1 + 100)},
+            {"_id": 2, "score": 0.0, "embedding_full": vector_codec.encode([1.0] * 1536, "float32")},
+        ])
+        index = AtlasVectorIndex(storage_format="packed_bit", rescore=True)
+        results = asyncio.run(index.search(collection, [1.0] * 1536, 5, 0.5))
+
+        assert [r["_id"] for r in results] == [2, 1]
@@ -0,0 +1,336 @@
+"""
+Admission control for the chat endpoints.
+
+Concurrent /chat and /chat/stream requests are capped by an AIMD limit:
+each request that finishes within the latency target raises the limit by
+about one per limit's worth of requests; a slow or failed request cuts it
+multiplicatively. Requests over the limit wait in a bounded FIFO queue;
+when the queue is full, the wait times out, or the process is close to its
+memory limit, they are shed immediately with 429/503 and Retry-After
+instead of piling up until the pod is OOM-killed. Other paths (health
+checks, metrics, admin) are never limited.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import deque
+
+import config
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Paths under admission control; everything else passes straight through
+ADMITTED_PATHS = {"/chat", "/chat/stream"}
+
+# Request state flag set by the routers when they answered 200 with a fallback
+FAILED_FLAG = "admission_failed"
+
+# Weight of the newest request in the smoothed latency (used for Retry-After)
+LATENCY_SMOOTHING = 0.2
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class Overloaded(Exception):
+    """A request was shed instead of admitted"""
+
+    def __init__(self, reason: str, status_code: int, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _rss_mb() -> float | None:
+    """
+    Memory of this process and its child processes (parser workers) from /proc.
+
+    Children count with their proportional set size, so pages they share
+    with each other or with the server are not counted twice.
+
+    Returns:
+        Megabytes, or None where /proc is unavailable
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * _PAGE_SIZE / (1024 * 1024) + sum(_pss_mb(pid) for pid in _descendants("self"))
+
+
+def _descendants(pid: str) -> list[str]:
+    """PIDs of a process's children, grandchildren, ... (the forkserver starts the workers)"""
+    children = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return children
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(f.read().split())
+        except OSError:
+            continue
+    return children + [grandchild for child in children for grandchild in _descendants(child)]
+
+
+def _pss_mb(pid: str) -> float:
+    """Proportional set size of a process (0 once it has exited)"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    return 0.0
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter with a bounded FIFO wait queue.
+
+    Freed slots are handed directly to the oldest waiter, so queued requests
+    cannot be overtaken by new arrivals.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        max_queue: int,
+        queue_timeout: float,
+        latency_target: float,
+        decrease_ratio: float = 0.9,
+        memory_limit_mb: float = 0
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_target = latency_target
+        self.decrease_ratio = decrease_ratio
+        self.memory_limit_mb = memory_limit_mb
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self.smoothed_latency = 0.0
+        self._waiters: deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.shed: dict[str, int] = {}
+        self._update_gauges()
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait: about one request's worth of queue drain"""
+        return max(1, math.ceil(self.smoothed_latency or self.queue_timeout))
+
+    def _reject(self, reason: str, status_code: int) -> Overloaded:
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        metrics.ADMISSION_SHED.labels(reason=reason).inc()
+        return Overloaded(reason, status_code, self.retry_after())
+
+    async def acquire(self) -> None:
+        """
+        Take a slot, waiting in the queue if the limit is reached.
+
+        Raises:
+            Overloaded: If the request is shed (queue full, queue timeout, memory pressure)
+        """
+        # Under memory pressure, only admit a request when none is running that could free memory
+        if self.memory_limit_mb > 0 and self.in_flight > 0:
+            rss = _rss_mb()
+            if rss is not None and rss >= self.memory_limit_mb:
+                self._decrease()
+                raise self._reject("memory", 503)
+
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            self._update_gauges()
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full", 429)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except TimeoutError:
+            raise self._reject("queue_timeout", 503) from None
+        except asyncio.CancelledError:
+            # The client went away; give back a slot that was handed over meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._hand_off()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._update_gauges()
+        self.admitted += 1
+
+    def release(self, latency: float, failed: bool = False) -> None:
+        """
+        Free a slot and adapt the limit to how the request went.
+
+        Args:
+            latency: Seconds the request held its slot
+            failed: Whether the request ended in a server error or a fallback reply
+        """
+        if self.smoothed_latency:
+            self.smoothed_latency += LATENCY_SMOOTHING * (latency - self.smoothed_latency)
+        else:
+            self.smoothed_latency = latency
+
+        if failed or latency > self.latency_target:
+            self._decrease()
+        else:
+            # Additive increase: about +1 after a full limit's worth of fast requests
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+        self.in_flight -= 1
+        self._hand_off()
+        self._update_gauges()
+
+    def _hand_off(self) -> None:
+        """Pass free slots to the oldest waiters"""
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _decrease(self) -> None:
+        self.limit = max(self.min_limit, self.limit * self.decrease_ratio)
+
+    def _update_gauges(self) -> None:
+        metrics.ADMISSION_LIMIT.set(self.limit)
+        metrics.ADMISSION_IN_FLIGHT.set(self.in_flight)
+        metrics.ADMISSION_QUEUED.set(len(self._waiters))
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "smoothed_latency_ms": round(self.smoothed_latency * 1000, 1),
+            "admitted": self.admitted,
+            "shed": dict(self.shed)
+        }
+
+
+def create_limiter() -> AdaptiveLimiter:
+    """Build a limiter from the current settings"""
+    return AdaptiveLimiter(
+        initial_limit=config.settings.ADMISSION_INITIAL_LIMIT,
+        min_limit=config.settings.ADMISSION_MIN_LIMIT,
+        max_limit=config.settings.ADMISSION_MAX_LIMIT,
+        max_queue=config.settings.ADMISSION_QUEUE_SIZE,
+        queue_timeout=config.settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        latency_target=config.settings.ADMISSION_LATENCY_TARGET_SECONDS,
+        memory_limit_mb=config.settings.ADMISSION_MEMORY_LIMIT_MB
+    )
+
+
+_limiter: AdaptiveLimiter | None = None
+
+
+def get_limiter() -> AdaptiveLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = create_limiter()
+    return _limiter
+
+
+def get_stats() -> dict:
+    """
+    Get admission control state for monitoring.
+
+    Returns:
+        Current limit, in-flight and queued requests, and shed counts by reason
+    """
+    if not config.settings.ADMISSION_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **get_limiter().stats()}
+
+
+def mark_failed(request) -> None:
+    """
+    Count a request as failed for the adaptive limit even though it returns 200.
+
+    /chat answers with a fallback message and /chat/stream with an SSE error
+    event when OpenAI or MongoDB fail, so the status code alone hides them.
+
+    Args:
+        request: The FastAPI/Starlette request being served
+    """
+    setattr(request.state, FAILED_FLAG, True)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying the adaptive limit to ADMITTED_PATHS.
+
+    A request fails when it returns a 5xx or a router marked it with
+    mark_failed(). Its latency is the time the slot was held, i.e. until the
+    whole response was sent: for /chat/stream that includes the time the
+    client takes to read the stream, so slow readers also lower the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"] not in ADMITTED_PATHS
+            or not config.settings.ADMISSION_ENABLED
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        limiter = get_limiter()
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            logger.warning("Shed %s (%s)", scope["path"], e.reason)
+            await _send_overloaded(send, e)
+            return
+
+        # The slot is held until the response body (including a whole SSE stream) is sent
+        started = time.perf_counter()
+        status_code = 500
+        state = scope.setdefault("state", {})  # Shared with request.state in the routers
+        try:
+            async def send_with_status(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
+        finally:
+            failed = status_code >= 500 or bool(state.get(FAILED_FLAG))
+            limiter.release(time.perf_counter() - started, failed=failed)
+
+
+async def _send_overloaded(send, error: Overloaded) -> None:
+    body = json.dumps({"detail": "Server is busy, please retry later", "reason": error.reason}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": error.status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(error.retry_after).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
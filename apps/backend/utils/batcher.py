@@ -0,0 +1,116 @@
+"""
+Micro-batching of concurrent async requests.
+Collects individual items for a short window and processes them with a
+single batched call, fanning the results back out to each caller.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Batch items submitted within `window_seconds` (or until `max_batch_size`).
+
+    The handler receives a list of items and must return one result per item,
+    in the same order. A handler failure (or a result count mismatch) is
+    raised to every caller in that batch.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list[T]], Awaitable[list[R]]],
+        window_seconds: float,
+        max_batch_size: int
+    ):
+        self._handler = handler
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._pending: list[tuple[T, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._running: set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    async def submit(self, item: T) -> R:
+        """
+        Queue an item for the next batch and wait for its result.
+
+        Args:
+            item: Input to process
+
+        Returns:
+            The handler's result for this item
+        """
+        if self.window_seconds <= 0 or self.max_batch_size <= 1:
+            self._record(1)
+            return (await self._handler([item]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: list[tuple[T, asyncio.Future]]) -> None:
+        self._record(len(batch))
+        try:
+            results = await self._handler([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch handler returned {len(results)} results for {len(batch)} items")
+            for (_, future), result in zip(batch, results, strict=True):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:  # noqa: BLE001
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            # A batch cancelled mid-flight (e.g. at shutdown) cancels its callers rather than leaving them waiting
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
+
+    def _record(self, size: int) -> None:
+        self.batches += 1
+        self.items += size
+        self.largest_batch = max(self.largest_batch, size)
+
+    def stats(self) -> dict:
+        """
+        Get batching counters for monitoring.
+
+        Returns:
+            Dictionary with batches sent, items processed and batch sizes
+        """
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+            "largest_batch": self.largest_batch,
+            "window_ms": self.window_seconds * 1000,
+            "max_batch_size": self.max_batch_size
+        }
@@ -0,0 +1,127 @@
+"""
+In-process caching utilities.
+Provides a bounded LRU cache with time-based expiry and hit/miss counters,
+and the TTL index that expires entries of the shared MongoDB caches.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from pymongo.errors import OperationFailure
+
+# MongoDB error code for an index that exists with different options
+INDEX_OPTIONS_CONFLICT = 85
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after a fixed time-to-live.
+
+    Not thread-safe; intended for use from the asyncio event loop.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Look up a key, refreshing its LRU position.
+
+        Returns:
+            Cached value, or None if missing or expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Insert or replace a value, evicting the least recently used entry when full"""
+        if self.max_size <= 0:
+            return
+
+        self._entries[key] = (self._clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any | None:
+        """Remove a key and return its value if present"""
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        """Remove all entries (counters are kept)"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """
+        Get cache counters for monitoring.
+
+        Returns:
+            Dictionary with size, hits, misses, evictions and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups > 0 else 0
+        }
+
+
+async def ensure_ttl_index(collection, field: str, ttl_seconds: float) -> None:
+    """
+    Create the TTL index expiring a shared cache collection, or update its expiry.
+
+    create_index fails with IndexOptionsConflict when the index already exists
+    with another expireAfterSeconds (the TTL setting was changed), so the
+    existing index is updated in place with collMod instead.
+
+    Args:
+        collection: Motor collection holding the cache entries
+        field: Date field the entries expire from
+        ttl_seconds: Entry lifetime
+    """
+    expire_after = int(ttl_seconds)
+    try:
+        await collection.create_index(field, expireAfterSeconds=expire_after)
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT:
+            raise
+        await collection.database.command(
+            "collMod",
+            collection.name,
+            index={"keyPattern": {field: 1}, "expireAfterSeconds": expire_after}
+        )
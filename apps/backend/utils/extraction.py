@@ -0,0 +1,172 @@
+"""
+Parse -> clean -> split of an uploaded document.
+
+Pure CPU work with no dependency on the app (settings, clients, metrics),
+so it can run in a parser worker process (utils/process_pool.py) that only
+imports this module, the parsers and the text splitter.
+
+The document streams through the stages a page or section at a time and
+the chunks are written to a file as they are produced, so memory stays
+bounded by the largest page plus a few chunks, whatever the document size.
+"""
+
+import json
+import time
+from collections.abc import Iterable, Iterator
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from utils import file_parser
+
+# Text buffered (in chunks' worth) before the streaming splitter splits it
+WINDOW_CHUNKS = 16
+
+
+def _make_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+
+
+def split_text(text: str, chunk_size: int, chunk_overlap: int) -> list[str]:
+    """
+    Split cleaned document text into overlapping chunks for embedding.
+
+    Args:
+        text: Cleaned document text
+        chunk_size: Maximum chunk length in characters
+        chunk_overlap: Characters shared by consecutive chunks
+
+    Returns:
+        Chunks of at most chunk_size characters
+    """
+    return _make_splitter(chunk_size, chunk_overlap).split_text(text)
+
+
+class StreamingSplitter:
+    """
+    Splits text fed in pieces, holding only a window of it.
+
+    Once the buffered text reaches WINDOW_CHUNKS chunks' worth it is split;
+    every chunk but the last is emitted and the last one, which may continue
+    into the next piece, starts the new buffer. Consecutive chunks keep their
+    overlap across windows, and the chunks match split_text of the whole
+    text except for the odd boundary placed differently.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self._splitter = _make_splitter(chunk_size, chunk_overlap)
+        self._window = chunk_size * WINDOW_CHUNKS
+        self._buffer = ""
+
+    def feed(self, text: str) -> list[str]:
+        """Add the next piece of text; returns the chunks it completed"""
+        self._buffer += text
+        if len(self._buffer) < self._window:
+            return []
+        chunks = self._splitter.split_text(self._buffer)
+        self._buffer = chunks.pop() if chunks else ""
+        return chunks
+
+    def flush(self) -> list[str]:
+        """Split whatever is left at the end of the document"""
+        chunks = self._splitter.split_text(self._buffer) if self._buffer else []
+        self._buffer = ""
+        return chunks
+
+
+def iter_chunks(
+    file_content: file_parser.FileSource,
+    filename: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    stats: dict
+) -> Iterator[str]:
+    """
+    Parse, clean and chunk a document incrementally.
+
+    Args:
+        file_content: Raw file bytes or the path of the spooled file
+        filename: Original filename (selects the parser)
+        chunk_size: Maximum chunk length in characters
+        chunk_overlap: Characters shared by consecutive chunks
+        stats: Filled with the seconds spent in each stage ("parse",
+            "clean", "chunk") and the cleaned text length
+
+    Yields:
+        Chunks in document order
+    """
+    seconds = stats["seconds"] = {"parse": 0.0, "clean": 0.0, "chunk": 0.0}
+    stats["text_length"] = 0
+    pieces = _timed(file_parser.iter_file(file_content, filename), seconds, "parse")
+    cleaned_pieces = _timed(file_parser.iter_clean_text(pieces), seconds, "clean", inner="parse")
+    splitter = StreamingSplitter(chunk_size, chunk_overlap)
+
+    for cleaned in cleaned_pieces:
+        stats["text_length"] += len(cleaned)
+        started = time.perf_counter()
+        chunks = splitter.feed(cleaned)
+        seconds["chunk"] += time.perf_counter() - started
+        yield from chunks
+
+    started = time.perf_counter()
+    chunks = splitter.flush()
+    seconds["chunk"] += time.perf_counter() - started
+    yield from chunks
+
+
+def _timed(items: Iterable, seconds: dict, stage: str, inner: str | None = None) -> Iterator:
+    """Add the time spent producing each item to seconds[stage], less the time it added to seconds[inner]"""
+    iterator = iter(items)
+    while True:
+        inner_before = seconds[inner] if inner else 0.0
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            inner_spent = seconds[inner] - inner_before if inner else 0.0
+            seconds[stage] += time.perf_counter() - started - inner_spent
+        yield item
+
+
+def extract_chunks(
+    file_content: file_parser.FileSource,
+    filename: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    destination: str
+) -> dict:
+    """
+    Parse, clean and chunk a document into a JSON-lines file.
+
+    Args:
+        file_content: Raw file bytes or the path of the spooled file
+        filename: Original filename (selects the parser)
+        chunk_size: Maximum chunk length in characters
+        chunk_overlap: Characters shared by consecutive chunks
+        destination: Path of the file receiving one JSON string per chunk
+
+    Returns:
+        Stats: the seconds spent in each stage ("parse", "clean", "chunk"),
+        the cleaned text length and the chunk count
+
+    Raises:
+        ValueError: If the file cannot be parsed or has too little text
+    """
+    stats = {"chunk_count": 0}
+    with open(destination, "w", encoding="utf-8") as out:
+        for chunk in iter_chunks(file_content, filename, chunk_size, chunk_overlap, stats):
+            out.write(json.dumps(chunk) + "\n")
+            stats["chunk_count"] += 1
+
+    if stats["text_length"] < 10:
+        raise ValueError("File contains insufficient text content")
+    if not stats["chunk_count"]:
+        raise ValueError("Text splitting resulted in no chunks")
+
+    return stats
@@ -1,99 +1,160 @@
 """
 File parsing utilities for extracting text from various document formats.
 Supports: PDF, DOCX, XLSX, Markdown, and plain text files.
+
+Parsers take either the raw bytes or the path of a spooled upload; with a
+path, binary formats are read from disk by their libraries and text files
+are decoded straight from a memory map, so no copy of the file is held in
+memory.
+
+The iter_* parsers yield a document a page or section at a time so the
+ingestion pipeline can clean and chunk it without building the whole text;
+the parse_* functions join those pieces into one string.
 """
 
+import codecs
 import io
+import mmap
+import os
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from typing import BinaryIO
+
+# Raw file bytes or the path of a file on disk
+FileSource = bytes | str | os.PathLike
+
+# Text files are decoded and yielded in blocks of about this many bytes
+TEXT_BLOCK_BYTES = 1024 * 1024
+
+
+@contextmanager
+def open_source(source: FileSource) -> Iterator[BinaryIO]:
+    """Open a file source as a seekable binary stream"""
+    if isinstance(source, bytes):
+        yield io.BytesIO(source)
+    else:
+        with open(source, "rb") as f:
+            yield f
+
+
+@contextmanager
+def map_source(source: FileSource) -> Iterator[bytes | mmap.mmap]:
+    """Expose a file source as a read-only buffer (memory-mapped for paths)"""
+    if isinstance(source, bytes):
+        yield source
+        return
+
+    with open(source, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""  # Empty files cannot be mapped
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
 
 
-def parse_pdf(file_content: bytes) -> str:
+def source_size(source: FileSource) -> int:
+    """Size of a file source in bytes"""
+    return len(source) if isinstance(source, bytes) else os.path.getsize(source)
+
+
+def iter_pdf(file_content: FileSource) -> Iterator[str]:
     """
-    Extract text from PDF file.
+    Extract text from PDF file, one page at a time.
     First tries PyPDF2, falls back to pdfplumber for complex PDFs.
 
     Args:
-        file_content: Raw bytes of the PDF file
+        file_content: Raw bytes or path of the PDF file
 
-    Returns:
-        Extracted text content
+    Yields:
+        Text of each page that has any
 
     Raises:
         Exception: If PDF parsing fails
     """
+    # Pages are held back until there is enough text to rule out the
+    # pdfplumber fallback, then streamed
+    held_back = []
+    held_back_length = 0
+    next_page = 0
     try:
         # Try PyPDF2 first (faster, lighter)
         from PyPDF2 import PdfReader
 
-        pdf_file = io.BytesIO(file_content)
-        reader = PdfReader(pdf_file)
-
-        text_parts = []
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                text_parts.append(text)
-
-        result = "\n\n".join(text_parts)
-
-        # If extraction yielded very little text, try pdfplumber
-        if len(result.strip()) < 50 and len(file_content) > 1000:
-            return parse_pdf_with_pdfplumber(file_content)
-
-        return result
+        with open_source(file_content) as pdf_file:
+            reader = PdfReader(pdf_file)
+            for page_number, page in enumerate(reader.pages):
+                text = page.extract_text()
+                if text and held_back is None:
+                    yield text
+                elif text:
+                    held_back.append(text)
+                    held_back_length += len(text.strip())
+                    if held_back_length >= 50:
+                        yield from held_back
+                        held_back = None
+                next_page = page_number + 1
 
     except Exception as e:  # noqa: BLE001
-        # Fallback to pdfplumber for complex PDFs
+        # Fallback to pdfplumber for complex PDFs, from the page PyPDF2 failed on
         try:
-            return parse_pdf_with_pdfplumber(file_content)
+            yield from iter_pdf_with_pdfplumber(file_content, 0 if held_back is not None else next_page)
+            return
         except Exception as fallback_error:
             raise RuntimeError(
                 f"PDF parsing failed: {e!s}, Fallback also failed: {fallback_error!s}"
             ) from fallback_error
 
+    if held_back is not None:
+        # If extraction yielded very little text, try pdfplumber
+        if source_size(file_content) > 1000:
+            yield from iter_pdf_with_pdfplumber(file_content)
+        else:
+            yield from held_back
+
 
-def parse_pdf_with_pdfplumber(file_content: bytes) -> str:
+def iter_pdf_with_pdfplumber(file_content: FileSource, first_page: int = 0) -> Iterator[str]:
     """
     Extract text from PDF using pdfplumber (better for complex layouts).
 
     Args:
-        file_content: Raw bytes of the PDF file
+        file_content: Raw bytes or path of the PDF file
+        first_page: Index of the first page to extract
 
-    Returns:
-        Extracted text content
+    Yields:
+        Text of each page that has any
     """
     import pdfplumber
 
-    pdf_file = io.BytesIO(file_content)
-    text_parts = []
-
-    with pdfplumber.open(pdf_file) as pdf:
-        for page in pdf.pages:
+    with open_source(file_content) as pdf_file, pdfplumber.open(pdf_file) as pdf:
+        for page in pdf.pages[first_page:]:
             text = page.extract_text()
+            # Drop the page's parsed layout before moving on
+            page.close()
             if text:
-                text_parts.append(text)
-
-    return "\n\n".join(text_parts)
+                yield text
 
 
-def parse_docx(file_content: bytes) -> str:
+def iter_docx(file_content: FileSource) -> Iterator[str]:
     """
     Extract text from DOCX (Word) file.
 
     Args:
-        file_content: Raw bytes of the DOCX file
+        file_content: Raw bytes or path of the DOCX file
 
-    Returns:
-        Extracted text content
+    Yields:
+        Text of each non-empty paragraph, then of each table row
+
+    python-docx loads the whole document tree first, so unlike the other
+    parsers this one needs memory in proportion to the file (~20MB per MB).
     """
     from docx import Document
 
-    docx_file = io.BytesIO(file_content)
-    doc = Document(docx_file)
+    with open_source(file_content) as docx_file:
+        doc = Document(docx_file)
 
-    text_parts = []
     for paragraph in doc.paragraphs:
         if paragraph.text.strip():
-            text_parts.append(paragraph.text)
+            yield paragraph.text
 
     # Also extract text from tables
     for table in doc.tables:
@@ -103,113 +164,183 @@ def parse_docx(file_content: bytes) -> str:
                 if cell.text.strip():
                     row_text.append(cell.text.strip())
             if row_text:
-                text_parts.append(" | ".join(row_text))
+                yield " | ".join(row_text)
 
-    return "\n\n".join(text_parts)
 
-
-def parse_xlsx(file_content: bytes) -> str:
+def iter_xlsx(file_content: FileSource) -> Iterator[str]:
     """
     Extract text from XLSX (Excel) file.
     Converts each sheet to text format.
 
     Args:
-        file_content: Raw bytes of the XLSX file
+        file_content: Raw bytes or path of the XLSX file
 
-    Returns:
-        Extracted text content with sheet names
+    Yields:
+        A header line per sheet, then the text of each non-empty row
     """
     from openpyxl import load_workbook
 
-    xlsx_file = io.BytesIO(file_content)
-    workbook = load_workbook(xlsx_file, data_only=True)
-
-    text_parts = []
-
-    for sheet_name in workbook.sheetnames:
-        sheet = workbook[sheet_name]
-        text_parts.append(f"=== Sheet: {sheet_name} ===")
-
-        for row in sheet.iter_rows(values_only=True):
-            # Filter out None values and convert to strings
-            row_values = [str(cell) for cell in row if cell is not None]
-            if row_values:
-                text_parts.append(" | ".join(row_values))
+    with open_source(file_content) as xlsx_file:
+        # Read-only mode streams rows from the sheet XML instead of building every cell
+        workbook = load_workbook(xlsx_file, read_only=True, data_only=True)
+        try:
+            for sheet_name in workbook.sheetnames:
+                sheet = workbook[sheet_name]
+                yield f"=== Sheet: {sheet_name} ==="
 
-    return "\n\n".join(text_parts)
+                for row in sheet.iter_rows(values_only=True):
+                    # Filter out None values and convert to strings
+                    row_values = [str(cell) for cell in row if cell is not None]
+                    if row_values:
+                        yield " | ".join(row_values)
+        finally:
+            workbook.close()
 
 
-def parse_markdown(file_content: bytes) -> str:
+def iter_markdown(file_content: FileSource) -> Iterator[str]:
     """
     Extract text from Markdown file.
     Simply decodes as UTF-8 text.
 
     Args:
-        file_content: Raw bytes of the Markdown file
+        file_content: Raw bytes or path of the Markdown file
 
-    Returns:
-        Decoded text content
+    Yields:
+        Blocks of whole lines (joined with "\n" they give the file's text)
     """
-    return file_content.decode("utf-8", errors="ignore")
+    with map_source(file_content) as buffer:
+        yield from _iter_line_blocks(buffer, "utf-8", "ignore")
 
 
-def parse_text(file_content: bytes) -> str:
+def iter_text(file_content: FileSource) -> Iterator[str]:
     """
     Extract text from plain text file.
     Tries UTF-8, falls back to other encodings.
 
     Args:
-        file_content: Raw bytes of the text file
+        file_content: Raw bytes or path of the text file
 
-    Returns:
-        Decoded text content
+    Yields:
+        Blocks of whole lines (joined with "\n" they give the file's text)
     """
-    # Try UTF-8 first
-    try:
-        return file_content.decode("utf-8")
-    except UnicodeDecodeError:
-        # Try other common encodings
-        for encoding in ["latin-1", "cp1252", "iso-8859-1"]:
-            try:
-                return file_content.decode(encoding)
-            except UnicodeDecodeError:
-                continue
+    with map_source(file_content) as buffer:
+        # Try UTF-8 first, then other common encodings
+        for encoding in ["utf-8", "latin-1", "cp1252", "iso-8859-1"]:
+            if _decodes(buffer, encoding):
+                yield from _iter_line_blocks(buffer, encoding, "strict")
+                return
 
-    # Last resort: decode with errors ignored
-    return file_content.decode("utf-8", errors="ignore")
+        # Last resort: decode with errors ignored
+        yield from _iter_line_blocks(buffer, "utf-8", "ignore")
 
 
-def parse_file(file_content: bytes, filename: str) -> str:
+def _decodes(buffer: bytes | mmap.mmap, encoding: str) -> bool:
+    """Whether the whole buffer decodes with `encoding` (checked block by block)"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        for start in range(0, len(buffer), TEXT_BLOCK_BYTES):
+            decoder.decode(buffer[start:start + TEXT_BLOCK_BYTES])
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _iter_line_blocks(buffer: bytes | mmap.mmap, encoding: str, errors: str) -> Iterator[str]:
+    """Decode a buffer in blocks of about TEXT_BLOCK_BYTES, cut at line breaks"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    carry = ""
+    for start in range(0, len(buffer), TEXT_BLOCK_BYTES):
+        text = carry + decoder.decode(buffer[start:start + TEXT_BLOCK_BYTES])
+        cut = text.rfind("\n")
+        if cut == -1:
+            carry = text
+            continue
+        yield text[:cut]
+        carry = text[cut + 1:]
+    yield carry + decoder.decode(b"", final=True)
+
+
+def iter_file(file_content: FileSource, filename: str) -> Iterator[str]:
     """
-    Parse a file based on its extension.
+    Parse a file based on its extension, a page or section at a time.
 
     Args:
-        file_content: Raw bytes of the file
+        file_content: Raw bytes or path of the file
         filename: Original filename (used to determine file type)
 
     Returns:
-        Extracted text content
+        Iterator over pieces of whole lines of text; joined with line breaks
+        they give the document's text
 
     Raises:
         ValueError: If file type is not supported
-        Exception: If parsing fails
     """
     filename_lower = filename.lower()
 
     if filename_lower.endswith(".pdf"):
-        return parse_pdf(file_content)
+        return iter_pdf(file_content)
     elif filename_lower.endswith(".docx"):
-        return parse_docx(file_content)
+        return iter_docx(file_content)
     elif filename_lower.endswith(".xlsx"):
-        return parse_xlsx(file_content)
+        return iter_xlsx(file_content)
     elif filename_lower.endswith((".md", ".markdown")):
-        return parse_markdown(file_content)
+        return iter_markdown(file_content)
     elif filename_lower.endswith(".txt"):
-        return parse_text(file_content)
+        return iter_text(file_content)
     else:
         raise ValueError(f"Unsupported file type: {filename}")
 
 
+def parse_pdf(file_content: FileSource) -> str:
+    """Extract the text of a PDF file (pages separated by blank lines)"""
+    return "\n\n".join(iter_pdf(file_content))
+
+
+def parse_pdf_with_pdfplumber(file_content: FileSource) -> str:
+    """Extract the text of a PDF file with pdfplumber (pages separated by blank lines)"""
+    return "\n\n".join(iter_pdf_with_pdfplumber(file_content))
+
+
+def parse_docx(file_content: FileSource) -> str:
+    """Extract the text of a DOCX file (paragraphs and table rows separated by blank lines)"""
+    return "\n\n".join(iter_docx(file_content))
+
+
+def parse_xlsx(file_content: FileSource) -> str:
+    """Extract the text of an XLSX file (rows separated by blank lines)"""
+    return "\n\n".join(iter_xlsx(file_content))
+
+
+def parse_markdown(file_content: FileSource) -> str:
+    """Decode a Markdown file"""
+    return "\n".join(iter_markdown(file_content))
+
+
+def parse_text(file_content: FileSource) -> str:
+    """Decode a plain text file"""
+    return "\n".join(iter_text(file_content))
+
+
+def parse_file(file_content: FileSource, filename: str) -> str:
+    """
+    Parse a file based on its extension.
+
+    Args:
+        file_content: Raw bytes or path of the file
+        filename: Original filename (used to determine file type)
+
+    Returns:
+        Extracted text content
+
+    Raises:
+        ValueError: If file type is not supported
+        Exception: If parsing fails
+    """
+    separator = "\n" if filename.lower().endswith((".md", ".markdown", ".txt")) else "\n\n"
+    return separator.join(iter_file(file_content, filename))
+
+
 def clean_text(text: str) -> str:
     """
     Clean extracted text by removing excessive whitespace and special characters.
@@ -243,3 +374,26 @@ def clean_text(text: str) -> str:
                 result.append("")
 
     return "\n".join(result)
+
+
+def iter_clean_text(pieces: Iterable[str]) -> Iterator[str]:
+    """
+    Clean a document given as pieces of whole lines (as yielded by iter_file).
+
+    Args:
+        pieces: Pieces of text, in document order
+
+    Yields:
+        Cleaned pieces; concatenated they equal clean_text of the whole text
+    """
+    last_line = None
+    for piece in pieces:
+        cleaned = clean_text(piece)
+        if not cleaned:
+            continue
+        if last_line is not None:
+            # Same paragraph-break heuristic as between lines within clean_text
+            paragraph_break = last_line[-1] in ".!?" and cleaned[0].isupper()
+            cleaned = ("\n\n" if paragraph_break else "\n") + cleaned
+        last_line = cleaned.rsplit("\n", 1)[-1]
+        yield cleaned
@@ -0,0 +1,204 @@
+"""
+Structured logging.
+Records are formatted as JSON (or plain text for local development) and
+written by a background QueueListener thread, so logging on the event loop
+never blocks on stdout. Every record carries the current request ID, and
+DEBUG records are sampled per request to keep container logs manageable.
+"""
+
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import UTC, datetime
+
+import config
+
+# Request ID of the request being handled (set by RequestIdMiddleware)
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "taskName"
+}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object per line, including `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None)
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request ID to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of DEBUG records.
+
+    Sampling is decided per request ID, so a sampled request keeps its whole
+    debug trail; records outside a request are sampled individually.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        if self.rate <= 0:
+            return False
+
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            bucket = zlib.crc32(request_id.encode("utf-8")) % 10_000
+            return bucket < self.rate * 10_000
+        return random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike the base class, keep exc_info so the formatter can structure it
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+def parse_levels(spec: str) -> dict[str, str]:
+    """
+    Parse per-logger levels, e.g. "services.rag_service=DEBUG,uvicorn.access=WARNING".
+
+    Returns:
+        Mapping of logger name to level name
+    """
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging() -> None:
+    """
+    Route all logging through a bounded queue to a background writer thread.
+    Safe to call more than once; called at import time by main.py.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if config.settings.LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s"
+        ))
+
+    # Filters run on the calling thread, before the record is queued
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=config.settings.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(DebugSamplingFilter(config.settings.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(config.settings.LOG_LEVEL.upper())
+
+    for name, level in parse_levels(config.settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    # Let uvicorn's loggers share the queue instead of writing directly
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(
+        queue_handler.queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware assigning a request ID to each HTTP request.
+
+    Reuses an incoming X-Request-ID header (e.g. from the ingress) or
+    generates one, exposes it to logging, and echoes it in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        incoming = headers.get(REQUEST_ID_HEADER.encode("latin-1"), b"").decode("latin-1")
+        request_id = incoming[:128] or uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (REQUEST_ID_HEADER.encode("latin-1"), request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
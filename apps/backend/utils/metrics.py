@@ -0,0 +1,202 @@
+"""
+Prometheus metrics.
+Per-stage latency histograms for the chat (RAG) and upload pipelines, plus
+token, cache and error counters, served at /metrics. Each timed stage is
+also recorded as a tracing span (utils/tracing.py).
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from utils import tracing
+
+# Stages range from sub-millisecond cache lookups to multi-second completions
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CHAT_REQUEST_SECONDS = Histogram(
+    "chat_request_duration_seconds",
+    "End-to-end chat request latency",
+    ["endpoint", "mode"],
+    buckets=LATENCY_BUCKETS
+)
+
+RAG_STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Latency of each chat pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+
+UPLOAD_STAGE_SECONDS = Histogram(
+    "upload_stage_duration_seconds",
+    "Latency of each document upload stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+
+TIME_TO_FIRST_TOKEN_SECONDS = Histogram(
+    "chat_time_to_first_token_seconds",
+    "Time from request to the first streamed completion token",
+    buckets=LATENCY_BUCKETS
+)
+
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "Tokens sent to and received from OpenAI",
+    ["operation", "direction"]
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"]
+)
+
+EMBEDDING_CACHE_SAVED_REQUESTS = Counter(
+    "embedding_cache_saved_requests_total",
+    "Embedding API requests avoided by the chunk embedding cache"
+)
+
+EMBEDDING_CACHE_SAVED_TOKENS = Counter(
+    "embedding_cache_saved_tokens_total",
+    "Embedding input tokens not sent to OpenAI thanks to the chunk embedding cache"
+)
+
+ERRORS = Counter(
+    "errors_total",
+    "Errors by stage and exception type",
+    ["stage", "type"]
+)
+
+RETRIES = Counter(
+    "upstream_retries_total",
+    "Retried OpenAI/MongoDB calls",
+    ["operation"]
+)
+
+HEDGED_REQUESTS = Counter(
+    "upstream_hedged_requests_total",
+    "Calls that started a second, hedged attempt",
+    ["operation"]
+)
+
+CIRCUIT_REJECTIONS = Counter(
+    "circuit_breaker_rejections_total",
+    "Calls refused by an open circuit breaker",
+    ["upstream"]
+)
+
+ADMISSION_LIMIT = Gauge(
+    "chat_concurrency_limit",
+    "Current adaptive concurrency limit of the chat endpoints"
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "chat_requests_in_flight",
+    "Chat requests currently holding a concurrency slot"
+)
+
+ADMISSION_QUEUED = Gauge(
+    "chat_requests_queued",
+    "Chat requests waiting for a concurrency slot"
+)
+
+ADMISSION_SHED = Counter(
+    "chat_requests_shed_total",
+    "Chat requests rejected by admission control",
+    ["reason"]
+)
+
+WORKER_POOL_TASKS = Counter(
+    "worker_pool_tasks_total",
+    "Tasks run by CPU worker pools by outcome (ok, error, memory, timeout, crashed)",
+    ["pool", "result"]
+)
+
+WORKER_POOL_TASK_SECONDS = Histogram(
+    "worker_pool_task_seconds",
+    "Wall time of CPU worker pool tasks, including queueing for a worker",
+    ["pool"],
+    buckets=LATENCY_BUCKETS
+)
+
+
+@contextmanager
+def track_stage(histogram: Histogram, stage: str, span_name: str) -> Iterator[None]:
+    """
+    Time a pipeline stage, count its failures and trace it as a span.
+
+    Args:
+        histogram: RAG_STAGE_SECONDS or UPLOAD_STAGE_SECONDS
+        stage: Stage label
+        span_name: Tracing span name
+    """
+    started = time.perf_counter()
+    with tracing.span(span_name):
+        try:
+            yield
+        except Exception as e:
+            record_error(stage, e)
+            raise
+        finally:
+            histogram.labels(stage=stage).observe(time.perf_counter() - started)
+
+
+def rag_stage(stage: str):
+    """Time a chat pipeline stage (context manager)"""
+    return track_stage(RAG_STAGE_SECONDS, stage, f"rag.{stage}")
+
+
+def upload_stage(stage: str):
+    """Time a document upload stage (context manager)"""
+    return track_stage(UPLOAD_STAGE_SECONDS, stage, f"upload.{stage}")
+
+
+def record_tokens(operation: str, usage) -> None:
+    """
+    Count OpenAI tokens from a response's usage block.
+
+    Args:
+        operation: "chat", "embedding", "history_summary", ...
+        usage: `response.usage` (None when the API did not report usage)
+    """
+    if usage is None:
+        return
+    tokens_in = getattr(usage, "prompt_tokens", 0) or 0
+    tokens_out = getattr(usage, "completion_tokens", 0) or 0
+    OPENAI_TOKENS.labels(operation=operation, direction="in").inc(tokens_in)
+    OPENAI_TOKENS.labels(operation=operation, direction="out").inc(tokens_out)
+
+    # OpenTelemetry GenAI semantic convention attribute names
+    tracing.add_to_attribute("gen_ai.usage.input_tokens", tokens_in)
+    if tokens_out:
+        tracing.add_to_attribute("gen_ai.usage.output_tokens", tokens_out)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache hit or miss"""
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_error(stage: str, error: BaseException) -> None:
+    """Count an error by stage and exception type"""
+    ERRORS.labels(stage=stage, type=type(error).__name__).inc()
+
+
+def render() -> tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+
+    Returns:
+        Tuple of (payload, content type)
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,27 @@
+"""
+Code run inside WorkerPool worker processes (utils/process_pool.py).
+
+Kept free of application imports (config, metrics, the OpenAI client): a
+worker unpickles its initializer by importing this module, so anything
+imported here is paid again, in time and memory, by every worker started.
+"""
+
+import importlib
+import os
+
+
+def initialize(memory_limit_mb: float, preload: tuple[str, ...]) -> None:
+    """Worker initializer: import the task modules, then cap address-space growth beyond that size"""
+    for module in preload:
+        importlib.import_module(module)
+    if memory_limit_mb <= 0:
+        return
+    import resource
+
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return
+    cap = current + int(memory_limit_mb * 1024 * 1024)
+    resource.setrlimit(resource.RLIMIT_AS, (cap, cap))
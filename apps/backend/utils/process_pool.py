@@ -0,0 +1,194 @@
+"""
+Worker pools for CPU-bound work off the event loop.
+
+Document parsing and chunking are pure-Python CPU work that holds the GIL
+for seconds on large files; run on the event loop (or in a thread) it
+stalls every concurrent /chat request. A WorkerPool runs such functions in
+separate processes instead, with:
+
+- a per-task timeout: a task still running after it is killed together
+  with its worker, and the pool is restarted for the next task
+- a memory cap: each worker may grow its address space by at most
+  memory_limit_mb beyond what it had after importing the task modules
+  (RLIMIT_AS), so a pathological file fails with MemoryError in the worker
+  rather than getting the pod OOM-killed
+- worker recycling after max_tasks_per_worker tasks, returning memory the
+  parsers fragmented to the OS
+
+On Linux workers are forked from a bare forkserver. It imports nothing
+itself: modules preloaded there stay resident for the life of the server
+(~38MB PSS for the parsers), more than a single worker saves by sharing
+them, so each worker imports what it needs when it starts.
+
+"thread" mode runs tasks in a thread pool (no isolation, timeouts only stop
+the wait) and "inline" mode on the calling thread, for environments where
+processes are not available and for tests.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from utils import metrics, pool_worker
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("process", "thread", "inline")
+
+
+class TaskTimeout(Exception):
+    """A pool task ran past its timeout and its worker was killed"""
+
+
+class WorkerCrashed(Exception):
+    """A pool worker died while running a task"""
+
+
+class WorkerPool:
+    """
+    Lazily started pool running synchronous functions off the event loop.
+
+    Functions and arguments must be picklable in "process" mode (module-level
+    functions, bytes, paths and other plain values). `preload` names modules
+    each worker imports when it starts, before its memory cap is set.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        mode: str = "process",
+        workers: int = 1,
+        timeout: float = 0,
+        memory_limit_mb: float = 0,
+        max_tasks_per_worker: int = 0,
+        preload: tuple[str, ...] = ()
+    ):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode {mode!r}, expected one of {', '.join(EXECUTOR_MODES)}")
+        self.name = name
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.preload = preload
+        self.tasks: dict[str, int] = {}
+        self._executor: concurrent.futures.Executor | None = None
+        self._slots = asyncio.Semaphore(self.workers)
+
+    async def _ready_executor(self) -> concurrent.futures.Executor:
+        """The running executor, starting it (and a first worker) if needed"""
+        if self._executor is None:
+            executor = self._executor = self._create_executor()
+            if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+                # Starting the forkserver and a worker importing the preloaded
+                # modules takes a second or two, which must not count against a task
+                await asyncio.get_running_loop().run_in_executor(executor, os.getpid)
+            return executor
+        return self._executor
+
+    def _create_executor(self) -> concurrent.futures.Executor:
+        if self.mode == "thread":
+            return concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix=f"{self.name}-worker"
+            )
+        # Never fork the server process itself: it runs threads (Motor, exporters)
+        if sys.platform == "linux":
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([])
+        else:
+            context = multiprocessing.get_context("spawn")
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=pool_worker.initialize,
+            initargs=(self.memory_limit_mb, self.preload),
+            max_tasks_per_child=self.max_tasks_per_worker or None
+        )
+
+    async def run(self, func, *args):
+        """
+        Run func(*args) in the pool.
+
+        Args:
+            func: Synchronous function (module-level in "process" mode)
+            *args: Positional arguments
+
+        Returns:
+            The function's return value
+
+        Raises:
+            TaskTimeout: If the task ran past the pool timeout
+            WorkerCrashed: If the worker process died while running the task
+            Exception: Whatever func raised (MemoryError once over the memory cap)
+        """
+        started = time.perf_counter()
+        result = "error"
+        try:
+            if self.mode == "inline":
+                value = func(*args)
+            else:
+                # At most one task per worker is submitted, so the timeout covers
+                # running the task rather than waiting behind others
+                async with self._slots:
+                    executor = await self._ready_executor()
+                    future = asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args))
+                    try:
+                        value = await asyncio.wait_for(future, self.timeout or None)
+                    except TimeoutError:
+                        result = "timeout"
+                        self._restart(executor, kill=True)
+                        raise TaskTimeout(f"{self.name} task exceeded {self.timeout:g}s") from None
+                    except BrokenProcessPool as e:
+                        result = "crashed"
+                        self._restart(executor, kill=False)
+                        raise WorkerCrashed(f"{self.name} worker died while running the task") from e
+            result = "ok"
+            return value
+        except MemoryError:
+            result = "memory"
+            raise
+        finally:
+            self.tasks[result] = self.tasks.get(result, 0) + 1
+            metrics.WORKER_POOL_TASKS.labels(pool=self.name, result=result).inc()
+            metrics.WORKER_POOL_TASK_SECONDS.labels(pool=self.name).observe(time.perf_counter() - started)
+
+    def _restart(self, executor: concurrent.futures.Executor, kill: bool) -> None:
+        """Drop an executor whose worker is stuck or dead; the next task starts a new one"""
+        if self._executor is executor:
+            self._executor = None
+        if kill and isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+            # Other tasks running on this executor fail with WorkerCrashed
+            for process in list((executor._processes or {}).values()):
+                process.kill()
+        elif kill:
+            logger.warning("%s thread task timed out; the thread runs on until the task returns", self.name)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        """Stop the workers (running tasks are abandoned)"""
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+                for process in list((executor._processes or {}).values()):
+                    process.kill()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Pool settings and task outcome counts"""
+        return {
+            "name": self.name,
+            "mode": self.mode,
+            "workers": self.workers,
+            "running": self._executor is not None,
+            "timeout_seconds": self.timeout,
+            "memory_limit_mb": self.memory_limit_mb,
+            "max_tasks_per_worker": self.max_tasks_per_worker,
+            "tasks": dict(self.tasks)
+        }
@@ -0,0 +1,329 @@
+"""
+Deadlines, timeouts, retries, circuit breakers and hedged requests for
+calls to OpenAI and MongoDB.
+
+A request handler sets a deadline once; every upstream call made while
+serving it gets the smaller of its own stage timeout and the time left.
+Transient failures (timeouts, connection errors, 429/5xx) of idempotent
+calls are retried with jittered exponential backoff while the deadline
+allows, and trip a per-upstream circuit breaker that then fails fast until
+the upstream has had time to recover.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TypeVar
+
+import openai
+from pymongo.errors import ConnectionFailure
+
+import config
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Absolute time.monotonic() by which the current request must finish
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+class ResilienceError(Exception):
+    """An upstream call was refused or abandoned to protect the request"""
+
+
+class DeadlineExceeded(ResilienceError, TimeoutError):
+    """The request deadline passed before the call could complete"""
+
+
+class CircuitOpenError(ResilienceError):
+    """The upstream's circuit breaker is open, so the call was not attempted"""
+
+    def __init__(self, breaker: "CircuitBreaker"):
+        super().__init__(f"{breaker.name} is unavailable (circuit open)")
+        self.retry_after = breaker.retry_after()
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed: calls pass; `failure_threshold` consecutive transient failures open it.
+    open: calls fail fast for `reset_seconds`.
+    half_open: one probe call is let through; success closes, failure re-opens.
+    A probe that is cancelled, or has not finished after `probe_timeout_seconds`,
+    is given up so that another call can probe.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float, probe_timeout_seconds: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self.rejected = 0
+        self.opened = 0
+
+    def is_open(self) -> bool:
+        """True while calls are being refused (open and not yet due for a probe)"""
+        return self.state == "open" and time.monotonic() - self._opened_at < self.reset_seconds
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a probe through"""
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now (claims the probe when half-open)"""
+        if self.state == "open" and not self.is_open():
+            self.state = "half_open"
+            self._probing = False
+
+        if (
+            self.state == "half_open" and self._probing
+            and time.monotonic() - self._probe_started >= self.probe_timeout_seconds
+        ):
+            logger.warning("Circuit probe for %s did not finish in %.0fs, letting another through",
+                           self.name, self.probe_timeout_seconds)
+            self._probing = False
+
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            self._probe_started = time.monotonic()
+            return True
+
+        self.rejected += 1
+        metrics.CIRCUIT_REJECTIONS.labels(upstream=self.name).inc()
+        return False
+
+    def release_probe(self) -> None:
+        """Give up the half-open probe without a result (the probe call was cancelled)"""
+        if self.state == "half_open":
+            self._probing = False
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("Circuit for %s closed", self.name)
+        self.state = "closed"
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning("Circuit for %s opened after %d failures", self.name, self._failures)
+                self.opened += 1
+            self.state = "open"
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": "half_open" if self.state == "open" and not self.is_open() else self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.opened,
+            "rejected_calls": self.rejected,
+            "retry_after_seconds": round(self.retry_after(), 1)
+        }
+
+
+openai_breaker = CircuitBreaker(
+    "openai", config.settings.CIRCUIT_FAILURE_THRESHOLD, config.settings.CIRCUIT_RESET_SECONDS,
+    config.settings.CIRCUIT_PROBE_TIMEOUT_SECONDS
+)
+mongodb_breaker = CircuitBreaker(
+    "mongodb", config.settings.CIRCUIT_FAILURE_THRESHOLD, config.settings.CIRCUIT_RESET_SECONDS,
+    config.settings.CIRCUIT_PROBE_TIMEOUT_SECONDS
+)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Bound everything called inside the block to finish within `seconds`.
+    Nested deadlines can only shorten the outer one.
+    """
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left before the current deadline (None without one)"""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failure is worth retrying and counts against the upstream's health"""
+    if isinstance(error, (TimeoutError, ConnectionError, openai.APIConnectionError, ConnectionFailure)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff delay in seconds for a retry attempt (0-based)"""
+    cap = config.settings.RETRY_BACKOFF_MAX_MS / 1000
+    return random.uniform(0, min(cap, config.settings.RETRY_BACKOFF_BASE_MS / 1000 * 2 ** attempt))
+
+
+async def call(
+    operation: str,
+    func: Callable[[], Awaitable[T]],
+    timeout: float,
+    retries: int = 0,
+    breaker: CircuitBreaker | None = None
+) -> T:
+    """
+    Run an upstream call with a timeout, retries and a circuit breaker.
+
+    Args:
+        operation: Name for logs and metrics (e.g. "openai.embeddings")
+        func: Zero-argument coroutine function making the call (invoked once per attempt)
+        timeout: Per-attempt timeout in seconds (capped by the request deadline)
+        retries: Extra attempts after a transient failure; only for idempotent calls
+        breaker: Circuit breaker of the upstream
+
+    Returns:
+        The call's result
+
+    Raises:
+        CircuitOpenError: If the breaker refused the call
+        DeadlineExceeded: If the request deadline left no time for the call
+        Exception: The last error if every attempt failed
+    """
+    for attempt in range(retries + 1):
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(breaker)
+        probe = breaker is not None and breaker.state == "half_open"
+
+        budget = timeout
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                raise DeadlineExceeded(f"{operation}: request deadline exceeded")
+            budget = min(timeout, left)
+
+        try:
+            result = await asyncio.wait_for(func(), budget)
+        except Exception as e:
+            if isinstance(e, TimeoutError) and budget < timeout:
+                # Cut short by the request's own deadline: says nothing about the upstream's health
+                if probe:
+                    breaker.release_probe()
+                raise DeadlineExceeded(f"{operation}: request deadline exceeded") from e
+
+            transient = is_transient(e)
+            if breaker is not None:
+                if transient:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()  # The upstream answered; the request itself was bad
+
+            if not transient or attempt == retries:
+                raise
+
+            delay = backoff(attempt)
+            left = remaining()
+            if left is not None and delay >= left:
+                raise
+            logger.warning("%s failed (%s: %s), retrying in %.0f ms", operation, type(e).__name__, e, delay * 1000)
+            metrics.RETRIES.labels(operation=operation).inc()
+            await asyncio.sleep(delay)
+        except BaseException:
+            # Cancelled (client disconnect, hedge loser, shutdown): no verdict on the upstream,
+            # but a probe must not stay claimed or the breaker never closes again
+            if probe:
+                breaker.release_probe()
+            raise
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+    raise AssertionError("unreachable")
+
+
+async def openai_call(operation: str, func: Callable[[], Awaitable[T]], timeout: float, retries: int | None = None) -> T:
+    """Call OpenAI through the shared breaker with the configured retry count"""
+    if retries is None:
+        retries = config.settings.OPENAI_CALL_RETRIES
+    return await call(operation, func, timeout, retries, openai_breaker)
+
+
+async def mongodb_call(operation: str, func: Callable[[], Awaitable[T]], retries: int | None = None) -> T:
+    """Call MongoDB through the shared breaker with the configured timeout and retry count"""
+    if retries is None:
+        retries = config.settings.MONGODB_RETRIES
+    return await call(operation, func, config.settings.MONGODB_TIMEOUT_SECONDS, retries, mongodb_breaker)
+
+
+async def hedge(operation: str, func: Callable[[], Awaitable[T]], delay_seconds: float) -> T:
+    """
+    Hedged request: if the first attempt has not finished after `delay_seconds`,
+    start a second one and return whichever succeeds first.
+    Only for idempotent calls; the loser is cancelled.
+
+    Args:
+        operation: Name for metrics
+        func: Zero-argument coroutine function making the call
+        delay_seconds: How long to wait before hedging (<= 0 disables hedging)
+
+    Returns:
+        The first successful result
+    """
+    if delay_seconds <= 0:
+        return await func()
+
+    tasks = [asyncio.ensure_future(func())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay_seconds)
+        if not done:
+            metrics.HEDGED_REQUESTS.labels(operation=operation).inc()
+            tasks.append(asyncio.ensure_future(func()))
+
+        pending = set(tasks)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+def get_stats() -> dict:
+    """
+    Get circuit breaker state for monitoring.
+
+    Returns:
+        Dictionary of breaker stats per upstream
+    """
+    return {
+        "openai": openai_breaker.stats(),
+        "mongodb": mongodb_breaker.stats()
+    }
@@ -0,0 +1,69 @@
+"""
+Single-flight request coalescing.
+Concurrent callers asking for the same key share one in-flight call
+instead of each issuing their own.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent async calls by key.
+
+    The first caller for a key starts the call; callers arriving while it is
+    in flight await the same result (or exception). The result object is
+    shared between callers, so it must be treated as read-only. Cancelling
+    one caller does not cancel the shared call for the others.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() unless a call for key is already in flight, then await its result.
+
+        Args:
+            key: Identity of the work being requested
+            fn: Zero-argument coroutine function performing the work
+
+        Returns:
+            The (possibly shared) result of fn()
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """
+        Get coalescing counters for monitoring.
+
+        Returns:
+            Dictionary with executed calls, coalesced callers and in-flight keys
+        """
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight)
+        }
@@ -0,0 +1,80 @@
+"""
+Token counting utilities based on tiktoken.
+
+tiktoken downloads its encoding files on first use. If that is not possible
+(e.g. no egress from the pod), counts fall back to a ~4 characters per token
+estimate so callers keep working with approximate budgets.
+"""
+
+import logging
+import math
+from functools import lru_cache
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+CHAT_MODEL = "gpt-3.5-turbo"
+
+# Rough average for English text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=4)
+def get_encoding(model: str = CHAT_MODEL) -> tiktoken.Encoding | None:
+    """Get (and cache) the tokenizer for a model, or None if it cannot be loaded"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:  # noqa: BLE001
+        logger.warning("tiktoken encoding unavailable, estimating token counts: %s", e)
+        return None
+
+
+def count_tokens(text: str, model: str = CHAT_MODEL) -> int:
+    """
+    Count the tokens in a piece of text.
+
+    Args:
+        text: Text to measure
+        model: Model whose tokenizer to use
+
+    Returns:
+        Token count (estimated if the tokenizer is unavailable)
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: list[dict], model: str = CHAT_MODEL) -> int:
+    """Count tokens of a chat message list, including per-message overhead"""
+    # Each message carries ~4 formatting tokens; replies are primed with 3 more
+    return sum(4 + count_tokens(message.get("content") or "", model) for message in messages) + 3
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = CHAT_MODEL) -> str:
+    """
+    Truncate text to at most max_tokens tokens.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token budget
+        model: Model whose tokenizer to use
+
+    Returns:
+        Text cut at a token boundary (or character estimate)
+    """
+    if max_tokens <= 0:
+        return ""
+
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,341 @@
+"""
+Lightweight request tracing.
+Spans follow the OpenTelemetry data model (W3C trace/span IDs, parent links,
+typed attributes, status) and are exported either to memory, for the admin
+stats endpoint, or to a file of OTLP/JSON lines that an OpenTelemetry
+Collector `otlpjsonfile` receiver can ingest.
+
+Every HTTP request (except health and metrics probes) gets a root span from
+TracingMiddleware; pipeline stages timed in utils/metrics.py become its
+child spans.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Paths never traced (probes would drown out real requests)
+UNTRACED_PATHS = frozenset({"/", "/health", "/metrics", "/ping"})
+
+
+class Span:
+    """A single timed operation within a trace"""
+
+    __slots__ = (
+        "attributes", "end_ns", "kind", "name", "parent_id", "sampled",
+        "span_id", "start_ns", "status", "status_message", "trace_id"
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, sampled: bool, kind: str = "INTERNAL"):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes: dict = {}
+        self.status = "UNSET"
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value) -> None:
+        if self.sampled and value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = "ERROR"
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        """Serialize in the OTLP/JSON span format"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": f"SPAN_KIND_{self.kind}",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": f"STATUS_CODE_{self.status}", "message": self.status_message}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class InMemoryExporter:
+    """Keeps the most recent spans for inspection through the admin API"""
+
+    def __init__(self, max_spans: int):
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def shutdown(self) -> None:
+        pass
+
+    def recent_traces(self, limit: int = 20) -> list[dict]:
+        """
+        Group recent spans into traces, newest first.
+
+        Returns:
+            List of traces, each a tree of spans with durations and attributes
+        """
+        by_trace: dict[str, list[Span]] = {}
+        for span in self._spans:
+            by_trace.setdefault(span.trace_id, []).append(span)
+
+        traces = []
+        for trace_id in reversed(list(by_trace)):
+            spans = by_trace[trace_id]
+            ids = {span.span_id for span in spans}
+            roots = [span for span in spans if span.parent_id not in ids]
+            traces.append({
+                "trace_id": trace_id,
+                "spans": [_span_tree(root, spans) for root in sorted(roots, key=lambda span: span.start_ns)]
+            })
+            if len(traces) >= limit:
+                break
+        return traces
+
+
+class FileExporter:
+    """
+    Appends finished spans to a file as OTLP/JSON lines.
+    Writes happen on a background thread so the event loop never blocks on disk.
+    """
+
+    def __init__(self, path: str, flush_interval_seconds: float = 1.0):
+        self.path = path
+        self.flush_interval_seconds = flush_interval_seconds
+        self._queue: queue.SimpleQueue[Span | None] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-file-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        self._queue.put(span)
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval_seconds)
+                while True:
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch)
+
+    def _write(self, spans: list[Span]) -> None:
+        line = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "backend"}}]},
+                "scopeSpans": [{"scope": {"name": "backend"}, "spans": [span.to_otlp() for span in spans]}]
+            }]
+        })
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logger.warning("Trace export to %s failed: %s", self.path, e)
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+_exporter: InMemoryExporter | FileExporter | None = None
+
+
+def configure_tracing() -> None:
+    """Create the exporter selected by TRACING_EXPORTER (none | memory | file)"""
+    global _exporter
+    if _exporter is not None:
+        return
+
+    exporter = config.settings.TRACING_EXPORTER
+    if exporter == "memory":
+        _exporter = InMemoryExporter(config.settings.TRACING_MEMORY_SPANS)
+    elif exporter == "file":
+        _exporter = FileExporter(config.settings.TRACING_FILE_PATH)
+    elif exporter != "none":
+        logger.warning("Unknown TRACING_EXPORTER '%s', tracing disabled", exporter)
+
+
+def shutdown_tracing() -> None:
+    """Flush and stop the exporter"""
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
+
+
+def get_exporter() -> InMemoryExporter | FileExporter | None:
+    """Get the active exporter (None when tracing is disabled)"""
+    return _exporter
+
+
+@contextmanager
+def span(name: str, kind: str = "INTERNAL", parent: tuple[str, str] | None = None, **attributes) -> Iterator[Span | None]:
+    """
+    Record a span around a block of code.
+
+    The span becomes a child of the current span, or starts a new (sampled)
+    trace when there is none. Exceptions mark the span as failed and propagate.
+
+    Args:
+        name: Span name
+        kind: OpenTelemetry span kind (INTERNAL, SERVER, CLIENT)
+        parent: Remote (trace_id, span_id) from a traceparent header
+        **attributes: Initial span attributes
+
+    Yields:
+        The span, or None when tracing is disabled
+    """
+    if _exporter is None:
+        yield None
+        return
+
+    current = _current_span.get()
+    if current is not None:
+        new_span = Span(name, current.trace_id, current.span_id, current.sampled, kind)
+    elif parent is not None:
+        new_span = Span(name, parent[0], parent[1], True, kind)
+    else:
+        sampled = random.random() < config.settings.TRACING_SAMPLE_RATE
+        new_span = Span(name, os.urandom(16).hex(), None, sampled, kind)
+
+    for key, value in attributes.items():
+        new_span.set_attribute(key, value)
+
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        new_span.end_ns = time.time_ns()
+        if new_span.sampled and _exporter is not None:
+            _exporter.export(new_span)
+
+
+def set_attribute(key: str, value) -> None:
+    """Set an attribute on the current span (no-op without one)"""
+    current = _current_span.get()
+    if current is not None:
+        current.set_attribute(key, value)
+
+
+def add_to_attribute(key: str, amount: int) -> None:
+    """Increment a numeric attribute on the current span (e.g. tokens across batches)"""
+    current = _current_span.get()
+    if current is not None:
+        current.set_attribute(key, current.attributes.get(key, 0) + amount)
+
+
+def current_trace_id() -> str | None:
+    """Trace ID of the current span, if any"""
+    current = _current_span.get()
+    return current.trace_id if current is not None else None
+
+
+def parse_traceparent(header: str) -> tuple[str, str] | None:
+    """
+    Parse a W3C traceparent header.
+
+    Returns:
+        (trace_id, parent_span_id), or None if the header is malformed
+    """
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2]
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a SERVER root span for each HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _exporter is None or scope["path"] in UNTRACED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+
+        with span(f"{scope['method']} {scope['path']}", kind="SERVER", parent=parent) as root:
+            root.set_attribute("http.request.method", scope["method"])
+            root.set_attribute("url.path", scope["path"])
+            request_bytes = headers.get(b"content-length")
+            if request_bytes:
+                root.set_attribute("http.request.body.size", int(request_bytes))
+
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        root.status = "ERROR"
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
+
+
+def _span_tree(root: Span, spans: list[Span]) -> dict:
+    children = sorted((span for span in spans if span.parent_id == root.span_id), key=lambda span: span.start_ns)
+    return {
+        "name": root.name,
+        "span_id": root.span_id,
+        "duration_ms": round(root.duration_ms, 3),
+        "status": root.status,
+        "attributes": dict(root.attributes),
+        "children": [_span_tree(child, spans) for child in children]
+    }
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
@@ -0,0 +1,99 @@
+"""
+Upload size enforcement.
+
+Starlette spools multipart file parts to a temporary file on disk (beyond
+1 MB), so an upload is never held in memory whole; this middleware bounds
+how much of it is accepted at all. Requests to the upload endpoint whose
+Content-Length is over the limit are rejected before their body is read,
+and chunked bodies are cut off as soon as they pass it.
+"""
+
+import json
+
+from fastapi import HTTPException
+
+import config
+
+# Endpoints accepting file uploads
+UPLOAD_PATHS = {"/admin/documents/upload"}
+
+# Room for the multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def type_size_limits() -> dict[str, float]:
+    """
+    Parse per-type size limits from MAX_FILE_SIZE_MB_BY_TYPE, e.g. "docx=4,xlsx=5".
+
+    Returns:
+        Mapping of extension (with the dot) to MB
+    """
+    limits = {}
+    for item in config.settings.MAX_FILE_SIZE_MB_BY_TYPE.split(","):
+        extension, _, size = item.partition("=")
+        if extension.strip() and size.strip():
+            limits["." + extension.strip().lower().lstrip(".")] = float(size)
+    return limits
+
+
+def max_file_mb(extension: str = "") -> float:
+    """Largest accepted file in MB: MAX_FILE_SIZE_MB, or less for types listed in MAX_FILE_SIZE_MB_BY_TYPE"""
+    limit = config.settings.MAX_FILE_SIZE_MB
+    return min(limit, type_size_limits().get(extension, limit))
+
+
+def max_file_bytes(extension: str = "") -> int:
+    """Largest accepted file in bytes (see max_file_mb)"""
+    return int(max_file_mb(extension) * 1024 * 1024)
+
+
+def too_large(extension: str = "") -> HTTPException:
+    limit = max_file_mb(extension)
+    scope = f" for {extension} files" if limit < config.settings.MAX_FILE_SIZE_MB else ""
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum size{scope}: {limit:g}MB"
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware limiting request bodies of UPLOAD_PATHS"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in UPLOAD_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        limit = max_file_bytes() + MULTIPART_OVERHEAD_BYTES
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await _send_too_large(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the multipart parser; FastAPI turns it into the 413 response
+                    raise too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def _send_too_large(send) -> None:
+    body = json.dumps({"detail": too_large().detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
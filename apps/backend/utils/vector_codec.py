@@ -0,0 +1,112 @@
+"""
+Embedding storage encoding.
+Embeddings are stored in MongoDB as BSON binary vectors (subtype 9) instead of
+arrays of doubles: float32 takes 4 bytes per dimension, int8 1 byte and
+packed_bit 1 bit, with no per-element BSON overhead. Documents written before
+this encoding (plain arrays) are still decoded.
+"""
+
+import numpy as np
+from bson.binary import VECTOR_SUBTYPE, Binary, BinaryVectorDtype
+
+# Supported EMBEDDING_STORAGE_FORMAT values
+FORMATS = ("array", "float32", "int8", "packed_bit")
+QUANTIZED_FORMATS = ("int8", "packed_bit")
+
+
+
+def encode(vector: list[float], storage_format: str) -> Binary | list[float]:
+    """
+    Encode an embedding for storage.
+
+    int8 scales each vector so its largest component maps to 127; packed_bit
+    keeps only the sign of each component. Both preserve cosine ranking
+    closely enough for candidate generation.
+
+    Args:
+        vector: Embedding from OpenAI
+        storage_format: One of FORMATS
+
+    Returns:
+        BSON binary vector, or the list unchanged for "array"
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if storage_format == "array":
+        return list(vector)
+
+    values = np.asarray(vector, dtype=np.float32)
+
+    if storage_format == "float32":
+        return _binary(BinaryVectorDtype.FLOAT32, values.astype("<f4").tobytes())
+
+    if storage_format == "int8":
+        peak = float(np.max(np.abs(values))) if values.size else 0.0
+        scale = 127.0 / peak if peak > 0 else 0.0
+        quantized = np.clip(np.rint(values * scale), -128, 127).astype(np.int8)
+        return _binary(BinaryVectorDtype.INT8, quantized.tobytes())
+
+    if storage_format == "packed_bit":
+        padding = -len(values) % 8
+        return _binary(BinaryVectorDtype.PACKED_BIT, np.packbits(values > 0).tobytes(), padding)
+
+    raise ValueError(f"Unknown EMBEDDING_STORAGE_FORMAT: {storage_format}")
+
+
+def decode(value) -> np.ndarray:
+    """
+    Decode a stored embedding into a float32 vector.
+
+    Quantized vectors are returned on their own scale (int8 values, or
+    -1/+1 for bits); callers normalize before comparing.
+
+    Args:
+        value: BSON binary vector or array of numbers
+
+    Returns:
+        1-D float32 array
+    """
+    if not (isinstance(value, Binary) and value.subtype == VECTOR_SUBTYPE):
+        return np.asarray(value, dtype=np.float32)
+
+    dtype, padding, data = value[:1], value[1], memoryview(value)[2:]
+
+    if dtype == BinaryVectorDtype.FLOAT32.value:
+        return np.frombuffer(data, dtype="<f4").astype(np.float32)
+    if dtype == BinaryVectorDtype.INT8.value:
+        return np.frombuffer(data, dtype=np.int8).astype(np.float32)
+    if dtype == BinaryVectorDtype.PACKED_BIT.value:
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+        if padding:
+            bits = bits[:-padding]
+        return bits.astype(np.float32) * 2.0 - 1.0
+
+    raise ValueError(f"Unsupported binary vector dtype: {dtype!r}")
+
+
+def full_precision_field(field: str) -> str:
+    """Name of the optional float32 copy of a quantized embedding field, used for rescoring"""
+    return f"{field}_full"
+
+
+def chunk_vector(chunk: dict, field: str = "embedding") -> np.ndarray | None:
+    """
+    Get the most precise embedding stored on a chunk.
+
+    Args:
+        chunk: Chunk document
+        field: Embedding field to read
+
+    Returns:
+        The full-precision copy if present, else the decoded embedding,
+        or None when the chunk has no embedding
+    """
+    value = chunk.get(full_precision_field(field))
+    if value is None:
+        value = chunk.get(field)
+    return decode(value) if value is not None else None
+
+
+def _binary(dtype: BinaryVectorDtype, data: bytes, padding: int = 0) -> Binary:
+    return Binary(dtype.value + bytes([padding]) + data, VECTOR_SUBTYPE)
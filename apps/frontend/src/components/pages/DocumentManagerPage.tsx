@@ -12,7 +12,17 @@ interface Document {
   file_type: string;
 }
 
+interface IngestionJob {
+  id: string;
+  filename: string;
+  status: "queued" | "parsing" | "embedding" | "done" | "failed";
+  chunk_count: number | null;
+  chunks_embedded: number;
+  error: string | null;
+}
+
 const ADMIN_KEY_STORAGE = "admin_api_key";
+const JOB_POLL_INTERVAL_MS = 1000;
 const BACKEND_URL = process.env.NEXT_PUBLIC_BACKEND_URL || "/api/admin/documents";
 
 const DocumentManagerPage: React.FC = () => {
@@ -22,6 +32,7 @@ const DocumentManagerPage: React.FC = () => {
   const [documents, setDocuments] = useState<Document[]>([]);
   const [loading, setLoading] = useState<boolean>(false);
   const [uploading, setUploading] = useState<boolean>(false);
+  const [uploadStatus, setUploadStatus] = useState<string>("");
   const [error, setError] = useState<string>("");
   const [successMessage, setSuccessMessage] = useState<string>("");
 
@@ -103,10 +114,15 @@ const DocumentManagerPage: React.FC = () => {
       });
 
       if (response.ok) {
-        const data = await response.json();
-        setSuccessMessage(`${file.name} uploaded successfully! (${data.chunk_count} chunks)`);
-        // Reload documents
-        await verifyAndLoadDocuments(apiKey);
+        // The document is processed in the background; follow its ingestion job
+        const job = await waitForJob(await response.json());
+        if (job.status === "done") {
+          setSuccessMessage(`${file.name} uploaded successfully! (${job.chunk_count} chunks)`);
+          // Reload documents
+          await verifyAndLoadDocuments(apiKey);
+        } else {
+          setError(job.error || "Upload failed");
+        }
       } else {
         const errorData = await response.json();
         setError(errorData.detail || "Upload failed");
@@ -115,11 +131,33 @@ const DocumentManagerPage: React.FC = () => {
       setError("Failed to upload file");
     } finally {
       setUploading(false);
+      setUploadStatus("");
       // Reset file input
       e.target.value = "";
     }
   };
 
+  const waitForJob = async (job: IngestionJob): Promise<IngestionJob> => {
+    while (job.status !== "done" && job.status !== "failed") {
+      setUploadStatus(
+        job.status === "embedding" && job.chunk_count
+          ? `Embedding ${job.chunks_embedded}/${job.chunk_count}...`
+          : `${job.status.charAt(0).toUpperCase()}${job.status.slice(1)}...`
+      );
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      const response = await fetch(`${BACKEND_URL}/jobs/${job.id}`, {
+        headers: {
+          "X-API-Key": apiKey,
+        },
+      });
+      if (!response.ok) {
+        throw new Error("Failed to get upload status");
+      }
+      job = await response.json();
+    }
+    return job;
+  };
+
   const handleDelete = async (documentId: string, filename: string) => {
     if (!confirm(`Are you sure you want to delete "${filename}"? This action cannot be undone.`)) {
       return;
@@ -188,7 +226,7 @@ const DocumentManagerPage: React.FC = () => {
         </div>
         <div className={styles.uploadSection}>
           <label className={styles.uploadButton}>
-            {uploading ? "Uploading..." : "Upload Document"}
+            {uploading ? uploadStatus || "Uploading..." : "Upload Document"}
             <input
               type="file"
               onChange={handleFileUpload}